@@ -4,19 +4,21 @@ from importlib.resources import files
 
 import soundfile as sf
 import tqdm
-from cached_path import cached_path
 
 from f5_tts.infer.utils_infer import (
     hop_length,
     infer_process,
     load_model,
     load_vocoder,
+    max_batch_frames,
     preprocess_ref_audio_text,
-    remove_silence_for_generated_wav,
     save_spectrogram,
     transcribe,
     target_sample_rate,
 )
+from f5_tts.infer.resolver import resolve_model_file
+from f5_tts.infer.silence import compress_silence
+from f5_tts.infer.voice_profile import VoiceProfile, VoiceProfileCache
 from f5_tts.model import DiT, UNetT
 from f5_tts.model.utils import seed_everything
 
@@ -33,12 +35,21 @@ class F5TTS:
         local_path=None,
         device=None,
         hf_cache_dir=None,
+        voice_cache_dir=None,  # on-disk tier of the voice profile cache, None: memory only
+        voice_cache_size=16,
+        quantize=None,  # "int8": dynamic int8 backbone for cpu-only nodes
+        dtype="auto",  # backbone dtype, "auto": fp16 on cuda, bf16 on cpus supporting it, else fp32
+        slim_checkpoint=False,  # convert a .pt checkpoint once to a slim safetensors copy written next to it
+        compiled=False,  # torch.compile backbone and vocoder per duration bucket, warmed up here
+        compile_cache_dir=None,  # persistent inductor cache, default ~/.cache/f5_tts/inductor
     ):
         # Initialize parameters
         self.final_wave = None
         self.target_sample_rate = target_sample_rate
         self.hop_length = hop_length
         self.seed = -1
+        self.infer_stats = []  # per chunk ode steps / nfe of the last infer call
+        self.infer_timings = {}  # per stage seconds of the last pipelined infer call
         self.mel_spec_type = vocoder_name
 
         # Set device
@@ -60,29 +71,63 @@ class F5TTS:
         # Load models
         self.load_vocoder_model(vocoder_name, local_path=local_path, hf_cache_dir=hf_cache_dir)
         self.load_ema_model(
-            model_type, ckpt_file, vocoder_name, vocab_file, ode_method, use_ema, hf_cache_dir=hf_cache_dir
+            model_type,
+            ckpt_file,
+            vocoder_name,
+            vocab_file,
+            ode_method,
+            use_ema,
+            hf_cache_dir=hf_cache_dir,
+            quantize=quantize,
+            dtype=dtype,
+            slim=slim_checkpoint,
+        )
+
+        # Compiled mode, per bucket warmup stats (compiles, first call and steady latency) in compile_stats
+        self.compile_stats = None
+        if compiled:
+            from f5_tts.infer.compile_mode import enable_compile, warmup
+
+            self.vocoder = enable_compile(self.ema_model, self.vocoder, cache_dir=compile_cache_dir)
+            self.compile_stats = warmup(self.ema_model, self.vocoder)
+
+        # Preprocessed reference voices, see voice_profile()
+        self.voice_profiles = VoiceProfileCache(
+            self.ema_model.mel_spec, max_items=voice_cache_size, cache_dir=voice_cache_dir, device=self.device
         )
 
     def load_vocoder_model(self, vocoder_name, local_path=None, hf_cache_dir=None):
         self.vocoder = load_vocoder(vocoder_name, local_path is not None, local_path, self.device, hf_cache_dir)
 
-    def load_ema_model(self, model_type, ckpt_file, mel_spec_type, vocab_file, ode_method, use_ema, hf_cache_dir=None):
+    def load_ema_model(
+        self,
+        model_type,
+        ckpt_file,
+        mel_spec_type,
+        vocab_file,
+        ode_method,
+        use_ema,
+        hf_cache_dir=None,
+        quantize=None,
+        dtype="auto",
+        slim=False,
+    ):
         if model_type == "F5-TTS":
             if not ckpt_file:
                 if mel_spec_type == "vocos":
-                    ckpt_file = str(
-                        cached_path("hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors", cache_dir=hf_cache_dir)
+                    ckpt_file = resolve_model_file(
+                        "hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors", cache_dir=hf_cache_dir
                     )
                 elif mel_spec_type == "bigvgan":
-                    ckpt_file = str(
-                        cached_path("hf://SWivid/F5-TTS/F5TTS_Base_bigvgan/model_1250000.pt", cache_dir=hf_cache_dir)
+                    ckpt_file = resolve_model_file(
+                        "hf://SWivid/F5-TTS/F5TTS_Base_bigvgan/model_1250000.pt", cache_dir=hf_cache_dir
                     )
             model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
             model_cls = DiT
         elif model_type == "E2-TTS":
             if not ckpt_file:
-                ckpt_file = str(
-                    cached_path("hf://SWivid/E2-TTS/E2TTS_Base/model_1200000.safetensors", cache_dir=hf_cache_dir)
+                ckpt_file = resolve_model_file(
+                    "hf://SWivid/E2-TTS/E2TTS_Base/model_1200000.safetensors", cache_dir=hf_cache_dir
                 )
             model_cfg = dict(dim=1024, depth=24, heads=16, ff_mult=4)
             model_cls = UNetT
@@ -90,24 +135,37 @@ class F5TTS:
             raise ValueError(f"Unknown model type: {model_type}")
 
         self.ema_model = load_model(
-            model_cls, model_cfg, ckpt_file, mel_spec_type, vocab_file, ode_method, use_ema, self.device
+            model_cls,
+            model_cfg,
+            ckpt_file,
+            mel_spec_type,
+            vocab_file,
+            ode_method,
+            use_ema,
+            self.device,
+            slim=slim,
+            quantize=quantize,
+            dtype=dtype,
         )
 
     def transcribe(self, ref_audio, language=None):
         return transcribe(ref_audio, language)
 
-    def export_wav(self, wav, file_wave, remove_silence=False):
-        sf.write(file_wave, wav, self.target_sample_rate)
+    def voice_profile(self, ref_file, ref_text="", show_info=print):
+        # reference audio preprocessed once per content, pass the result to infer() as ref_file
+        return self.voice_profiles.get(ref_file, ref_text, show_info=show_info)
 
+    def export_wav(self, wav, file_wave, remove_silence=False):
         if remove_silence:
-            remove_silence_for_generated_wav(file_wave)
+            wav = compress_silence(wav, self.target_sample_rate)
+        sf.write(file_wave, wav, self.target_sample_rate)
 
     def export_spectrogram(self, spect, file_spect):
         save_spectrogram(spect, file_spect)
 
     def infer(
         self,
-        ref_file,
+        ref_file,  # path, encoded bytes, (wave, sr), or VoiceProfile from voice_profile()
         ref_text,
         gen_text,
         show_info=print,
@@ -124,13 +182,26 @@ class F5TTS:
         file_spect=None,
         seed=-1,
         progress_callback=None,  # <-- thêm tham số này
+        chunk_batching=False,
+        max_batch_frames=max_batch_frames,
+        fused_cfg=False,
+        step_callback=None,  # step_callback(step, total) after each ode step of a chunk, raise inside to cancel
+        ode_method=None,  # euler | midpoint | heun | adams2 | adams3 | dpmpp_2m, None: the one given at init
+        adaptive_tol=None,  # early stop of the ode loop per chunk, steps taken are reported in self.infer_stats
+        cfg_interval=None,  # (lo, hi), guidance only for t in it, e.g. (0, 0.6) skips the null pass on the last 40%
+        cfg_reuse_steps=None,  # flow evaluations reusing the previous null prediction instead of recomputing it
+        block_cache=None,  # dict(interval, start, end), reuse deep DiT blocks' output on cheap steps, F5-TTS only
+        pipelined=False,  # vocode chunk i while chunk i+1 is sampled, stage timings in self.infer_timings
     ):
         if seed == -1:
             seed = random.randint(0, sys.maxsize)
         seed_everything(seed)
         self.seed = seed
+        self.infer_stats = []
+        self.infer_timings = {}
 
-        ref_file, ref_text = preprocess_ref_audio_text(ref_file, ref_text, device=self.device)
+        if not isinstance(ref_file, VoiceProfile):  # profiles are already preprocessed
+            ref_file, ref_text = preprocess_ref_audio_text(ref_file, ref_text, device=self.device)
 
         wav, sr, spect = infer_process(
             ref_file,
@@ -150,6 +221,18 @@ class F5TTS:
             fix_duration=fix_duration,
             device=self.device,
             progress_callback=progress_callback,  # <-- thêm dòng này
+            chunk_batching=chunk_batching,
+            max_batch_frames=max_batch_frames,
+            fused_cfg=fused_cfg,
+            step_callback=step_callback,
+            ode_method=ode_method,
+            adaptive_tol=adaptive_tol,
+            cfg_interval=cfg_interval,
+            cfg_reuse_steps=cfg_reuse_steps,
+            block_cache=block_cache,
+            pipelined=pipelined,
+            stats=self.infer_stats,
+            timings=self.infer_timings,
         )
 
         if file_wave is not None:
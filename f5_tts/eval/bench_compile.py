@@ -0,0 +1,105 @@
+# Benchmark compiled mode: per duration bucket compile / cache load time and latency against eager,
+# then recompiles and mel L1 distance to eager (unpadded) over chunks of varying duration
+# python src/f5_tts/eval/bench_compile.py --device cpu --buckets 512,1024,2048 --nfe 16
+
+import argparse
+import random
+from importlib.resources import files
+
+import torch
+
+from f5_tts.infer.compile_mode import compile_counters, enable_compile, print_compile_stats, warmup
+from f5_tts.infer.resolver import resolve_model_file
+from f5_tts.infer.utils_infer import (
+    cfg_strength,
+    duration_buckets,
+    get_device,
+    hop_length,
+    load_model,
+    load_vocoder,
+    preprocess_ref_audio_text,
+    sway_sampling_coef,
+    target_rms,
+    target_sample_rate,
+    vocoder_buckets,
+)
+from f5_tts.infer.vocoder import BucketedVocoder
+from f5_tts.model import DiT
+from f5_tts.model.utils import convert_char_to_pinyin, resample
+
+
+def main():
+    parser = argparse.ArgumentParser(description="torch.compile duration bucket benchmark")
+    parser.add_argument("--ckpt_file", default="hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors")
+    parser.add_argument("--vocab_file", default="")
+    parser.add_argument("--ref_audio", default=str(files("f5_tts").joinpath("infer/examples/basic/basic_ref_en.wav")))
+    parser.add_argument("--ref_text", default="Some call me nature, others call me mother nature.")
+    parser.add_argument("--device", default=None)
+    parser.add_argument("--buckets", default=",".join(map(str, duration_buckets)), help="frames, comma separated")
+    parser.add_argument("--vocoder_buckets", default=",".join(map(str, vocoder_buckets)))
+    parser.add_argument("--cache_dir", default=None, help="inductor cache, default ~/.cache/f5_tts/inductor")
+    parser.add_argument("--nfe", default=16, type=int)
+    parser.add_argument("--chunks", default=8, type=int, help="chunks of random duration run after warmup")
+    parser.add_argument("--seed", default=0, type=int)
+    args = parser.parse_args()
+
+    device = args.device or get_device()
+    buckets = [int(n) for n in args.buckets.split(",")]
+    voc_buckets = [int(n) for n in args.vocoder_buckets.split(",")]
+    ckpt_file = resolve_model_file(args.ckpt_file)
+    model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
+    model = load_model(DiT, model_cfg, ckpt_file, vocab_file=args.vocab_file, device=device)
+    vocoder = load_vocoder("vocos", device=device)
+    sample_kwargs = dict(steps=args.nfe, cfg_strength=cfg_strength, sway_sampling_coef=sway_sampling_coef)
+
+    # chunks of random duration within the buckets, rendered eagerly without padding as the reference
+    (audio, sr), ref_text = preprocess_ref_audio_text(args.ref_audio, args.ref_text, show_info=lambda *_: None)
+    audio = torch.mean(audio, dim=0, keepdim=True)
+    rms = torch.sqrt(torch.mean(torch.square(audio)))
+    if rms < target_rms:
+        audio = audio * target_rms / rms
+    audio = resample(audio, sr, target_sample_rate).to(device)
+    ref_audio_len = audio.shape[-1] // hop_length
+    text = convert_char_to_pinyin([ref_text + " Here we generate something just for test."])
+    rng = random.Random(args.seed)
+    durations = [rng.randint(ref_audio_len + 64, max(buckets)) for _ in range(args.chunks)]
+
+    def render():
+        with torch.inference_mode():
+            return [
+                model.sample(
+                    cond=audio, text=text, duration=duration, seed=args.seed, cache_modulation=True, **sample_kwargs
+                )[0][0, ref_audio_len:duration].float()
+                for duration in durations
+            ]
+
+    reference = render()
+
+    # eager, same bucket padding, for the per bucket latency baseline
+    model.duration_buckets = buckets
+    eager_stats = warmup(model, BucketedVocoder(vocoder, voc_buckets, hop_length=hop_length), **sample_kwargs)
+    print(f"\neager ({device})")
+    print_compile_stats(eager_stats)
+
+    vocoder = enable_compile(model, vocoder, buckets=buckets, vocoder_buckets=voc_buckets, cache_dir=args.cache_dir)
+    compiled_stats = warmup(model, vocoder, **sample_kwargs)
+    print(f"\ncompiled ({device}), first call: compile or inductor cache load")
+    print_compile_stats(compiled_stats)
+
+    before = compile_counters()["compiles"]
+    mels = render()
+    with torch.inference_mode():
+        for mel in mels:
+            vocoder.decode(mel.T.unsqueeze(0))
+    recompiles = compile_counters()["compiles"] - before
+    l1 = sum((mel - ref).abs().mean().item() for mel, ref in zip(mels, reference)) / len(mels)
+    print(f"\n{len(durations)} chunks of {min(durations)}-{max(durations)} frames after warmup")
+    print(f"recompiles: {recompiles}, mel L1 to eager unpadded: {l1:.5f}")
+
+    for stage in ["dit", "vocoder"]:
+        speedups = [eager_stats[stage][b]["seconds"] / compiled_stats[stage][b]["seconds"] for b in eager_stats[stage]]
+        print(f"{stage} speedup per bucket: " + ", ".join(f"{s:.2f}x" for s in speedups))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Benchmark bf16 against fp32 on cpu, DiT sampling and Vocos decoding timed separately
+# real-time factor (compute seconds / generated audio seconds), mel L1 / wave L1 distance to fp32
+# python src/f5_tts/eval/bench_dtype.py --nfe 16 --threads 8
+
+import argparse
+import time
+from importlib.resources import files
+
+import torch
+
+from f5_tts.infer.utils_infer import (
+    cfg_strength,
+    cpu_supports_bf16,
+    hop_length,
+    load_model,
+    load_vocoder,
+    preprocess_ref_audio_text,
+    sway_sampling_coef,
+    target_rms,
+    target_sample_rate,
+)
+from f5_tts.infer.resolver import resolve_model_file
+from f5_tts.model import DiT
+from f5_tts.model.utils import convert_char_to_pinyin, resample
+
+prompts = [
+    "Hello world.",
+    "I don't really care what you call me.",
+    "I've been a silent spectator, watching species evolve, empires rise and fall.",
+]
+
+
+def best_of(repeats, fn):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with torch.inference_mode():
+            result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="bf16 / fp32 cpu benchmark of the DiT and the vocoder")
+    parser.add_argument("--ckpt_file", default="hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors")
+    parser.add_argument("--vocab_file", default="")
+    parser.add_argument("--ref_audio", default=str(files("f5_tts").joinpath("infer/examples/basic/basic_ref_en.wav")))
+    parser.add_argument("--ref_text", default="Some call me nature, others call me mother nature.")
+    parser.add_argument("--nfe", default=16, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument("--threads", default=0, type=int, help="torch intra-op threads, 0: torch default")
+    parser.add_argument("--repeats", default=2, type=int, help="timed runs per prompt, best one is reported")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    print(f"native bf16 on this cpu: {cpu_supports_bf16()}")
+    ckpt_file = resolve_model_file(args.ckpt_file)
+    model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
+
+    (audio, sr), ref_text = preprocess_ref_audio_text(args.ref_audio, args.ref_text, show_info=lambda *_: None)
+    audio = torch.mean(audio, dim=0, keepdim=True)
+    rms = torch.sqrt(torch.mean(torch.square(audio)))
+    if rms < target_rms:
+        audio = audio * target_rms / rms
+    audio = resample(audio, sr, target_sample_rate)
+    ref_audio_len = audio.shape[-1] // hop_length
+
+    cases = []
+    for prompt in prompts:
+        text = convert_char_to_pinyin([ref_text + prompt])
+        duration = ref_audio_len + int(ref_audio_len / len(ref_text.encode("utf-8")) * len(prompt.encode("utf-8")))
+        cases.append((text, duration))
+    audio_seconds = sum(duration - ref_audio_len for _, duration in cases) * hop_length / target_sample_rate
+
+    # dit, whole backbone in the given dtype
+    mels = {}
+    dit_rtf = {}
+    for dtype in ["fp32", "bf16"]:
+        model = load_model(DiT, model_cfg, ckpt_file, vocab_file=args.vocab_file, device="cpu", dtype=dtype, slim=False)
+        mels[dtype], seconds = [], 0.0
+        for i, (text, duration) in enumerate(cases):
+
+            def sample():
+                return model.sample(
+                    cond=audio,
+                    text=text,
+                    duration=duration,
+                    steps=args.nfe,
+                    cfg_strength=cfg_strength,
+                    sway_sampling_coef=sway_sampling_coef,
+                    seed=args.seed,
+                    cache_modulation=True,
+                )[0]
+
+            if i == 0:
+                best_of(1, sample)  # warmup, modulation cache / allocator
+            case_seconds, generated = best_of(args.repeats, sample)
+            seconds += case_seconds
+            mels[dtype].append(generated[:, ref_audio_len:duration].float().permute(0, 2, 1))
+        dit_rtf[dtype] = seconds / audio_seconds
+        del model
+
+    # vocos, backbone under bf16 autocast, istft head in fp32 (complex bf16 is not supported)
+    vocoder = load_vocoder("vocos", device="cpu")
+    waves = {}
+    vocos_rtf = {}
+    for dtype in ["fp32", "bf16"]:
+
+        def decode(mel):
+            with torch.autocast("cpu", dtype=torch.bfloat16, enabled=dtype == "bf16"):
+                features = vocoder.backbone(mel)
+            return vocoder.head(features.float())
+
+        best_of(1, lambda: decode(mels["fp32"][0]))  # warmup
+        waves[dtype], seconds = [], 0.0
+        for mel in mels["fp32"]:
+            case_seconds, wave = best_of(args.repeats, lambda: decode(mel))
+            seconds += case_seconds
+            waves[dtype].append(wave)
+        vocos_rtf[dtype] = seconds / audio_seconds
+
+    print(f"{'stage':<6} {'dtype':<5} {'RTF':>7} {'speedup':>8} {'L1':>8}")
+    for stage, rtf, outputs in (("dit", dit_rtf, mels), ("vocos", vocos_rtf, waves)):
+        for dtype in ["fp32", "bf16"]:
+            l1 = sum((out - ref).abs().mean().item() for out, ref in zip(outputs[dtype], outputs["fp32"]))
+            speedup = rtf["fp32"] / rtf[dtype]
+            print(f"{stage:<6} {dtype:<5} {rtf[dtype]:>7.3f} {speedup:>7.2f}x {l1 / len(cases):>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# Cpu speed of the ONNX Runtime engine against PyTorch fp32: real-time factor of DiT sampling and vocos decoding
+# (numerical parity of the graphs is covered by tests/test_onnx_parity.py)
+# python src/f5_tts/eval/bench_onnx.py --onnx_dir ckpts/onnx --nfe 16 --threads 8
+
+import argparse
+import os
+import time
+from importlib.resources import files
+
+import torch
+
+from f5_tts.infer.onnx_engine import OrtF5TTS
+from f5_tts.infer.onnx_export import ONNX_CONFIG, export_onnx
+from f5_tts.infer.resolver import resolve_model_file
+from f5_tts.infer.utils_infer import (
+    cfg_strength,
+    hop_length,
+    load_model,
+    load_vocoder,
+    preprocess_ref_audio_text,
+    sway_sampling_coef,
+    target_rms,
+    target_sample_rate,
+)
+from f5_tts.model import DiT
+from f5_tts.model.utils import convert_char_to_pinyin, resample
+
+prompts = [
+    "Hello world.",
+    "I don't really care what you call me.",
+    "I've been a silent spectator, watching species evolve, empires rise and fall.",
+]
+
+
+def best_of(repeats, fn):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with torch.inference_mode():
+            result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX Runtime / PyTorch cpu benchmark")
+    parser.add_argument("--ckpt_file", default="hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors")
+    parser.add_argument("--vocab_file", default="")
+    parser.add_argument("--onnx_dir", default="ckpts/onnx", help="exported there first if missing")
+    parser.add_argument("--ref_audio", default=str(files("f5_tts").joinpath("infer/examples/basic/basic_ref_en.wav")))
+    parser.add_argument("--ref_text", default="Some call me nature, others call me mother nature.")
+    parser.add_argument("--nfe", default=16, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument("--threads", default=0, type=int, help="torch / ORT intra-op threads, 0: their default")
+    parser.add_argument("--repeats", default=2, type=int, help="timed runs per prompt, best one is reported")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    ckpt_file = resolve_model_file(args.ckpt_file)
+    model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
+    model = load_model(DiT, model_cfg, ckpt_file, vocab_file=args.vocab_file, device="cpu", dtype="fp32")
+    vocoder = load_vocoder("vocos", device="cpu")
+    if not os.path.exists(os.path.join(args.onnx_dir, ONNX_CONFIG)):
+        export_onnx(model, vocoder, args.onnx_dir, vocab_file=args.vocab_file)
+    engine = OrtF5TTS(args.onnx_dir, num_threads=args.threads)
+
+    (audio, sr), ref_text = preprocess_ref_audio_text(args.ref_audio, args.ref_text, show_info=lambda *_: None)
+    audio = torch.mean(audio, dim=0, keepdim=True)
+    rms = torch.sqrt(torch.mean(torch.square(audio)))
+    if rms < target_rms:
+        audio = audio * target_rms / rms
+    audio = resample(audio, sr, target_sample_rate)
+    ref_audio_len = audio.shape[-1] // hop_length
+    with torch.inference_mode():
+        cond = model.mel_spec(audio).permute(0, 2, 1)  # 1 n d
+
+    cases = []
+    for prompt in prompts:
+        text = convert_char_to_pinyin([ref_text + prompt])
+        duration = ref_audio_len + int(ref_audio_len / len(ref_text.encode("utf-8")) * len(prompt.encode("utf-8")))
+        duration = max(max(len(text[0]), cond.shape[1]) + 1, duration)  # as CFM.sample() clamps it
+        cases.append((text, duration))
+    audio_seconds = sum(duration - ref_audio_len for _, duration in cases) * hop_length / target_sample_rate
+
+    # whole chunks from the same noise (same work for both), then vocos on the pytorch mels
+    torch_mels = []
+    torch_seconds, ort_seconds = dict(dit=0.0, vocos=0.0), dict(dit=0.0, vocos=0.0)
+    for i, (text, duration) in enumerate(cases):
+
+        def torch_sample():
+            return model.sample(
+                cond=cond,
+                text=text,
+                duration=duration,
+                steps=args.nfe,
+                cfg_strength=cfg_strength,
+                sway_sampling_coef=sway_sampling_coef,
+                seed=args.seed,
+                fused_cfg=True,
+                cache_modulation=True,
+            )[0]
+
+        torch.manual_seed(args.seed)
+        noise = torch.randn(duration, model.num_channels).numpy()
+
+        def ort_sample():
+            return engine.sample(
+                cond[0].numpy(),
+                text[0],
+                duration,
+                steps=args.nfe,
+                cfg_strength=cfg_strength,
+                sway_sampling_coef=sway_sampling_coef,
+                noise=noise,
+            )
+
+        if i == 0:  # warmup, modulation cache / allocator / ORT arena
+            best_of(1, torch_sample)
+            best_of(1, ort_sample)
+        seconds, generated = best_of(args.repeats, torch_sample)
+        torch_seconds["dit"] += seconds
+        torch_mels.append(generated[0, ref_audio_len:duration].T[None])
+        seconds, _ = best_of(args.repeats, ort_sample)
+        ort_seconds["dit"] += seconds
+
+    for mel in torch_mels:
+        seconds, _ = best_of(args.repeats, lambda: vocoder.decode(mel))
+        torch_seconds["vocos"] += seconds
+        seconds, _ = best_of(args.repeats, lambda: engine.vocode(mel.numpy()))
+        ort_seconds["vocos"] += seconds
+
+    print(f"{len(cases)} chunks, {args.nfe} steps")
+    print(f"{'stage':<6} {'torch RTF':>10} {'ORT RTF':>8} {'speedup':>8}")
+    for stage in ["dit", "vocos"]:
+        torch_rtf, ort_rtf = torch_seconds[stage] / audio_seconds, ort_seconds[stage] / audio_seconds
+        print(f"{stage:<6} {torch_rtf:>10.3f} {ort_rtf:>8.3f} {torch_rtf / ort_rtf:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Benchmark int8 dynamic quantization on cpu: real-time factor of sampling and mel L1 distance to fp32
+# python src/f5_tts/eval/bench_quantize.py --ckpt_file model_last.pt --nfe 16 --threads 8
+
+import argparse
+import time
+from importlib.resources import files
+
+import torch
+
+from f5_tts.infer.utils_infer import (
+    cfg_strength,
+    hop_length,
+    load_model,
+    preprocess_ref_audio_text,
+    sway_sampling_coef,
+    target_rms,
+    target_sample_rate,
+)
+from f5_tts.infer.resolver import resolve_model_file
+from f5_tts.model import DiT
+from f5_tts.model.utils import convert_char_to_pinyin, resample
+
+prompts = [
+    "Hello world.",
+    "I don't really care what you call me.",
+    "I've been a silent spectator, watching species evolve, empires rise and fall.",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="int8 dynamic quantization cpu benchmark")
+    parser.add_argument("--ckpt_file", default="hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors")
+    parser.add_argument("--vocab_file", default="")
+    parser.add_argument("--ref_audio", default=str(files("f5_tts").joinpath("infer/examples/basic/basic_ref_en.wav")))
+    parser.add_argument("--ref_text", default="Some call me nature, others call me mother nature.")
+    parser.add_argument("--nfe", default=16, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument("--threads", default=0, type=int, help="torch intra-op threads, 0: torch default")
+    parser.add_argument("--repeats", default=2, type=int, help="timed runs per prompt, best one is reported")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    ckpt_file = resolve_model_file(args.ckpt_file)
+    model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
+
+    (audio, sr), ref_text = preprocess_ref_audio_text(args.ref_audio, args.ref_text, show_info=lambda *_: None)
+    audio = torch.mean(audio, dim=0, keepdim=True)
+    rms = torch.sqrt(torch.mean(torch.square(audio)))
+    if rms < target_rms:
+        audio = audio * target_rms / rms
+    audio = resample(audio, sr, target_sample_rate)
+    ref_audio_len = audio.shape[-1] // hop_length
+
+    cases = []
+    for prompt in prompts:
+        text = convert_char_to_pinyin([ref_text + prompt])
+        duration = ref_audio_len + int(ref_audio_len / len(ref_text.encode("utf-8")) * len(prompt.encode("utf-8")))
+        cases.append((text, duration))
+
+    def render(model):
+        mels, seconds, audio_seconds = [], 0.0, 0.0
+        for text, duration in cases:
+            best = float("inf")
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                with torch.inference_mode():
+                    generated, _ = model.sample(
+                        cond=audio,
+                        text=text,
+                        duration=duration,
+                        steps=args.nfe,
+                        cfg_strength=cfg_strength,
+                        sway_sampling_coef=sway_sampling_coef,
+                        seed=args.seed,
+                        cache_modulation=True,
+                    )
+                best = min(best, time.perf_counter() - start)
+            seconds += best
+            audio_seconds += (duration - ref_audio_len) * hop_length / target_sample_rate
+            mels.append(generated[0, ref_audio_len:duration].float())
+        return mels, seconds / audio_seconds
+
+    results = {}
+    for quantize in [None, "int8"]:
+        start = time.perf_counter()
+        model = load_model(DiT, model_cfg, ckpt_file, vocab_file=args.vocab_file, device="cpu", quantize=quantize)
+        load_seconds = time.perf_counter() - start
+        render(model)  # warmup, modulation cache / allocator
+        results[quantize] = (*render(model), load_seconds)
+        if quantize is not None:
+            quantized = sum(isinstance(m, torch.ao.nn.quantized.dynamic.Linear) for m in model.modules())
+            print(f"{quantized} linears quantized")
+
+    reference, ref_rtf, _ = results[None]
+    print(f"{'model':<6} {'load (s)':>9} {'RTF':>7} {'speedup':>8} {'mel L1':>8}")
+    for quantize, (mels, rtf, load_seconds) in results.items():
+        l1 = sum((mel - ref).abs().mean().item() for mel, ref in zip(mels, reference)) / len(mels)
+        print(f"{quantize or 'fp32':<6} {load_seconds:>9.2f} {rtf:>7.3f} {ref_rtf / rtf:>7.2f}x {l1:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Benchmark ode solvers / nfe steps: wall time and mel L1 distance to a many-step euler reference
+# python src/f5_tts/eval/bench_solvers.py --methods euler,dpmpp_2m --nfe 8,12,16,32
+
+import argparse
+import time
+from importlib.resources import files
+
+import torch
+
+from f5_tts.api import F5TTS
+from f5_tts.infer.utils_infer import (
+    cfg_strength,
+    hop_length,
+    preprocess_ref_audio_text,
+    sway_sampling_coef,
+    target_rms,
+    target_sample_rate,
+)
+from f5_tts.model.sampler import eval_times
+from f5_tts.model.utils import convert_char_to_pinyin, resample
+
+prompts = [
+    "Hello world.",
+    "I don't really care what you call me.",
+    "I've been a silent spectator, watching species evolve, empires rise and fall.",
+    "But always remember, I am mighty and enduring. Respect me and I'll nurture you; "
+    "ignore me and you shall face the consequences.",
+]
+
+
+def sync(device):
+    if str(device).startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ode solver quality / speed benchmark")
+    parser.add_argument("--model", default="F5-TTS", choices=["F5-TTS", "E2-TTS"])
+    parser.add_argument("--ckpt_file", default="")
+    parser.add_argument("--vocab_file", default="")
+    parser.add_argument("--ref_audio", default=str(files("f5_tts").joinpath("infer/examples/basic/basic_ref_en.wav")))
+    parser.add_argument("--ref_text", default="Some call me nature, others call me mother nature.")
+    parser.add_argument("--methods", default="euler,midpoint,heun,adams2,adams3,dpmpp_2m")
+    parser.add_argument("--nfe", default="8,10,12,16,32", help="solver steps, comma separated")
+    parser.add_argument("--ref_method", default="euler")
+    parser.add_argument("--ref_nfe", default=64, type=int)
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument("--repeats", default=3, type=int, help="timed runs per setting, best one is reported")
+    args = parser.parse_args()
+
+    f5tts = F5TTS(model_type=args.model, ckpt_file=args.ckpt_file, vocab_file=args.vocab_file)
+    model, device = f5tts.ema_model, f5tts.device
+
+    (audio, sr), ref_text = preprocess_ref_audio_text(args.ref_audio, args.ref_text, show_info=lambda *_: None)
+    audio = torch.mean(audio, dim=0, keepdim=True)
+    rms = torch.sqrt(torch.mean(torch.square(audio)))
+    if rms < target_rms:
+        audio = audio * target_rms / rms
+    audio = resample(audio, sr, target_sample_rate)
+    audio = audio.to(device)
+    ref_audio_len = audio.shape[-1] // hop_length
+
+    cases = []
+    for prompt in prompts:
+        text = convert_char_to_pinyin([ref_text + prompt])
+        duration = ref_audio_len + int(ref_audio_len / len(ref_text.encode("utf-8")) * len(prompt.encode("utf-8")))
+        cases.append((text, duration))
+
+    def render(method, steps):
+        mels, seconds = [], 0.0
+        for text, duration in cases:
+            best = float("inf")
+            for _ in range(args.repeats):
+                sync(device)
+                start = time.perf_counter()
+                with torch.inference_mode():
+                    generated, _ = model.sample(
+                        cond=audio,
+                        text=text,
+                        duration=duration,
+                        steps=steps,
+                        cfg_strength=cfg_strength,
+                        sway_sampling_coef=sway_sampling_coef,
+                        seed=args.seed,
+                        ode_method=method,
+                        cache_modulation=True,
+                    )
+                sync(device)
+                best = min(best, time.perf_counter() - start)
+            seconds += best
+            mels.append(generated[0, ref_audio_len:duration].float())
+        return mels, seconds
+
+    # warmup, kernels / allocator / modulation cache
+    render(args.ref_method, 4)
+
+    reference, ref_seconds = render(args.ref_method, args.ref_nfe)
+    print(f"reference: {args.ref_method} {args.ref_nfe} steps, {ref_seconds:.3f}s")
+    print(f"{'method':<10} {'steps':>5} {'nfe':>5} {'time (s)':>9} {'speedup':>8} {'mel L1':>8}")
+
+    for method in args.methods.split(","):
+        for steps in [int(n) for n in args.nfe.split(",")]:
+            mels, seconds = render(method, steps)
+            l1 = sum((mel - ref).abs().mean().item() for mel, ref in zip(mels, reference)) / len(mels)
+            times = eval_times(torch.zeros(steps + 1), method)
+            nfe = times.shape[0] if times is not None else "-"  # adaptive torchdiffeq methods
+            print(f"{method:<10} {steps:>5} {nfe:>5} {seconds:>9.3f} {ref_seconds / seconds:>7.2f}x {l1:>8.4f}")
+
+
+if __name__ == "__main__":
+    main()
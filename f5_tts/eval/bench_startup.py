@@ -0,0 +1,60 @@
+# Benchmark cold start: import time of the inference modules (python -X importtime, fresh interpreter each run)
+# and optionally the time to first usable model
+# python src/f5_tts/eval/bench_startup.py --modules f5_tts.infer.utils_infer,f5_tts.api --load_model
+
+import argparse
+import subprocess
+import sys
+import time
+
+
+def import_times(module):
+    # (total wall seconds, {module: cumulative import us}) of importing module in a fresh interpreter
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+    wall = time.perf_counter() - start
+
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cum_us, name = line[len("import time:") :].split("|")
+        name = name.strip()
+        cumulative[name] = max(cumulative.get(name, 0), int(cum_us))
+    return wall, cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import / model load time benchmark")
+    parser.add_argument("--modules", default="f5_tts.infer.utils_infer,f5_tts.api", help="comma separated")
+    parser.add_argument("--top", default=15, type=int, help="heaviest top-level imports to list")
+    parser.add_argument("--repeats", default=3, type=int, help="runs per module, best one is reported")
+    parser.add_argument("--load_model", action="store_true", help="also time F5TTS() up to a loaded model")
+    parser.add_argument("--model", default="F5-TTS", choices=["F5-TTS", "E2-TTS"])
+    parser.add_argument("--ckpt_file", default="")
+    parser.add_argument("--vocab_file", default="")
+    args = parser.parse_args()
+
+    for module in args.modules.split(","):
+        wall, cumulative = min((import_times(module) for _ in range(args.repeats)), key=lambda r: r[0])
+        import_s = cumulative.get(module, 0) / 1e6
+        print(f"\n{module}: {wall:.2f}s wall (interpreter start included), {import_s:.2f}s import")
+        top_level = {name: us for name, us in cumulative.items() if "." not in name}
+        for name, us in sorted(top_level.items(), key=lambda item: -item[1])[: args.top]:
+            print(f"  {name:<30} {us / 1e3:9.1f} ms")
+
+    if args.load_model:
+        start = time.perf_counter()
+        from f5_tts.api import F5TTS
+
+        imported = time.perf_counter()
+        F5TTS(model_type=args.model, ckpt_file=args.ckpt_file, vocab_file=args.vocab_file)
+        loaded = time.perf_counter()
+        print(f"\nF5TTS: import {imported - start:.2f}s, model + vocoder load {loaded - imported:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
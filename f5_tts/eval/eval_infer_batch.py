@@ -18,6 +18,7 @@ from f5_tts.eval.utils_eval import (
     get_seedtts_testset_metainfo,
 )
 from f5_tts.infer.utils_infer import load_checkpoint, load_vocoder
+from f5_tts.infer.vocoder import batch_decode
 from f5_tts.model import CFM, DiT, UNetT
 from f5_tts.model.utils import get_tokenizer
 
@@ -54,6 +55,7 @@ def main():
     parser.add_argument("-ss", "--swaysampling", default=-1, type=float)
 
     parser.add_argument("-t", "--testset", required=True)
+    parser.add_argument("-vt", "--vocoder_tile_frames", default=None, type=int)
 
     args = parser.parse_args()
 
@@ -132,7 +134,9 @@ def main():
         vocoder_local_path = "../checkpoints/charactr/vocos-mel-24khz"
     elif mel_spec_type == "bigvgan":
         vocoder_local_path = "../checkpoints/bigvgan_v2_24khz_100band_256x"
-    vocoder = load_vocoder(vocoder_name=mel_spec_type, is_local=local, local_path=vocoder_local_path)
+    vocoder = load_vocoder(
+        vocoder_name=mel_spec_type, is_local=local, local_path=vocoder_local_path, tile_frames=args.vocoder_tile_frames
+    )
 
     # Tokenizer
     vocab_char_map, vocab_size = get_tokenizer(dataset_name, tokenizer)
@@ -184,15 +188,14 @@ def main():
                     no_ref_audio=no_ref_audio,
                     seed=seed,
                 )
-                # Final result
-                for i, gen in enumerate(generated):
-                    gen = gen[ref_mel_lens[i] : total_mel_lens[i], :].unsqueeze(0)
-                    gen_mel_spec = gen.permute(0, 2, 1).to(torch.float32)
-                    if mel_spec_type == "vocos":
-                        generated_wave = vocoder.decode(gen_mel_spec).cpu()
-                    elif mel_spec_type == "bigvgan":
-                        generated_wave = vocoder(gen_mel_spec).squeeze(0).cpu()
-
+                # Final result, whole batch vocoded in one call
+                gen_mel_specs = [
+                    gen[ref_mel_lens[i] : total_mel_lens[i], :].permute(1, 0).to(torch.float32)
+                    for i, gen in enumerate(generated)
+                ]
+                generated_waves = batch_decode(vocoder, gen_mel_specs, hop_length=hop_length)
+                for i, generated_wave in enumerate(generated_waves):
+                    generated_wave = generated_wave.unsqueeze(0).cpu()
                     if ref_rms_list[i] < target_rms:
                         generated_wave = generated_wave * ref_rms_list[i] / target_rms
                     torchaudio.save(f"{output_dir}/{utts[i]}.wav", generated_wave, target_sample_rate)
@@ -11,7 +11,7 @@ from tqdm import tqdm
 
 from f5_tts.eval.ecapa_tdnn import ECAPA_TDNN_SMALL
 from f5_tts.model.modules import MelSpec
-from f5_tts.model.utils import convert_char_to_pinyin
+from f5_tts.model.utils import convert_char_to_pinyin, resample
 
 
 # seedtts testset metainfo: utt, prompt_text, prompt_wav, gt_text, gt_wav
@@ -93,7 +93,7 @@ def get_inference_prompt(
     max_tokens = max_secs * target_sample_rate // hop_length
 
     batch_accum = [0] * num_buckets
-    utts, ref_rms_list, ref_mels, ref_mel_lens, total_mel_lens, final_text_list = (
+    utts, ref_rms_list, ref_audios, ref_mel_lens, total_mel_lens, final_text_list = (
         [[] for _ in range(num_buckets)] for _ in range(6)
     )
 
@@ -113,9 +113,7 @@ def get_inference_prompt(
         if ref_rms < target_rms:
             ref_audio = ref_audio * target_rms / ref_rms
         assert ref_audio.shape[-1] > 5000, f"Empty prompt wav: {prompt_wav}, or torchaudio backend issue."
-        if ref_sr != target_sample_rate:
-            resampler = torchaudio.transforms.Resample(ref_sr, target_sample_rate)
-            ref_audio = resampler(ref_audio)
+        ref_audio = resample(ref_audio, ref_sr, target_sample_rate)
 
         # Text
         if len(prompt_text[-1].encode("utf-8")) == 1:
@@ -130,9 +128,7 @@ def get_inference_prompt(
         ref_mel_len = ref_audio.shape[-1] // hop_length
         if use_truth_duration:
             gt_audio, gt_sr = torchaudio.load(gt_wav)
-            if gt_sr != target_sample_rate:
-                resampler = torchaudio.transforms.Resample(gt_sr, target_sample_rate)
-                gt_audio = resampler(gt_audio)
+            gt_audio = resample(gt_audio, gt_sr, target_sample_rate)
             total_mel_len = ref_mel_len + int(gt_audio.shape[-1] / hop_length / speed)
 
             # # test vocoder resynthesis
@@ -142,10 +138,6 @@ def get_inference_prompt(
             gen_text_len = len(gt_text.encode("utf-8"))
             total_mel_len = ref_mel_len + int(ref_mel_len / ref_text_len * gen_text_len / speed)
 
-        # to mel spectrogram
-        ref_mel = mel_spectrogram(ref_audio)
-        ref_mel = ref_mel.squeeze(0)
-
         # deal with batch
         assert infer_batch_size > 0, "infer_batch_size should be greater than 0."
         assert (
@@ -155,7 +147,7 @@ def get_inference_prompt(
 
         utts[bucket_i].append(utt)
         ref_rms_list[bucket_i].append(ref_rms)
-        ref_mels[bucket_i].append(ref_mel)
+        ref_audios[bucket_i].append(ref_audio)  # mels computed per batch, in one call
         ref_mel_lens[bucket_i].append(ref_mel_len)
         total_mel_lens[bucket_i].append(total_mel_len)
         final_text_list[bucket_i].extend(text_list)
@@ -163,12 +155,12 @@ def get_inference_prompt(
         batch_accum[bucket_i] += total_mel_len
 
         if batch_accum[bucket_i] >= infer_batch_size:
-            # print(f"\n{len(ref_mels[bucket_i][0][0])}\n{ref_mel_lens[bucket_i]}\n{total_mel_lens[bucket_i]}")
+            # print(f"\n{len(ref_audios[bucket_i][0][0])}\n{ref_mel_lens[bucket_i]}\n{total_mel_lens[bucket_i]}")
             prompts_all.append(
                 (
                     utts[bucket_i],
                     ref_rms_list[bucket_i],
-                    padded_mel_batch(ref_mels[bucket_i]),
+                    mel_spectrogram.batch(ref_audios[bucket_i], pad_value=0)[0].permute(0, 2, 1),
                     ref_mel_lens[bucket_i],
                     total_mel_lens[bucket_i],
                     final_text_list[bucket_i],
@@ -178,7 +170,7 @@ def get_inference_prompt(
             (
                 utts[bucket_i],
                 ref_rms_list[bucket_i],
-                ref_mels[bucket_i],
+                ref_audios[bucket_i],
                 ref_mel_lens[bucket_i],
                 total_mel_lens[bucket_i],
                 final_text_list[bucket_i],
@@ -191,7 +183,7 @@ def get_inference_prompt(
                 (
                     utts[bucket_i],
                     ref_rms_list[bucket_i],
-                    padded_mel_batch(ref_mels[bucket_i]),
+                    mel_spectrogram.batch(ref_audios[bucket_i], pad_value=0)[0].permute(0, 2, 1),
                     ref_mel_lens[bucket_i],
                     total_mel_lens[bucket_i],
                     final_text_list[bucket_i],
@@ -394,10 +386,8 @@ def run_sim(args):
         wav1, sr1 = torchaudio.load(wav1)
         wav2, sr2 = torchaudio.load(wav2)
 
-        resample1 = torchaudio.transforms.Resample(orig_freq=sr1, new_freq=16000)
-        resample2 = torchaudio.transforms.Resample(orig_freq=sr2, new_freq=16000)
-        wav1 = resample1(wav1)
-        wav2 = resample2(wav2)
+        wav1 = resample(wav1, sr1, 16000)
+        wav2 = resample(wav2, sr2, 16000)
 
         if use_gpu:
             wav1 = wav1.cuda(device)
@@ -0,0 +1,28 @@
+# Cache files shared by concurrent workers (voice profiles, converted checkpoints, model manifest):
+# each writer gets its own temp file in the target directory, renamed over the target once complete
+
+from __future__ import annotations
+
+import contextlib
+import os
+import tempfile
+
+
+@contextlib.contextmanager
+def atomic_output(path):
+    """
+    with atomic_output(path) as tmp_path: write tmp_path
+    tmp_path is unique per call, on the same filesystem as path, moved onto path with os.replace() on success
+    and removed on failure. Readers see either the previous file or the complete new one.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600, cache files are read by other workers
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,141 @@
+# Compiled inference: DiT backbone and vocoder through torch.compile (inductor, triton on cuda, c++ on cpu)
+# chunk durations depend on the text, so sequences are padded up to a few duration buckets with the padding masked out,
+# each bucket is compiled once at startup (warmup) and the generated code kept in a persistent cache directory,
+# later cold starts load it from there instead of compiling again
+
+from __future__ import annotations
+
+import math
+import os
+import time
+
+import torch
+
+from f5_tts.infer.utils_infer import (
+    cfg_strength,
+    duration_buckets,
+    hop_length,
+    nfe_step,
+    sway_sampling_coef,
+    vocoder_buckets,
+)
+from f5_tts.infer.vocoder import BucketedVocoder
+from f5_tts.model.utils import convert_char_to_pinyin
+
+COMPILE_CACHE_ENV = "TORCHINDUCTOR_CACHE_DIR"
+
+
+def set_compile_cache_dir(cache_dir=None):
+    # inductor / triton artifacts and the fx graph cache, shared by later processes
+    cache_dir = (
+        cache_dir
+        or os.environ.get(COMPILE_CACHE_ENV)
+        or os.path.join(os.path.expanduser("~"), ".cache", "f5_tts", "inductor")
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ[COMPILE_CACHE_ENV] = cache_dir
+
+    import torch._inductor.config as inductor_config
+
+    inductor_config.fx_graph_cache = True
+    return cache_dir
+
+
+def compile_counters():
+    # process wide: frames compiled by dynamo (first compiles and recompiles), distinct graphs
+    from torch._dynamo.utils import counters
+
+    return dict(compiles=counters["frames"]["ok"], graphs=counters["stats"]["unique_graphs"])
+
+
+def enable_compile(model, vocoder=None, buckets=duration_buckets, vocoder_buckets=vocoder_buckets, cache_dir=None):
+    """
+    Compile the backbone of a CFM model in place, sample() then pads sequences up to buckets.
+    Returns the vocoder to use instead of the given one: compiled and padding mels up to vocoder_buckets.
+    Graphs are static per (bucket, batch size, nfe steps), warmup() compiles those of the serving config.
+    """
+    set_compile_cache_dir(cache_dir)
+    # one graph per bucket and batch size, above the default limit of recompiles per function
+    limit = 4 * (len(buckets) + len(vocoder_buckets))
+    torch._dynamo.config.cache_size_limit = max(torch._dynamo.config.cache_size_limit, limit)
+
+    model.duration_buckets = sorted(buckets)
+    model.transformer.compile(dynamic=False)
+    if vocoder is None:
+        return None
+
+    if hasattr(vocoder, "backbone"):  # vocos, the istft head works on complex tensors, left eager
+        backbone = torch.compile(vocoder.backbone, dynamic=False)
+
+        def decode(mel):
+            return vocoder.head(backbone(mel))
+
+    else:  # bigvgan
+        compiled_vocoder = torch.compile(vocoder, dynamic=False)
+
+        def decode(mel):
+            return compiled_vocoder(mel).squeeze(1)
+
+    return BucketedVocoder(vocoder, vocoder_buckets, hop_length=hop_length, decode_fn=decode)
+
+
+def _timed(fn, device):
+    if str(device).startswith("cuda"):
+        torch.cuda.synchronize(device)
+    start = time.perf_counter()
+    with torch.inference_mode():
+        fn()
+    if str(device).startswith("cuda"):
+        torch.cuda.synchronize(device)
+    return time.perf_counter() - start
+
+
+def warmup(model, vocoder=None, **sample_kwargs):
+    """
+    Run each duration bucket twice: the first call compiles it (or loads it from the cache), the second is timed.
+    sample_kwargs must match the serving config (steps, cfg, fused_cfg, ...), the graphs depend on them.
+    Returns {"dit" | "vocoder": {bucket: dict(first_seconds, seconds, compiles)}}.
+    """
+    sample_kwargs = dict(
+        dict(steps=nfe_step, cfg_strength=cfg_strength, sway_sampling_coef=sway_sampling_coef, cache_modulation=True),
+        **sample_kwargs,
+    )
+    device = model.device
+    text = convert_char_to_pinyin(["Warm up."])
+    stats = dict(dit={}, vocoder={})
+
+    for bucket in model.duration_buckets:
+        cond = torch.zeros(1, bucket // 2, model.num_channels, device=device)
+
+        def sample():
+            model.sample(cond=cond, text=text, duration=bucket, **sample_kwargs)
+
+        before = compile_counters()["compiles"]
+        first_seconds = _timed(sample, device)
+        compiles = compile_counters()["compiles"] - before
+        stats["dit"][bucket] = dict(first_seconds=first_seconds, seconds=_timed(sample, device), compiles=compiles)
+
+    if isinstance(vocoder, BucketedVocoder):
+        for bucket in vocoder.buckets:
+            mel = torch.full((1, model.num_channels, bucket), math.log(1e-5), device=device)
+
+            def decode():
+                vocoder.decode(mel)
+
+            before = compile_counters()["compiles"]
+            first_seconds = _timed(decode, device)
+            compiles = compile_counters()["compiles"] - before
+            seconds = _timed(decode, device)
+            stats["vocoder"][bucket] = dict(first_seconds=first_seconds, seconds=seconds, compiles=compiles)
+
+    return stats
+
+
+def print_compile_stats(stats):
+    print(f"{'stage':<8} {'bucket':>6} {'compiles':>8} {'first (s)':>10} {'latency (s)':>12}")
+    for stage, buckets in stats.items():
+        for bucket, bucket_stats in buckets.items():
+            print(
+                f"{stage:<8} {bucket:>6} {bucket_stats['compiles']:>8} "
+                f"{bucket_stats['first_seconds']:>10.2f} {bucket_stats['seconds']:>12.3f}"
+            )
@@ -9,13 +9,15 @@ from pathlib import Path
 import numpy as np
 import soundfile as sf
 import tomli
-from cached_path import cached_path
 from omegaconf import OmegaConf
 
+from f5_tts.infer.resolver import resolve_model_file
+from f5_tts.infer.silence import compress_silence
 from f5_tts.infer.utils_infer import (
     mel_spec_type,
     target_rms,
     cross_fade_duration,
+    ode_method,
     nfe_step,
     cfg_strength,
     sway_sampling_coef,
@@ -25,7 +27,6 @@ from f5_tts.infer.utils_infer import (
     load_model,
     load_vocoder,
     preprocess_ref_audio_text,
-    remove_silence_for_generated_wav,
 )
 from f5_tts.model import DiT, UNetT
 
@@ -127,6 +128,17 @@ parser.add_argument(
     choices=["vocos", "bigvgan"],
     help=f"Used vocoder name: vocos | bigvgan, default {mel_spec_type}",
 )
+parser.add_argument(
+    "--dtype",
+    type=str,
+    choices=["auto", "fp32", "fp16", "bf16"],
+    help="Model dtype, default auto: fp16 on cuda, bf16 on cpus with native bf16 support, fp32 otherwise",
+)
+parser.add_argument(
+    "--slim_checkpoint",
+    action="store_true",
+    help="Convert a .pt training checkpoint once to a slim safetensors copy next to it, faster later loads",
+)
 parser.add_argument(
     "--target_rms",
     type=float,
@@ -137,6 +149,12 @@ parser.add_argument(
     type=float,
     help=f"Duration of cross-fade between audio segments in seconds, default {cross_fade_duration}",
 )
+parser.add_argument(
+    "--ode_method",
+    type=str,
+    choices=["euler", "midpoint", "heun", "adams2", "adams3", "dpmpp_2m"],
+    help=f"The ODE solver used for sampling, default {ode_method}",
+)
 parser.add_argument(
     "--nfe_step",
     type=int,
@@ -196,8 +214,11 @@ remove_silence = args.remove_silence or config.get("remove_silence", False)
 load_vocoder_from_local = args.load_vocoder_from_local or config.get("load_vocoder_from_local", False)
 
 vocoder_name = args.vocoder_name or config.get("vocoder_name", mel_spec_type)
+dtype = args.dtype or config.get("dtype", "auto")
+slim_checkpoint = args.slim_checkpoint or config.get("slim_checkpoint", False)
 target_rms = args.target_rms or config.get("target_rms", target_rms)
 cross_fade_duration = args.cross_fade_duration or config.get("cross_fade_duration", cross_fade_duration)
+ode_method = args.ode_method or config.get("ode_method", ode_method)
 nfe_step = args.nfe_step or config.get("nfe_step", nfe_step)
 cfg_strength = args.cfg_strength or config.get("cfg_strength", cfg_strength)
 sway_sampling_coef = args.sway_sampling_coef or config.get("sway_sampling_coef", sway_sampling_coef)
@@ -253,14 +274,14 @@ if model == "F5-TTS":
             repo_name = "F5-TTS"
             exp_name = "F5TTS_Base"
             ckpt_step = 1200000
-            ckpt_file = str(cached_path(f"hf://SWivid/{repo_name}/{exp_name}/model_{ckpt_step}.safetensors"))
+            ckpt_file = resolve_model_file(f"hf://SWivid/{repo_name}/{exp_name}/model_{ckpt_step}.safetensors")
             # ckpt_file = f"ckpts/{exp_name}/model_{ckpt_step}.pt"  # .pt | .safetensors; local path
             # ckpt_file = f"ckpts/{exp_name}/model_last.pt"  # .pt | .safetensors; local path
         elif vocoder_name == "bigvgan":
             repo_name = "F5-TTS"
             exp_name = "F5TTS_Base_bigvgan"
             ckpt_step = 1250000
-            ckpt_file = str(cached_path(f"hf://SWivid/{repo_name}/{exp_name}/model_{ckpt_step}.pt"))
+            ckpt_file = resolve_model_file(f"hf://SWivid/{repo_name}/{exp_name}/model_{ckpt_step}.pt")
 
 elif model == "E2-TTS":
     assert args.model_cfg is None, "E2-TTS does not support custom model_cfg yet"
@@ -271,11 +292,19 @@ elif model == "E2-TTS":
         repo_name = "E2-TTS"
         exp_name = "E2TTS_Base"
         ckpt_step = 1200000
-        ckpt_file = str(cached_path(f"hf://SWivid/{repo_name}/{exp_name}/model_{ckpt_step}.safetensors"))
+        ckpt_file = resolve_model_file(f"hf://SWivid/{repo_name}/{exp_name}/model_{ckpt_step}.safetensors")
         # ckpt_file = f"ckpts/{exp_name}/model_{ckpt_step}.pt"  # .pt | .safetensors; local path
 
 print(f"Using {model}...")
-ema_model = load_model(model_cls, model_cfg, ckpt_file, mel_spec_type=vocoder_name, vocab_file=vocab_file)
+ema_model = load_model(
+    model_cls,
+    model_cfg,
+    ckpt_file,
+    mel_spec_type=vocoder_name,
+    vocab_file=vocab_file,
+    slim=slim_checkpoint,
+    dtype=dtype,
+)
 
 
 # inference process
@@ -294,7 +323,8 @@ def main():
         voices[voice]["ref_audio"], voices[voice]["ref_text"] = preprocess_ref_audio_text(
             voices[voice]["ref_audio"], voices[voice]["ref_text"]
         )
-        print("ref_audio_", voices[voice]["ref_audio"], "\n\n")
+        wave, sr = voices[voice]["ref_audio"]
+        print("ref_audio_", f"{wave.shape[-1] / sr:.2f}s", "\n\n")
 
     generated_audio_segments = []
     reg1 = r"(?=\[\w+\])"
@@ -328,6 +358,7 @@ def main():
             cross_fade_duration=cross_fade_duration,
             nfe_step=nfe_step,
             cfg_strength=cfg_strength,
+            ode_method=ode_method,
             sway_sampling_coef=sway_sampling_coef,
             speed=speed,
             fix_duration=fix_duration,
@@ -349,12 +380,11 @@ def main():
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        with open(wave_path, "wb") as f:
-            sf.write(f.name, final_wave, final_sample_rate)
-            # Remove silence
-            if remove_silence:
-                remove_silence_for_generated_wav(f.name)
-            print(f.name)
+        # Remove silence
+        if remove_silence:
+            final_wave = compress_silence(final_wave, final_sample_rate)
+        sf.write(wave_path, final_wave, final_sample_rate)
+        print(wave_path)
 
 
 if __name__ == "__main__":
@@ -3,16 +3,12 @@
 
 import json
 import re
-import tempfile
 from collections import OrderedDict
 from importlib.resources import files
 
 import click
 import gradio as gr
 import numpy as np
-import soundfile as sf
-import torchaudio
-from cached_path import cached_path
 from transformers import AutoModelForCausalLM, AutoTokenizer
 
 try:
@@ -31,13 +27,14 @@ def gpu_decorator(func):
 
 
 from f5_tts.model import DiT, UNetT
+from f5_tts.infer.resolver import resolve_model_file
+from f5_tts.infer.silence import compress_silence
 from f5_tts.infer.utils_infer import (
     load_vocoder,
     load_model,
     preprocess_ref_audio_text,
     infer_process,
-    remove_silence_for_generated_wav,
-    save_spectrogram,
+    render_spectrogram,
 )
 
 
@@ -56,12 +53,14 @@ DEFAULT_TTS_MODEL_CFG = [
 vocoder = load_vocoder()
 
 
-def load_f5tts(ckpt_path=str(cached_path("hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors"))):
+def load_f5tts(ckpt_path="hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors"):
+    ckpt_path = resolve_model_file(ckpt_path)
     F5TTS_model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
     return load_model(DiT, F5TTS_model_cfg, ckpt_path)
 
 
-def load_e2tts(ckpt_path=str(cached_path("hf://SWivid/E2-TTS/E2TTS_Base/model_1200000.safetensors"))):
+def load_e2tts(ckpt_path="hf://SWivid/E2-TTS/E2TTS_Base/model_1200000.safetensors"):
+    ckpt_path = resolve_model_file(ckpt_path)
     E2TTS_model_cfg = dict(dim=1024, depth=24, heads=16, ff_mult=4)
     return load_model(UNetT, E2TTS_model_cfg, ckpt_path)
 
@@ -69,9 +68,9 @@ def load_e2tts(ckpt_path=str(cached_path("hf://SWivid/E2-TTS/E2TTS_Base/model_12
 def load_custom(ckpt_path: str, vocab_path="", model_cfg=None):
     ckpt_path, vocab_path = ckpt_path.strip(), vocab_path.strip()
     if ckpt_path.startswith("hf://"):
-        ckpt_path = str(cached_path(ckpt_path))
+        ckpt_path = resolve_model_file(ckpt_path)
     if vocab_path.startswith("hf://"):
-        vocab_path = str(cached_path(vocab_path))
+        vocab_path = resolve_model_file(vocab_path)
     if model_cfg is None:
         model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
     return load_model(DiT, model_cfg, ckpt_path, vocab_file=vocab_path)
@@ -162,18 +161,12 @@ def infer(
 
     # Remove silence
     if remove_silence:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
-            sf.write(f.name, final_wave, final_sample_rate)
-            remove_silence_for_generated_wav(f.name)
-            final_wave, _ = torchaudio.load(f.name)
-        final_wave = final_wave.squeeze().cpu().numpy()
-
-    # Save the spectrogram
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp_spectrogram:
-        spectrogram_path = tmp_spectrogram.name
-        save_spectrogram(combined_spectrogram, spectrogram_path)
-
-    return (final_sample_rate, final_wave), spectrogram_path, ref_text
+        final_wave = compress_silence(final_wave, final_sample_rate)
+
+    # Render the spectrogram, gr.Image takes the array directly
+    spectrogram = render_spectrogram(combined_spectrogram)
+
+    return (final_sample_rate, final_wave), spectrogram, ref_text
 
 
 with gr.Blocks() as app_credits:
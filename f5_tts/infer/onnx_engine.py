@@ -0,0 +1,244 @@
+# ONNX Runtime inference over the graphs written by onnx_export.py, same infer() contract as F5TTS
+# front end (reference audio preprocessing, mel, text chunking and tokens) is the torch one, the euler ode loop,
+# classifier-free guidance and the inverse stft of vocos run in numpy around the ORT sessions
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+
+import numpy as np
+import soundfile as sf
+import torch
+import tqdm
+
+from f5_tts.infer.onnx_export import ONNX_ARRAYS, ONNX_CONFIG, ONNX_FILES, ONNX_VOCAB
+from f5_tts.infer.silence import compress_silence
+from f5_tts.infer.utils_infer import (
+    _prepare_chunks,
+    chunk_silence_duration,
+    chunk_text,
+    preprocess_ref_audio_text,
+    save_spectrogram,
+)
+from f5_tts.infer.voice_profile import VoiceProfile
+from f5_tts.model.modules import MelSpec
+from f5_tts.model.utils import get_tokenizer, list_str_to_idx
+
+
+class OrtF5TTS:
+    def __init__(
+        self,
+        onnx_dir,  # output_dir of onnx_export.py
+        providers=("CPUExecutionProvider",),
+        num_threads=0,  # ORT intra-op threads, 0: ORT default
+    ):
+        import onnxruntime as ort
+
+        with open(os.path.join(onnx_dir, ONNX_CONFIG), encoding="utf-8") as f:
+            self.config = json.load(f)
+        arrays = np.load(os.path.join(onnx_dir, ONNX_ARRAYS))
+        self.rope, self.window = arrays["rope"], arrays["window"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.sessions = {
+            name: ort.InferenceSession(os.path.join(onnx_dir, file), options, providers=list(providers))
+            for name, file in ONNX_FILES.items()
+        }
+
+        self.vocab_char_map, _ = get_tokenizer(os.path.join(onnx_dir, ONNX_VOCAB), "custom")
+        self.mel_spec = MelSpec(
+            n_fft=self.config["n_fft"],
+            hop_length=self.config["hop_length"],
+            win_length=self.config["win_length"],
+            n_mel_channels=self.config["n_mel_channels"],
+            target_sample_rate=self.config["target_sample_rate"],
+            mel_spec_type=self.config["mel_spec_type"],
+        )
+        self.target_sample_rate = self.config["target_sample_rate"]
+        self.hop_length = self.config["hop_length"]
+        self.num_channels = self.config["n_mel_channels"]
+        self.mel_spec_type = self.config["mel_spec_type"]
+        self.device = "cpu"
+        self.seed = -1
+        self.infer_stats = []  # per chunk ode steps / nfe of the last infer call
+
+    def export_wav(self, wav, file_wave, remove_silence=False):
+        if remove_silence:
+            wav = compress_silence(wav, self.target_sample_rate)
+        sf.write(file_wave, wav, self.target_sample_rate)
+
+    def export_spectrogram(self, spect, file_spect):
+        save_spectrogram(spect, file_spect)
+
+    def sample(
+        self,
+        cond,  # float32 (n, d) reference mel
+        text,  # tokens of reference + generated text, from convert_char_to_pinyin()
+        duration,
+        steps=32,
+        cfg_strength=2.0,
+        sway_sampling_coef=-1.0,
+        seed=None,
+        noise=None,  # float32 (duration, d) y0, e.g. the torch one for parity checks, default drawn from seed
+        step_callback=None,
+    ):
+        # numpy counterpart of CFM.sample() with the euler method for one chunk, returns float32 (duration, d)
+        cond_len = cond.shape[0]
+        text = list_str_to_idx([text], self.vocab_char_map).numpy()[0]
+        duration = min(max(max(len(text), cond_len) + 1, duration), self.config["max_frames"])
+
+        step_cond = np.zeros((duration, self.num_channels), dtype=np.float32)
+        step_cond[:cond_len] = cond
+        tokens = np.full(duration, -1, dtype=np.int64)  # -1 filler, the graph expects text padded to the frames
+        tokens[: min(len(text), duration)] = text[:duration]
+
+        # cond and null branches stacked along batch, their context computed once per chunk
+        branches = 2 if cfg_strength >= 1e-5 else 1
+        (cond_embed,) = self.sessions["context"].run(
+            None,
+            dict(
+                cond=np.repeat(step_cond[None], branches, axis=0),
+                text=np.repeat(tokens[None], branches, axis=0),
+                drop=np.arange(branches) >= 1,
+            ),
+        )
+        rope = np.ascontiguousarray(self.rope[..., :duration, :])
+
+        if noise is None:
+            noise = np.random.default_rng(seed).standard_normal((duration, self.num_channels), dtype=np.float32)
+        x = noise[None].astype(np.float32)
+        t = np.linspace(0, 1, steps + 1, dtype=np.float32)
+        if sway_sampling_coef is not None:
+            t = t + sway_sampling_coef * (np.cos(np.pi / 2 * t) - 1 + t)
+
+        for i in range(steps):
+            inputs = dict(
+                x=np.repeat(x, branches, axis=0),
+                cond_embed=cond_embed,
+                rope=rope,
+                time=np.full(branches, t[i], dtype=np.float32),
+            )
+            (flow,) = self.sessions["step"].run(None, inputs)
+            if branches == 2:
+                flow = flow[:1] + (flow[:1] - flow[1:]) * cfg_strength
+            x = x + (t[i + 1] - t[i]) * flow
+            if step_callback is not None:
+                step_callback(i + 1, steps)
+
+        out = x[0]
+        out[:cond_len] = cond
+        return out
+
+    def istft(self, real, imag):
+        # vocos ISTFT in numpy, window overlap-add normalized by the window envelope, win_length == n_fft
+        n_fft, hop, win, padding = (self.config["istft"][k] for k in ("n_fft", "hop_length", "win_length", "padding"))
+        assert win == n_fft and win % hop == 0
+        frames = np.fft.irfft(real + 1j * imag, n=n_fft, axis=1).astype(np.float32) * self.window[None, :, None]
+
+        # frame i covers hops [i, i + r), hops are accumulated per offset within the frame
+        batch, _, num_frames = frames.shape
+        r = win // hop
+        frames = frames.transpose(0, 2, 1).reshape(batch, num_frames, r, hop)
+        square = np.square(self.window).reshape(r, hop)
+        y = np.zeros((batch, num_frames + r - 1, hop), dtype=np.float32)
+        envelope = np.zeros((num_frames + r - 1, hop), dtype=np.float32)
+        for j in range(r):
+            y[:, j : j + num_frames] += frames[:, :, j]
+            envelope[j : j + num_frames] += square[j]
+
+        pad = (win - hop) // 2 if padding == "same" else n_fft // 2
+        y = y.reshape(batch, -1)[:, pad:-pad]
+        envelope = envelope.reshape(-1)[pad:-pad]
+        return y / envelope
+
+    def vocode(self, mel):  # float32 (b, d, n) -> (b, nw)
+        real, imag = self.sessions["vocos"].run(None, dict(mel=mel.astype(np.float32)))
+        return self.istft(real, imag)
+
+    def infer(
+        self,
+        ref_file,  # path, encoded bytes, (wave, sr), or VoiceProfile
+        ref_text,
+        gen_text,
+        show_info=print,
+        progress=tqdm,
+        target_rms=0.1,
+        cross_fade_duration=0.15,
+        sway_sampling_coef=-1,
+        cfg_strength=2,
+        nfe_step=32,
+        speed=1.0,
+        fix_duration=None,
+        remove_silence=False,
+        file_wave=None,
+        file_spect=None,
+        seed=-1,
+        progress_callback=None,
+        step_callback=None,  # step_callback(step, total) after each ode step of a chunk, raise inside to cancel
+    ):
+        if seed == -1:
+            seed = random.randint(0, sys.maxsize)
+        self.seed = seed
+        self.infer_stats = []
+
+        if isinstance(ref_file, VoiceProfile):
+            ref_text = ref_file.ref_text
+            audio, sr = ref_file.audio, self.target_sample_rate
+        else:
+            ref_file, ref_text = preprocess_ref_audio_text(ref_file, ref_text, show_info=show_info, device="cpu")
+            audio, sr = ref_file
+        max_chars = int(len(ref_text.encode("utf-8")) / (audio.shape[-1] / sr) * (25 - audio.shape[-1] / sr))
+        gen_text_batches = chunk_text(gen_text, max_chars=max_chars)
+        show_info(f"Generating audio in {len(gen_text_batches)} batches...")
+
+        audio, rms, ref_audio_len, final_text_list, durations = _prepare_chunks(
+            ref_file, ref_text, gen_text_batches, target_rms, speed, fix_duration, "cpu"
+        )
+        with torch.inference_mode():
+            cond = self.mel_spec(audio).permute(0, 2, 1) if audio.ndim == 2 else audio
+        cond = cond[0].float().numpy()
+
+        generated_waves, spectrograms = [], []
+        total = len(final_text_list)
+        for i, (text, duration) in enumerate(zip(final_text_list, durations)):
+            if progress_callback:
+                progress_callback(i + 1, total)
+            else:
+                print(f"Processing batch {i + 1}/{total}", end="\r")
+
+            generated = self.sample(
+                cond,
+                text,
+                duration,
+                steps=nfe_step,
+                cfg_strength=cfg_strength,
+                sway_sampling_coef=sway_sampling_coef,
+                seed=seed,
+                step_callback=step_callback,
+            )
+            self.infer_stats.append(dict(chunk=i, steps=nfe_step, nfe=nfe_step))
+            mel = generated[ref_audio_len:].T[None]  # 1 d n
+            wave = self.vocode(mel)[0]
+            if rms < target_rms:
+                wave = wave * float(rms) / target_rms
+            generated_waves.append(wave)
+            spectrograms.append(mel[0])
+
+        # chunks joined with a fixed silence, as infer_batch_process()
+        silence = np.zeros(int(chunk_silence_duration * self.target_sample_rate), dtype=np.float32)
+        wav = np.concatenate([w for i, wave in enumerate(generated_waves) for w in ([silence, wave] if i else [wave])])
+        spect = np.concatenate(spectrograms, axis=1)
+
+        if file_wave is not None:
+            self.export_wav(wav, file_wave, remove_silence)
+
+        if file_spect is not None:
+            self.export_spectrogram(spect, file_spect)
+
+        return wav, self.target_sample_rate, spect
@@ -0,0 +1,172 @@
+# Export the DiT backbone and the Vocos decoder to ONNX, for OrtF5TTS (onnx_engine.py)
+# context.onnx: step-invariant context (text embedding, cond & text input projection), once per chunk
+# step.onnx: one flow evaluation given x, the context, rope and the time step
+# vocos.onnx: mel -> complex spectrum (real, imag), the inverse stft runs in numpy (complex ops do not export)
+# all with dynamic batch / frame axes
+# python -m f5_tts.infer.onnx_export --ckpt_file model_last.pt --vocab_file vocab.txt --output_dir ckpts/onnx
+
+from __future__ import annotations
+
+import argparse
+import inspect
+import json
+import os
+import shutil
+from importlib.resources import files
+
+import numpy as np
+import torch
+from torch import nn
+
+ONNX_FILES = dict(context="context.onnx", step="step.onnx", vocos="vocos.onnx")
+ONNX_CONFIG = "config.json"
+ONNX_ARRAYS = "arrays.npz"  # rope table, istft window
+ONNX_VOCAB = "vocab.txt"
+MAX_FRAMES = 4096  # CFM.sample() max_duration
+
+
+class DiTContext(nn.Module):
+    # prepare_context() of the DiT, text given already padded to the frame count with -1 (filler)
+    def __init__(self, transformer):
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(self, cond, text, drop):  # cond float["b n d"], text int["b n"], drop bool["b"] (null cfg branch)
+        context = self.transformer.prepare_context(cond, text, drop_audio_cond=drop, drop_text=drop)
+        return context["cond_embed"]
+
+
+class DiTStep(nn.Module):
+    # one flow evaluation of the DiT, the step-invariant context and the rope table slice are inputs
+    def __init__(self, transformer):
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(self, x, cond_embed, rope, time):  # x float["b n d"], cond_embed float["b n dim"], time float["b"]
+        context = dict(cond_embed=cond_embed, rope=(rope, None))
+        return self.transformer(
+            x=x, cond=None, text=None, time=time, drop_audio_cond=False, drop_text=False, context=context
+        )
+
+
+class VocosSpectrum(nn.Module):
+    # vocos decode up to the complex spectrum, returned as real / imag parts
+    def __init__(self, vocoder):
+        super().__init__()
+        self.backbone = vocoder.backbone
+        self.out = vocoder.head.out
+
+    def forward(self, mel):  # mel float["b d n"]
+        x = self.out(self.backbone(mel)).transpose(1, 2)
+        mag, phase = x.chunk(2, dim=1)
+        mag = torch.clip(torch.exp(mag), max=1e2)  # same as vocos ISTFTHead
+        return mag * torch.cos(phase), mag * torch.sin(phase)
+
+
+def export_onnx(model, vocoder, output_dir, vocab_file="", opset=17, example_frames=256):
+    """
+    Write context.onnx, step.onnx, vocos.onnx, config.json, arrays.npz and vocab.txt to output_dir.
+    model: fp32 CFM with a DiT backbone on cpu, vocoder: vocos on cpu.
+    """
+    transformer = model.transformer
+    if not hasattr(transformer, "prepare_context"):
+        raise ValueError(f"ONNX export needs a DiT backbone, got {type(transformer).__name__}")
+    if not hasattr(vocoder, "backbone"):
+        raise ValueError("ONNX export supports the vocos vocoder only")
+    model, vocoder = model.float().eval(), vocoder.float().eval()
+    os.makedirs(output_dir, exist_ok=True)
+
+    n, d, dim = example_frames, model.num_channels, transformer.dim
+    rope = transformer.rotary_embed.forward_from_seq_len(MAX_FRAMES)[0]  # sliced to the chunk length by the engine
+    frame_axis = rope.ndim - 2
+    export_kwargs = dict(opset_version=opset, do_constant_folding=True)
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # dynamic_axes graphs of the torchscript exporter, newer torch defaults to dynamo (opset 18+)
+        export_kwargs["dynamo"] = False
+
+    # wrappers built in eval mode, the exporter restores their mode afterwards, recursively into model and vocoder
+    with torch.inference_mode():
+        torch.onnx.export(
+            DiTContext(transformer).eval(),
+            (torch.randn(2, n, d), torch.randint(0, 10, (2, n)), torch.tensor([False, True])),
+            os.path.join(output_dir, ONNX_FILES["context"]),
+            input_names=["cond", "text", "drop"],
+            output_names=["cond_embed"],
+            dynamic_axes=dict(
+                cond={0: "batch", 1: "frames"},
+                text={0: "batch", 1: "frames"},
+                drop={0: "batch"},
+                cond_embed={0: "batch", 1: "frames"},
+            ),
+            **export_kwargs,
+        )
+        torch.onnx.export(
+            DiTStep(transformer).eval(),
+            (torch.randn(2, n, d), torch.randn(2, n, dim), rope.narrow(frame_axis, 0, n), torch.rand(2)),
+            os.path.join(output_dir, ONNX_FILES["step"]),
+            input_names=["x", "cond_embed", "rope", "time"],
+            output_names=["flow"],
+            dynamic_axes=dict(
+                x={0: "batch", 1: "frames"},
+                cond_embed={0: "batch", 1: "frames"},
+                rope={frame_axis: "frames"},
+                time={0: "batch"},
+                flow={0: "batch", 1: "frames"},
+            ),
+            **export_kwargs,
+        )
+        torch.onnx.export(
+            VocosSpectrum(vocoder).eval(),
+            (torch.randn(1, d, n),),
+            os.path.join(output_dir, ONNX_FILES["vocos"]),
+            input_names=["mel"],
+            output_names=["real", "imag"],
+            dynamic_axes=dict(
+                mel={0: "batch", 2: "frames"}, real={0: "batch", 2: "frames"}, imag={0: "batch", 2: "frames"}
+            ),
+            **export_kwargs,
+        )
+
+    istft = vocoder.head.istft
+    mel_spec = model.mel_spec
+    config = dict(
+        target_sample_rate=mel_spec.target_sample_rate,
+        n_mel_channels=mel_spec.n_mel_channels,
+        n_fft=mel_spec.n_fft,
+        hop_length=mel_spec.hop_length,
+        win_length=mel_spec.win_length,
+        mel_spec_type="vocos",
+        max_frames=MAX_FRAMES,
+        istft=dict(n_fft=istft.n_fft, hop_length=istft.hop_length, win_length=istft.win_length, padding=istft.padding),
+        opset=opset,
+    )
+    with open(os.path.join(output_dir, ONNX_CONFIG), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    np.savez(os.path.join(output_dir, ONNX_ARRAYS), rope=rope.float().numpy(), window=istft.window.float().numpy())
+    vocab_file = vocab_file or str(files("f5_tts").joinpath("infer/examples/vocab.txt"))
+    shutil.copyfile(vocab_file, os.path.join(output_dir, ONNX_VOCAB))
+    return output_dir
+
+
+def main():
+    from f5_tts.infer.resolver import resolve_model_file
+    from f5_tts.infer.utils_infer import load_model, load_vocoder
+    from f5_tts.model import DiT
+
+    parser = argparse.ArgumentParser(description="export the F5-TTS DiT and vocos to ONNX")
+    parser.add_argument("--ckpt_file", default="hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors")
+    parser.add_argument("--vocab_file", default="")
+    parser.add_argument("--output_dir", default="ckpts/onnx")
+    parser.add_argument("--opset", default=17, type=int)
+    args = parser.parse_args()
+
+    model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
+    ckpt_file = resolve_model_file(args.ckpt_file)
+    model = load_model(DiT, model_cfg, ckpt_file, vocab_file=args.vocab_file, device="cpu", dtype="fp32")
+    vocoder = load_vocoder("vocos", device="cpu")
+    export_onnx(model, vocoder, args.output_dir, vocab_file=args.vocab_file, opset=args.opset)
+    print(f"ONNX models written to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Dynamic int8 quantization of the backbone linears for CPU inference: weights stored as int8, activations
+# quantized on the fly per call, fp32 accumulation (fbgemm on x86, qnnpack on arm)
+# layers the output is sensitive to stay in float: time mlp, adaln modulation, norms, input / output projections
+
+from __future__ import annotations
+
+import os
+
+import torch
+from torch import nn
+
+from f5_tts.infer.atomic_io import atomic_output
+
+QUANTIZE_MODES = ["int8"]
+
+# substrings of module names kept in float
+# input_embed.proj is also used through weight slices (InputEmbedding.embed_cond), text_embed runs once per call
+KEEP_FLOAT = ("proj_out", "norm", "time_embed", "input_embed", "text_embed")
+
+
+def quantizable_linears(model: nn.Module):
+    # qualified names of the nn.Linear layers to quantize, relative to model
+    return [
+        name
+        for name, module in model.named_modules()
+        if isinstance(module, nn.Linear) and not any(keep in name for keep in KEEP_FLOAT)
+    ]
+
+
+def quantize_model(model, mode="int8"):
+    """
+    Swap the backbone linears of a CFM model (float32, on cpu) for dynamically quantized ones, in place.
+    Also used to rebuild the module structure before loading a cached quantized state dict.
+    """
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode}, expected one of {QUANTIZE_MODES}")
+    from torch.ao.quantization import default_dynamic_qconfig, quantize_dynamic
+
+    qconfig_spec = {name: default_dynamic_qconfig for name in quantizable_linears(model.transformer)}
+    quantize_dynamic(model.transformer, qconfig_spec, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def quantized_checkpoint_path(ckpt_path, mode="int8", use_ema=True):
+    # model_last.pt -> model_last.ema_int8_dynamic.pt (model_last.model_int8_dynamic.pt without ema), same directory
+    return f"{os.path.splitext(ckpt_path)[0]}.{'ema' if use_ema else 'model'}_{mode}_dynamic.pt"
+
+
+def find_quantized_checkpoint(ckpt_path, mode="int8", use_ema=True):
+    quantized_path = quantized_checkpoint_path(ckpt_path, mode, use_ema)
+    if os.path.exists(quantized_path) and os.path.getmtime(quantized_path) >= os.path.getmtime(ckpt_path):
+        return quantized_path
+    return None
+
+
+def save_quantized_checkpoint(model, ckpt_path, mode="int8", use_ema=True):
+    try:
+        with atomic_output(quantized_checkpoint_path(ckpt_path, mode, use_ema)) as tmp_path:
+            torch.save(model.state_dict(), tmp_path)
+    except OSError as e:  # read-only model directory, quantized again on the next start
+        print(f"Could not cache quantized checkpoint next to {ckpt_path}: {e}")
@@ -0,0 +1,102 @@
+# Offline-first model file resolution: a local manifest (uri -> path) is read first, then the local hub cache,
+# the hub is only contacted when a file is really missing, and what gets downloaded is recorded in the manifest
+# manifest: json file at $F5_TTS_MODEL_MANIFEST, default ~/.cache/f5_tts/manifest.json, e.g. baked into an image
+# {"hf://hynt/F5-TTS-Vietnamese-ViVoice/model_last.pt": "/models/model_last.pt", ...}
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+from f5_tts.infer.atomic_io import atomic_output
+
+MANIFEST_ENV = "F5_TTS_MODEL_MANIFEST"
+
+_manifest_lock = threading.Lock()
+
+
+def manifest_path():
+    return os.environ.get(MANIFEST_ENV, os.path.join(os.path.expanduser("~"), ".cache", "f5_tts", "manifest.json"))
+
+
+def load_manifest(path=None):
+    try:
+        with open(path or manifest_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_manifest(uri, local_path, path=None):
+    path = path or manifest_path()
+    with _manifest_lock:
+        manifest = load_manifest(path)
+        if manifest.get(uri) == local_path:
+            return
+        manifest[uri] = local_path
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with atomic_output(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2, ensure_ascii=False)
+        except OSError as e:  # read-only image, resolution still works, only the shortcut is lost
+            print(f"Could not update model manifest {path}: {e}")
+
+
+def _from_manifest(uri):
+    local_path = load_manifest().get(uri)
+    return local_path if local_path and os.path.exists(local_path) else None
+
+
+def _split_hf_uri(uri):
+    # hf://user/repo[@revision]/path/in/repo -> (repo_id, revision, filename)
+    user, repo, filename = uri[len("hf://") :].split("/", 2)
+    repo, _, revision = repo.partition("@")
+    return f"{user}/{repo}", revision or None, filename
+
+
+def resolve_model_file(uri, cache_dir=None):
+    """
+    Local path of a model file given as a local path, "hf://user/repo/file" or any url cached_path accepts.
+    Order: existing local path, manifest entry, local hub cache (no network), download.
+    """
+    if os.path.exists(uri):
+        return uri
+    local_path = _from_manifest(uri)
+    if local_path is not None:
+        return local_path
+
+    if uri.startswith("hf://") and uri.count("/") >= 4:
+        from huggingface_hub import hf_hub_download
+
+        repo_id, revision, filename = _split_hf_uri(uri)
+        try:
+            local_path = hf_hub_download(
+                repo_id, filename, revision=revision, cache_dir=cache_dir, local_files_only=True
+            )
+        except Exception:  # not in the local cache (LocalEntryNotFoundError / offline mode)
+            local_path = hf_hub_download(repo_id, filename, revision=revision, cache_dir=cache_dir)
+    else:
+        from cached_path import cached_path
+
+        local_path = str(cached_path(uri, cache_dir=cache_dir))
+
+    record_manifest(uri, local_path)
+    return local_path
+
+
+def resolve_model_snapshot(repo_id, cache_dir=None):
+    # local directory of a whole hub repo, same order as resolve_model_file
+    uri = f"hf://{repo_id}"
+    local_path = _from_manifest(uri)
+    if local_path is not None:
+        return local_path
+
+    from huggingface_hub import snapshot_download
+
+    try:
+        local_path = snapshot_download(repo_id, cache_dir=cache_dir, local_files_only=True)
+    except Exception:
+        local_path = snapshot_download(repo_id, cache_dir=cache_dir)
+    record_manifest(uri, local_path)
+    return local_path
@@ -0,0 +1,161 @@
+# Vectorised silence detection / trimming on in-memory waves, same thresholds and millisecond semantics as pydub.silence
+# wave: float np.ndarray in [-1, 1], shape (n,) or (channels, n), levels in dBFS, positions and lengths in ms
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def ms_to_samples(ms, sr):
+    # pydub slicing: int(ms * frame_rate / 1000)
+    return (np.asarray(ms, dtype=np.int64) * sr) // 1000
+
+
+def duration_ms(wave, sr):
+    return round(wave.shape[-1] * 1000 / sr)
+
+
+def db_to_amplitude(db):
+    return 10 ** (db / 20)
+
+
+def _energy_cumsum(wave, sr):
+    # cumulative per-sample energy, averaged over channels like pydub's rms over interleaved samples,
+    # zero-extended past the last sample: pydub pads slices ending at the (rounded) ms length with silence
+    power = np.square(wave, dtype=np.float64)
+    if power.ndim == 2:
+        power = power.mean(axis=0)
+    energy = np.concatenate(([0.0], np.cumsum(power)))
+    extra = int(ms_to_samples(duration_ms(wave, sr), sr)) - wave.shape[-1]
+    return np.pad(energy, (0, max(extra, 0)), mode="edge")
+
+
+def _rms(energy, start, end):
+    # rms of samples [start, end) for arrays of bounds, empty slices are 0 (-inf dBFS)
+    # truncated to the 16-bit grid like audioop.rms, so levels right at a threshold compare as in pydub
+    length = end - start
+    rms = np.sqrt(np.where(length > 0, (energy[end] - energy[start]) / np.maximum(length, 1), 0.0))
+    return np.floor(rms * 32768) / 32768
+
+
+def _chunk_rms(wave, sr, chunk_ms):
+    # rms of consecutive chunk_ms slices, the last one possibly shorter
+    len_ms = duration_ms(wave, sr)
+    starts_ms = np.arange(0, len_ms, chunk_ms)
+    start = ms_to_samples(starts_ms, sr)
+    end = ms_to_samples(np.minimum(starts_ms + chunk_ms, len_ms), sr)
+    return starts_ms, _rms(_energy_cumsum(wave, sr), start, end)
+
+
+def slice_ms(wave, sr, start_ms=0, end_ms=None):
+    # wave[start_ms:end_ms] with pydub semantics, ends clamped to the ms length and zero-padded past the last sample
+    len_ms = duration_ms(wave, sr)
+    end_ms = len_ms if end_ms is None else end_ms
+    start, end = ms_to_samples(min(max(start_ms, 0), len_ms), sr), ms_to_samples(min(max(end_ms, 0), len_ms), sr)
+    sliced = wave[..., start:end]
+    if sliced.shape[-1] < end - start:
+        sliced = np.concatenate(
+            (sliced, np.zeros((*wave.shape[:-1], end - start - sliced.shape[-1]), dtype=wave.dtype)), axis=-1
+        )
+    return sliced
+
+
+def detect_leading_silence(wave, sr, silence_threshold=-50.0, chunk_size=10):
+    # ms of silence at the start, in chunk_size steps (pydub.silence.detect_leading_silence)
+    starts_ms, rms = _chunk_rms(wave, sr, chunk_size)
+    loud = np.flatnonzero(rms >= db_to_amplitude(silence_threshold))
+    return int(starts_ms[loud[0]]) if len(loud) else duration_ms(wave, sr)
+
+
+def detect_trailing_silence(wave, sr, silence_threshold=-50.0, chunk_size=1):
+    # ms of silence at the end, a chunk is silent unless strictly louder than the threshold
+    starts_ms, rms = _chunk_rms(wave, sr, chunk_size)
+    loud = np.flatnonzero(rms > db_to_amplitude(silence_threshold))
+    length_ms = duration_ms(wave, sr)
+    return length_ms - min(int(starts_ms[loud[-1]]) + chunk_size, length_ms) if len(loud) else length_ms
+
+
+def trim_silence_edges(wave, sr, silence_threshold=-42):
+    wave = slice_ms(wave, sr, detect_leading_silence(wave, sr, silence_threshold=silence_threshold))
+    # end counted back from the exact (unrounded) duration, 1 ms per silent chunk
+    end_ms = wave.shape[-1] * 1000 // sr - detect_trailing_silence(wave, sr, silence_threshold=silence_threshold)
+    return slice_ms(wave, sr, 0, end_ms)
+
+
+def detect_silence(wave, sr, min_silence_len=1000, silence_thresh=-16, seek_step=1):
+    # [start_ms, end_ms] ranges of silence at least min_silence_len long (pydub.silence.detect_silence)
+    seg_len = duration_ms(wave, sr)
+    if seg_len < min_silence_len:
+        return []
+
+    # rms of every min_silence_len window, windows every seek_step ms plus the last possible one
+    last_slice_start = seg_len - min_silence_len
+    slice_starts = np.arange(0, last_slice_start + 1, seek_step)
+    if last_slice_start % seek_step:
+        slice_starts = np.append(slice_starts, last_slice_start)
+    start = ms_to_samples(slice_starts, sr)
+    end = ms_to_samples(slice_starts + min_silence_len, sr)
+    silence_starts = slice_starts[_rms(_energy_cumsum(wave, sr), start, end) <= db_to_amplitude(silence_thresh)]
+    if len(silence_starts) == 0:
+        return []
+
+    # merge windows into ranges, a new range begins where windows are neither continuous nor overlapping
+    prev, cur = silence_starts[:-1], silence_starts[1:]
+    breaks = np.flatnonzero((cur != prev + seek_step) & (cur > prev + min_silence_len))
+    range_starts = np.concatenate(([silence_starts[0]], cur[breaks]))
+    range_ends = np.concatenate((prev[breaks], [silence_starts[-1]])) + min_silence_len
+    return [[int(s), int(e)] for s, e in zip(range_starts, range_ends)]
+
+
+def detect_nonsilent(wave, sr, min_silence_len=1000, silence_thresh=-16, seek_step=1):
+    silent_ranges = detect_silence(wave, sr, min_silence_len, silence_thresh, seek_step)
+    len_seg = duration_ms(wave, sr)
+    if not silent_ranges:
+        return [[0, len_seg]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == len_seg:
+        return []
+
+    prev_end_i = 0
+    nonsilent_ranges = []
+    for start_i, end_i in silent_ranges:
+        nonsilent_ranges.append([prev_end_i, start_i])
+        prev_end_i = end_i
+    if end_i != len_seg:
+        nonsilent_ranges.append([prev_end_i, len_seg])
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+    return nonsilent_ranges
+
+
+def split_on_silence(wave, sr, min_silence_len=1000, silence_thresh=-16, keep_silence=100, seek_step=1):
+    # non-silent segments with keep_silence ms of margin, overlapping margins split in the middle
+    len_seg = duration_ms(wave, sr)
+    if isinstance(keep_silence, bool):
+        keep_silence = len_seg if keep_silence else 0
+
+    output_ranges = [
+        [start - keep_silence, end + keep_silence]
+        for start, end in detect_nonsilent(wave, sr, min_silence_len, silence_thresh, seek_step)
+    ]
+    for range_i, range_ii in zip(output_ranges, output_ranges[1:]):
+        if range_ii[0] < range_i[1]:
+            range_i[1] = (range_i[1] + range_ii[0]) // 2
+            range_ii[0] = range_i[1]
+
+    return [slice_ms(wave, sr, start, end) for start, end in output_ranges]
+
+
+def compress_silence(wave, sr, min_silence_len=1000, silence_thresh=-50, keep_silence=500, seek_step=10):
+    # long silences shortened to 2 * keep_silence, what remove_silence_for_generated_wav does
+    segments = split_on_silence(wave, sr, min_silence_len, silence_thresh, keep_silence, seek_step)
+    if not segments:
+        return wave[..., :0]
+    return np.concatenate(segments, axis=-1)
+
+
+def audiosegment_to_array(aseg):
+    # pydub AudioSegment (decoded by ffmpeg) to float32 wave, (n,) for mono, (channels, n) otherwise, and sample rate
+    samples = np.array(aseg.get_array_of_samples(), dtype=np.float32) / (1 << (8 * aseg.sample_width - 1))
+    if aseg.channels > 1:
+        samples = samples.reshape(-1, aseg.channels).T
+    return samples, aseg.frame_rate
@@ -0,0 +1,182 @@
+# Slim inference checkpoints: only the (EMA) model weights of a training checkpoint, cast to fp16 / bf16,
+# without optimizer / scheduler state and mel_spec buffers, saved as safetensors next to the original
+# python -m f5_tts.infer.slim_checkpoint model_last.pt --dtype fp16 --benchmark
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import torch
+
+from f5_tts.infer.atomic_io import atomic_output
+
+SLIM_DTYPES = {"fp16": torch.float16, "bf16": torch.bfloat16, "fp32": torch.float32}
+
+# mel_spec buffers saved by older versions, rebuilt by the model, patch for backward compatibility, 305e3ea
+STALE_KEYS = ["initted", "step", "mel_spec.mel_stft.mel_scale.fb", "mel_spec.mel_stft.spectrogram.window"]
+
+
+def dtype_name(dtype):
+    return {v: k for k, v in SLIM_DTYPES.items()}[dtype]
+
+
+def slim_checkpoint_path(ckpt_path, dtype="fp16", use_ema=True):
+    # model_last.pt -> model_last.ema_fp16.safetensors (model_last.model_fp16.safetensors without ema), same directory
+    dtype = dtype if isinstance(dtype, str) else dtype_name(dtype)
+    return f"{os.path.splitext(ckpt_path)[0]}.{'ema' if use_ema else 'model'}_{dtype}.safetensors"
+
+
+def find_slim_checkpoint(ckpt_path, dtype, use_ema=True):
+    # converted sibling of a training checkpoint, only if stored in the dtype the model runs in
+    if ckpt_path.endswith(".safetensors") or dtype not in SLIM_DTYPES.values():
+        return None
+    slim_path = slim_checkpoint_path(ckpt_path, dtype, use_ema)
+    if os.path.exists(slim_path) and os.path.getmtime(slim_path) >= os.path.getmtime(ckpt_path):
+        return slim_path
+    return None
+
+
+def torch_load_mmap(ckpt_path):
+    # memory-mapped on cpu, tensors are only read when touched, legacy (non-zip) checkpoints are read fully
+    try:
+        return torch.load(ckpt_path, map_location="cpu", weights_only=True, mmap=True)
+    except RuntimeError:
+        return torch.load(ckpt_path, map_location="cpu", weights_only=True)
+
+
+def model_state_dict(checkpoint, use_ema=True, from_safetensors=False):
+    # weights of the model from a checkpoint dict, EMA prefix, bookkeeping entries and mel_spec buffers removed
+    if from_safetensors:
+        checkpoint = {"ema_model_state_dict" if use_ema else "model_state_dict": checkpoint}
+    if not use_ema:
+        return {k: v for k, v in checkpoint["model_state_dict"].items() if k not in STALE_KEYS}
+    state_dict = {k.replace("ema_model.", ""): v for k, v in checkpoint["ema_model_state_dict"].items()}
+    return {k: v for k, v in state_dict.items() if k not in STALE_KEYS}
+
+
+def convert_checkpoint(ckpt_path, out_path=None, dtype="fp16", use_ema=True):
+    from safetensors.torch import save_file
+
+    out_path = out_path or slim_checkpoint_path(ckpt_path, dtype, use_ema)
+    if ckpt_path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+
+        state_dict = model_state_dict(load_file(ckpt_path), use_ema, from_safetensors=True)
+    else:
+        state_dict = model_state_dict(torch_load_mmap(ckpt_path), use_ema)
+
+    state_dict = {
+        k: (v.to(SLIM_DTYPES[dtype]) if v.is_floating_point() else v).contiguous() for k, v in state_dict.items()
+    }
+    metadata = dict(format="pt", source=os.path.basename(ckpt_path), ema=str(use_ema), dtype=dtype)
+    with atomic_output(out_path) as tmp_path:  # several workers may convert the same checkpoint on first use
+        save_file(state_dict, tmp_path, metadata=metadata)
+    return out_path
+
+
+def load_slim_checkpoint(ckpt_path, dtype, use_ema=True):
+    # slim sibling of ckpt_path, converted on first use; the original path if it cannot be written there
+    slim_path = find_slim_checkpoint(ckpt_path, dtype, use_ema)
+    if slim_path is not None or ckpt_path.endswith(".safetensors"):
+        return slim_path or ckpt_path
+    try:
+        print(f"Converting {ckpt_path} to a slim {dtype_name(dtype)} checkpoint...")
+        return convert_checkpoint(ckpt_path, dtype=dtype_name(dtype), use_ema=use_ema)
+    except OSError as e:  # read-only model directory
+        print(f"Could not write slim checkpoint next to {ckpt_path}: {e}")
+        return ckpt_path
+
+
+# load time / peak memory, each measured in a fresh interpreter
+
+
+def original_load(model, ckpt_path, device, dtype):
+    # loading as before slim checkpoints: whole checkpoint read onto the device, copied into initialized parameters
+    model = model.to(device).to(dtype)
+    if ckpt_path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+
+        checkpoint = load_file(ckpt_path, device=device)
+    else:
+        checkpoint = torch.load(ckpt_path, map_location=device, weights_only=True)
+    model.load_state_dict(
+        model_state_dict(checkpoint, use_ema=True, from_safetensors=ckpt_path.endswith(".safetensors"))
+    )
+    del checkpoint
+    return model
+
+
+def measure_load(ckpt_path, device, baseline=False):
+    import resource  # unix only
+
+    from f5_tts.infer.utils_infer import build_model, load_model, resolve_dtype
+    from f5_tts.model import DiT
+
+    model_cfg = dict(dim=1024, depth=22, heads=16, ff_mult=2, text_dim=512, conv_layers=4)
+    if device.startswith("cuda"):
+        torch.cuda.reset_peak_memory_stats(device)
+    start = time.perf_counter()
+    if baseline:
+        model = original_load(build_model(DiT, model_cfg), ckpt_path, device, resolve_dtype(device))
+    else:
+        model = load_model(DiT, model_cfg, ckpt_path, device=device, slim=False)
+    if device.startswith("cuda"):
+        torch.cuda.synchronize(device)
+    result = dict(
+        seconds=time.perf_counter() - start,
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # kB on linux
+        peak_device_mb=torch.cuda.max_memory_allocated(device) / 2**20 if device.startswith("cuda") else 0.0,
+        dtype=str(next(model.parameters()).dtype),
+    )
+    print(json.dumps(result))
+
+
+def benchmark(ckpt_path, device, baseline=False):
+    command = [sys.executable, "-m", "f5_tts.infer.slim_checkpoint", ckpt_path, "--measure", "--device", device]
+    out = subprocess.run(
+        command + (["--baseline"] if baseline else []),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="export EMA weights of a training checkpoint to slim safetensors")
+    parser.add_argument("ckpt_file")
+    parser.add_argument("--output", default=None, help="default: <ckpt>.ema_<dtype>.safetensors next to ckpt_file")
+    parser.add_argument("--dtype", default="fp16", choices=list(SLIM_DTYPES))
+    parser.add_argument("--no_ema", action="store_true", help="export model_state_dict instead of the EMA weights")
+    parser.add_argument("--benchmark", action="store_true", help="compare load time / peak memory before and after")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)  # benchmark child process
+    parser.add_argument("--baseline", action="store_true", help=argparse.SUPPRESS)  # measure the original loader
+    args = parser.parse_args()
+
+    if args.measure:
+        measure_load(args.ckpt_file, args.device, baseline=args.baseline)
+        return
+
+    if args.benchmark:
+        before = benchmark(args.ckpt_file, args.device, baseline=True)
+    out_path = convert_checkpoint(args.ckpt_file, args.output, args.dtype, use_ema=not args.no_ema)
+    print(f"{args.ckpt_file} ({os.path.getsize(args.ckpt_file) / 2**20:.0f} MB)")
+    print(f"-> {out_path} ({os.path.getsize(out_path) / 2**20:.0f} MB)")
+
+    if args.benchmark:
+        after = benchmark(out_path, args.device)
+        for name, result in (("original", before), ("slim", after)):
+            print(
+                f"{name:>8}: {result['seconds']:.2f}s, peak rss {result['peak_rss_mb']:.0f} MB, "
+                f"peak {args.device} {result['peak_device_mb']:.0f} MB, {result['dtype']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ import torchaudio
 
 from f5_tts.infer.utils_infer import load_checkpoint, load_vocoder, save_spectrogram
 from f5_tts.model import CFM, DiT, UNetT
-from f5_tts.model.utils import convert_char_to_pinyin, get_tokenizer
+from f5_tts.model.utils import convert_char_to_pinyin, get_tokenizer, resample
 
 device = (
     "cuda"
@@ -99,7 +99,10 @@ if mel_spec_type == "vocos":
     vocoder_local_path = "../checkpoints/charactr/vocos-mel-24khz"
 elif mel_spec_type == "bigvgan":
     vocoder_local_path = "../checkpoints/bigvgan_v2_24khz_100band_256x"
-vocoder = load_vocoder(vocoder_name=mel_spec_type, is_local=local, local_path=vocoder_local_path)
+vocoder_tile_frames = None  # e.g. 512, decode long mels tile by tile to bound memory
+vocoder = load_vocoder(
+    vocoder_name=mel_spec_type, is_local=local, local_path=vocoder_local_path, tile_frames=vocoder_tile_frames
+)
 
 # Tokenizer
 vocab_char_map, vocab_size = get_tokenizer(dataset_name, tokenizer)
@@ -131,9 +134,7 @@ if audio.shape[0] > 1:
 rms = torch.sqrt(torch.mean(torch.square(audio)))
 if rms < target_rms:
     audio = audio * target_rms / rms
-if sr != target_sample_rate:
-    resampler = torchaudio.transforms.Resample(sr, target_sample_rate)
-    audio = resampler(audio)
+audio = resample(audio, sr, target_sample_rate)
 offset = 0
 audio_ = torch.zeros(1, 0)
 edit_mask = torch.zeros(1, 0, dtype=torch.bool)
@@ -7,28 +7,37 @@ os.environ["PYTOCH_ENABLE_MPS_FALLBACK"] = "1"  # for MPS device compatibility
 sys.path.append(f"{os.path.dirname(os.path.abspath(__file__))}/../../third_party/BigVGAN/")
 
 import hashlib
+import io
+import queue
 import re
-import tempfile
+import threading
+import time
+from functools import lru_cache
 from importlib.resources import files
 
-import matplotlib
-
-matplotlib.use("Agg")
-
-import matplotlib.pylab as plt
 import numpy as np
 import torch
 import torchaudio
 import tqdm
-from huggingface_hub import snapshot_download, hf_hub_download
-from pydub import AudioSegment, silence
-from transformers import pipeline
-from vocos import Vocos
-
+import soundfile as sf
+
+# matplotlib, pydub, transformers, vocos, huggingface_hub and the quantize / slim checkpoint / voice profile
+# helpers are imported where used, keeps cold start short
+from f5_tts.infer.resolver import resolve_model_file, resolve_model_snapshot
+from f5_tts.infer.silence import (
+    audiosegment_to_array,
+    compress_silence,
+    duration_ms,
+    ms_to_samples,
+    split_on_silence,
+    trim_silence_edges,
+)
+from f5_tts.infer.vocoder import StreamingVocoder, TiledVocoder, batch_decode
 from f5_tts.model import CFM
 from f5_tts.model.utils import (
     get_tokenizer,
     convert_char_to_pinyin,
+    resample,
 )
 
 # Global cache for ASR transcriptions
@@ -76,7 +85,23 @@ def choose_device_dynamic(gpu_memory_threshold_gb=2.0, gpu_utilization_threshold
     else:
         return "cpu"
 
-device = choose_device_dynamic()
+_device = None
+
+
+def get_device():
+    # chosen on first use instead of at import, the load check initialises cuda and nvml
+    global _device
+    if _device is None:
+        _device = choose_device_dynamic()
+    return _device
+
+
+def __getattr__(name):
+    # module attribute `device` kept for `from f5_tts.infer.utils_infer import device`
+    if name == "device":
+        return get_device()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # -----------------------------------------
 
@@ -94,6 +119,11 @@ cfg_strength = 2.0
 sway_sampling_coef = -1.0
 speed = 1.0
 fix_duration = None
+max_batch_frames = 8192  # frame budget (batch size * padded duration) for batched chunk inference
+chunk_silence_duration = 0.25  # seconds of silence inserted between generated chunks
+# compiled mode, sequences / vocoder mels are padded up to these frame counts, one compiled graph per bucket
+duration_buckets = [512, 768, 1024, 1280, 1536, 2048, 3072, 4096]
+vocoder_buckets = [128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096]
 
 # -----------------------------------------
 
@@ -248,8 +278,13 @@ def chunk_text(text: str, max_chars: int = 370, min_chars: int = 40):
 
 
 # load vocoder
-def load_vocoder(vocoder_name="vocos", is_local=False, local_path="", device=device, hf_cache_dir=None):
+def load_vocoder(
+    vocoder_name="vocos", is_local=False, local_path="", device=None, hf_cache_dir=None, tile_frames=None
+):
+    device = device or get_device()
     if vocoder_name == "vocos":
+        from vocos import Vocos
+
         # vocoder = Vocos.from_pretrained("charactr/vocos-mel-24khz").to(device)
         if is_local:
             print(f"Load vocos from local path {local_path}")
@@ -258,8 +293,8 @@ def load_vocoder(vocoder_name="vocos", is_local=False, local_path="", device=dev
         else:
             print("Download Vocos from huggingface charactr/vocos-mel-24khz")
             repo_id = "charactr/vocos-mel-24khz"
-            config_path = hf_hub_download(repo_id=repo_id, cache_dir=hf_cache_dir, filename="config.yaml")
-            model_path = hf_hub_download(repo_id=repo_id, cache_dir=hf_cache_dir, filename="pytorch_model.bin")
+            config_path = resolve_model_file(f"hf://{repo_id}/config.yaml", cache_dir=hf_cache_dir)
+            model_path = resolve_model_file(f"hf://{repo_id}/pytorch_model.bin", cache_dir=hf_cache_dir)
         # print("Download Vocos from huggingface charactr/vocos-mel-24khz")
         # repo_id = "charactr/vocos-mel-24khz"
         # config_path = hf_hub_download(repo_id=repo_id, cache_dir=hf_cache_dir, filename="config.yaml")
@@ -286,11 +321,15 @@ def load_vocoder(vocoder_name="vocos", is_local=False, local_path="", device=dev
             """download from https://huggingface.co/nvidia/bigvgan_v2_24khz_100band_256x/tree/main"""
             vocoder = bigvgan.BigVGAN.from_pretrained(local_path, use_cuda_kernel=False)
         else:
-            local_path = snapshot_download(repo_id="nvidia/bigvgan_v2_24khz_100band_256x", cache_dir=hf_cache_dir)
+            local_path = resolve_model_snapshot("nvidia/bigvgan_v2_24khz_100band_256x", cache_dir=hf_cache_dir)
             vocoder = bigvgan.BigVGAN.from_pretrained(local_path, use_cuda_kernel=False)
 
         vocoder.remove_weight_norm()
         vocoder = vocoder.eval().to(device)
+
+    # decode long mels tile by tile, memory stays flat with the output length
+    if tile_frames is not None:
+        vocoder = TiledVocoder(vocoder, tile_frames=tile_frames, hop_length=hop_length)
     return vocoder
 
 
@@ -299,7 +338,10 @@ def load_vocoder(vocoder_name="vocos", is_local=False, local_path="", device=dev
 asr_pipe = None
 
 
-def initialize_asr_pipeline(device: str = device, dtype=None):
+def initialize_asr_pipeline(device: str = None, dtype=None):
+    from transformers import pipeline
+
+    device = device or get_device()
     if dtype is None:
         dtype = (
             torch.float16
@@ -321,9 +363,13 @@ def initialize_asr_pipeline(device: str = device, dtype=None):
 
 
 def transcribe(ref_audio, language=None):
+    # ref_audio: path, or (wave, sr) in memory
     global asr_pipe
     if asr_pipe is None:
-        initialize_asr_pipeline(device=device)
+        initialize_asr_pipeline(device=get_device())
+    if isinstance(ref_audio, tuple):
+        wave, sr = ref_audio
+        ref_audio = {"raw": torch.as_tensor(wave).reshape(-1, wave.shape[-1]).mean(0).numpy(), "sampling_rate": sr}
     return asr_pipe(
         ref_audio,
         chunk_length_s=30,
@@ -336,74 +382,102 @@ def transcribe(ref_audio, language=None):
 # load model checkpoint for inference
 
 
-def load_checkpoint(model, ckpt_path, device: str, dtype=None, use_ema=True):
-    if dtype is None:
-        dtype = (
-            torch.float16
-            if "cuda" in device
-            and torch.cuda.get_device_properties(device).major >= 6
-            and not torch.cuda.get_device_name().endswith("[ZLUDA]")
-            else torch.float32
-        )
+@lru_cache(maxsize=None)
+def cpu_supports_bf16():
+    # native bf16 dot products (avx512_bf16 / amx_bf16 on x86, bf16 on arm), elsewhere bf16 is emulated and slow
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            flags = next(line for line in f if line.startswith(("flags", "Features"))).split()
+    except (OSError, StopIteration):
+        return False
+    return any(flag in flags for flag in ("avx512_bf16", "amx_bf16", "bf16"))
+
+
+def resolve_dtype(device, dtype="auto"):
+    """
+    Backbone dtype on device. "auto" (or None): fp16 on cuda with compute capability >= 6, bf16 on cpus with native
+    bf16 support, fp32 otherwise. "fp32" / "fp16" / "bf16" or a torch.dtype override it.
+    Under bf16, torch's cpu layer norm / softmax / attention kernels accumulate in fp32, and CFM.sample keeps the ode
+    state in fp32; vocoders always run in fp32.
+    """
+    if isinstance(dtype, torch.dtype):
+        return dtype
+    if dtype not in (None, "auto"):
+        from f5_tts.infer.slim_checkpoint import SLIM_DTYPES
+
+        if dtype not in SLIM_DTYPES:
+            raise ValueError(f"Unknown dtype: {dtype}, expected auto or one of {list(SLIM_DTYPES)}")
+        return SLIM_DTYPES[dtype]
+    device = str(device)
+    if (
+        "cuda" in device
+        and torch.cuda.get_device_properties(device).major >= 6
+        and not torch.cuda.get_device_name().endswith("[ZLUDA]")
+    ):
+        return torch.float16
+    if device == "cpu" and cpu_supports_bf16():
+        return torch.bfloat16
+    return torch.float32
+
+
+def load_checkpoint(model, ckpt_path, device: str, dtype=None, use_ema=True, slim=False):
+    from f5_tts.infer.slim_checkpoint import load_slim_checkpoint, model_state_dict, torch_load_mmap
+
+    dtype = resolve_dtype(device, dtype)
     model = model.to(dtype)
 
+    # slim: training checkpoints (optimizer state, model + ema weights) are converted once to ema-only (or model-only)
+    # safetensors in the model dtype, written next to the original, so opt-in
+    if slim:
+        ckpt_path = load_slim_checkpoint(ckpt_path, dtype, use_ema)
+
     ckpt_type = ckpt_path.split(".")[-1]
     if ckpt_type == "safetensors":
         from safetensors.torch import load_file
 
+        # memory-mapped, each tensor copied straight to the device
         checkpoint = load_file(ckpt_path, device=device)
     else:
-        checkpoint = torch.load(ckpt_path, map_location=device, weights_only=True)
-
-    if use_ema:
-        if ckpt_type == "safetensors":
-            checkpoint = {"ema_model_state_dict": checkpoint}
-        checkpoint["model_state_dict"] = {
-            k.replace("ema_model.", ""): v
-            for k, v in checkpoint["ema_model_state_dict"].items()
-            if k not in ["initted", "step"]
-        }
-
-        # patch for backward compatibility, 305e3ea
-        for key in ["mel_spec.mel_stft.mel_scale.fb", "mel_spec.mel_stft.spectrogram.window"]:
-            if key in checkpoint["model_state_dict"]:
-                del checkpoint["model_state_dict"][key]
-
-        model.load_state_dict(checkpoint["model_state_dict"])
-    else:
-        if ckpt_type == "safetensors":
-            checkpoint = {"model_state_dict": checkpoint}
-        model.load_state_dict(checkpoint["model_state_dict"])
+        # memory-mapped on cpu, only the weights kept below are read and moved to the device
+        checkpoint = torch_load_mmap(ckpt_path)
 
+    state_dict = model_state_dict(checkpoint, use_ema, from_safetensors=ckpt_type == "safetensors")
     del checkpoint
+    state_dict = {k: v.to(device, dtype) if v.is_floating_point() else v.to(device) for k, v in state_dict.items()}
+    # loaded tensors become the parameters, no second copy next to the freshly initialized ones
+    model.load_state_dict(state_dict, assign=True)
+
+    del state_dict
     torch.cuda.empty_cache()
 
     return model.to(device)
 
 
+def load_quantized_checkpoint(model, ckpt_path, quantize="int8", use_ema=True):
+    # cpu only, the quantized state dict is cached next to the checkpoint so quantization runs once
+    from f5_tts.infer.quantize import find_quantized_checkpoint, quantize_model, save_quantized_checkpoint
+
+    quantized_path = find_quantized_checkpoint(ckpt_path, quantize, use_ema)
+    if quantized_path is not None:
+        model = quantize_model(model.float(), quantize)  # module structure, weights replaced below
+        model.load_state_dict(torch.load(quantized_path, map_location="cpu", weights_only=True))
+        return model
+
+    model = load_checkpoint(model, ckpt_path, "cpu", dtype=torch.float32, use_ema=use_ema, slim=False)
+    model = quantize_model(model, quantize)
+    save_quantized_checkpoint(model, ckpt_path, quantize, use_ema)
+    return model
+
+
 # load model for inference
 
 
-def load_model(
-    model_cls,
-    model_cfg,
-    ckpt_path,
-    mel_spec_type=mel_spec_type,
-    vocab_file="",
-    ode_method=ode_method,
-    use_ema=True,
-    device=device,
-):
+def build_model(model_cls, model_cfg, mel_spec_type=mel_spec_type, vocab_file="", ode_method=ode_method):
+    # randomly initialized CFM on cpu, weights loaded by load_checkpoint()
     if vocab_file == "":
         vocab_file = str(files("f5_tts").joinpath("infer/examples/vocab.txt"))
-    tokenizer = "custom"
-
-    print("\nvocab : ", vocab_file)
-    print("token : ", tokenizer)
-    print("model : ", ckpt_path, "\n")
-
-    vocab_char_map, vocab_size = get_tokenizer(vocab_file, tokenizer)
-    model = CFM(
+    vocab_char_map, vocab_size = get_tokenizer(vocab_file, "custom")
+    return CFM(
         transformer=model_cls(**model_cfg, text_num_embeds=vocab_size, mel_dim=n_mel_channels),
         mel_spec_kwargs=dict(
             n_fft=n_fft,
@@ -417,77 +491,101 @@ def load_model(
             method=ode_method,
         ),
         vocab_char_map=vocab_char_map,
-    ).to(device)
+    )
 
-    dtype = torch.float32 if mel_spec_type == "bigvgan" else None
-    model = load_checkpoint(model, ckpt_path, device, dtype=dtype, use_ema=use_ema)
 
-    return model
+def load_model(
+    model_cls,
+    model_cfg,
+    ckpt_path,
+    mel_spec_type=mel_spec_type,
+    vocab_file="",
+    ode_method=ode_method,
+    use_ema=True,
+    device=None,
+    slim=False,  # cache a slim safetensors copy of a .pt checkpoint next to it, see slim_checkpoint.py
+    quantize=None,  # "int8": dynamic int8 backbone linears, cpu only
+    dtype="auto",  # backbone dtype, see resolve_dtype()
+):
+    device = device or get_device()
+    if vocab_file == "":
+        vocab_file = str(files("f5_tts").joinpath("infer/examples/vocab.txt"))
+    tokenizer = "custom"
+
+    print("\nvocab : ", vocab_file)
+    print("token : ", tokenizer)
+    print("model : ", ckpt_path, "\n")
 
+    model = build_model(model_cls, model_cfg, mel_spec_type, vocab_file, ode_method)
+    # moved to device by load_checkpoint, after the weights are in place
 
-def remove_silence_edges(audio, silence_threshold=-42):
-    # Remove silence from the start
-    non_silent_start_idx = silence.detect_leading_silence(audio, silence_threshold=silence_threshold)
-    audio = audio[non_silent_start_idx:]
+    if quantize is not None:
+        if device != "cpu":
+            raise ValueError(f"quantize={quantize!r} is for cpu inference, got device {device}")
+        if dtype not in (None, "auto", "fp32", torch.float32):  # layers kept in float stay fp32
+            raise ValueError(f"quantize={quantize!r} runs the float layers in fp32, got dtype {dtype}")
+        return load_quantized_checkpoint(model, ckpt_path, quantize, use_ema=use_ema)
 
-    # Remove silence from the end
-    non_silent_end_duration = audio.duration_seconds
-    for ms in reversed(audio):
-        if ms.dBFS > silence_threshold:
-            break
-        non_silent_end_duration -= 0.001
-    trimmed_audio = audio[: int(non_silent_end_duration * 1000)]
+    if mel_spec_type == "bigvgan" and dtype in (None, "auto"):
+        dtype = torch.float32
+    model = load_checkpoint(model, ckpt_path, device, dtype=dtype, use_ema=use_ema, slim=slim)
 
-    return trimmed_audio
+    return model
 
 
 # preprocess reference audio and text
 
 
-def preprocess_ref_audio_text(ref_audio_orig, ref_text, clip_short=True, show_info=print, device=device):
+def clip_on_silence(wave, sr, show_info=print):
+    # keep whole non-silent segments up to ~15s, cutting at long silences first, then at short ones
+    for attempt, (min_silence_len, silence_thresh) in enumerate([(1000, -50), (100, -40)], start=1):
+        segments = split_on_silence(
+            wave, sr, min_silence_len=min_silence_len, silence_thresh=silence_thresh, keep_silence=1000, seek_step=10
+        )
+        kept, kept_ms = [], 0
+        for segment in segments:
+            segment_ms = duration_ms(segment, sr)
+            if kept_ms > 6000 and kept_ms + segment_ms > 15000:
+                show_info(f"Audio is over 15s, clipping short. ({attempt})")
+                break
+            kept.append(segment)
+            kept_ms += segment_ms
+        clipped = np.concatenate(kept, axis=-1) if kept else wave[..., :0]
+        if duration_ms(clipped, sr) <= 15000:
+            return clipped
+
+    # 3. if no proper silence found for clipping
+    show_info("Audio is over 15s, clipping short. (3)")
+    return clipped[..., : ms_to_samples(15000, sr)]
+
+
+def load_audio(source):
+    # path, file-like, encoded bytes (e.g. an upload) or (wave, sr) -> float32 np wave, (n,) or (channels, n), and sr
+    if isinstance(source, tuple):
+        wave, sr = source
+        wave = np.asarray(wave.cpu() if isinstance(wave, torch.Tensor) else wave, dtype=np.float32)
+        return (wave[0] if wave.ndim == 2 and wave.shape[0] == 1 else wave), sr
+    from pydub import AudioSegment
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return audiosegment_to_array(AudioSegment.from_file(source))
+
+
+def preprocess_ref_audio_text(ref_audio_orig, ref_text, clip_short=True, show_info=print, device=None):
+    # returns ((wave float["c nw"] tensor, sr), ref_text), nothing is written to disk
     show_info("Converting audio...")
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
-        aseg = AudioSegment.from_file(ref_audio_orig)
+    wave, sr = load_audio(ref_audio_orig)
 
-        if clip_short:
-            # 1. try to find long silence for clipping
-            non_silent_segs = silence.split_on_silence(
-                aseg, min_silence_len=1000, silence_thresh=-50, keep_silence=1000, seek_step=10
-            )
-            non_silent_wave = AudioSegment.silent(duration=0)
-            for non_silent_seg in non_silent_segs:
-                if len(non_silent_wave) > 6000 and len(non_silent_wave + non_silent_seg) > 15000:
-                    show_info("Audio is over 15s, clipping short. (1)")
-                    break
-                non_silent_wave += non_silent_seg
-
-            # 2. try to find short silence for clipping if 1. failed
-            if len(non_silent_wave) > 15000:
-                non_silent_segs = silence.split_on_silence(
-                    aseg, min_silence_len=100, silence_thresh=-40, keep_silence=1000, seek_step=10
-                )
-                non_silent_wave = AudioSegment.silent(duration=0)
-                for non_silent_seg in non_silent_segs:
-                    if len(non_silent_wave) > 6000 and len(non_silent_wave + non_silent_seg) > 15000:
-                        show_info("Audio is over 15s, clipping short. (2)")
-                        break
-                    non_silent_wave += non_silent_seg
-
-            aseg = non_silent_wave
-
-            # 3. if no proper silence found for clipping
-            if len(aseg) > 15000:
-                aseg = aseg[:15000]
-                show_info("Audio is over 15s, clipping short. (3)")
-
-        aseg = remove_silence_edges(aseg) + AudioSegment.silent(duration=50)
-        aseg.export(f.name, format="wav")
-        ref_audio = f.name
-
-    # Compute a hash of the reference audio file
-    with open(ref_audio, "rb") as audio_file:
-        audio_data = audio_file.read()
-        audio_hash = hashlib.md5(audio_data).hexdigest()
+    if clip_short:
+        wave = clip_on_silence(wave, sr, show_info=show_info)
+
+    wave = trim_silence_edges(wave, sr, silence_threshold=-42)
+    wave = np.concatenate((wave, np.zeros((*wave.shape[:-1], ms_to_samples(50, sr)), dtype=wave.dtype)), axis=-1)
+    ref_audio = (torch.from_numpy(np.ascontiguousarray(np.atleast_2d(wave))), sr)
+
+    # Compute a hash of the reference audio samples
+    audio_hash = hashlib.md5(wave.tobytes() + str(sr).encode()).hexdigest()
 
     if not ref_text.strip():
         global _ref_audio_cache
@@ -534,11 +632,32 @@ def infer_process(
     sway_sampling_coef=sway_sampling_coef,
     speed=speed,
     fix_duration=fix_duration,
-    device=device,
+    device=None,
     progress_callback=None,  # <-- thêm dòng này
+    chunk_batching=False,
+    max_batch_frames=max_batch_frames,
+    fused_cfg=False,
+    step_callback=None,
+    ode_method=None,  # None: method the model was loaded with
+    adaptive_tol=None,
+    cfg_interval=None,
+    cfg_reuse_steps=None,
+    block_cache=None,
+    pipelined=False,
+    stats=None,  # list, filled with dict(chunk, steps, nfe) per chunk
+    timings=None,  # dict, filled with per stage seconds when pipelined
 ):
+    from f5_tts.infer.voice_profile import VoiceProfile
+
+    device = device or get_device()
     # Split the input text into batches
-    audio, sr = torchaudio.load(ref_audio)
+    if isinstance(ref_audio, VoiceProfile):
+        ref_text = ref_audio.ref_text
+        audio, sr = ref_audio.audio, target_sample_rate
+    elif isinstance(ref_audio, tuple):  # (wave, sr) from preprocess_ref_audio_text
+        audio, sr = ref_audio
+    else:
+        audio, sr = torchaudio.load(ref_audio)
     max_chars = int(len(ref_text.encode("utf-8")) / (audio.shape[-1] / sr) * (25 - audio.shape[-1] / sr))
     gen_text_batches = chunk_text(gen_text, max_chars=max_chars)
     for i, gen_text in enumerate(gen_text_batches):
@@ -547,7 +666,7 @@ def infer_process(
 
     show_info(f"Generating audio in {len(gen_text_batches)} batches...")
     return infer_batch_process(
-        (audio, sr),
+        ref_audio if isinstance(ref_audio, VoiceProfile) else (audio, sr),
         ref_text,
         gen_text_batches,
         model_obj,
@@ -563,9 +682,67 @@ def infer_process(
         fix_duration=fix_duration,
         device=device,
         progress_callback=progress_callback,  # <-- thêm dòng này
+        chunk_batching=chunk_batching,
+        max_batch_frames=max_batch_frames,
+        fused_cfg=fused_cfg,
+        step_callback=step_callback,
+        ode_method=ode_method,
+        adaptive_tol=adaptive_tol,
+        cfg_interval=cfg_interval,
+        cfg_reuse_steps=cfg_reuse_steps,
+        block_cache=block_cache,
+        pipelined=pipelined,
+        stats=stats,
+        timings=timings,
+        show_info=show_info,
     )
 
 
+# reference audio normalization, text and duration of every chunk, shared by batch and streaming inference
+
+
+def _prepare_chunks(ref_audio, ref_text, gen_text_batches, target_rms, speed, fix_duration, device):
+    # ref_audio: (wave, sr) or VoiceProfile, returned audio is the model cond, wave (1 nw) or precomputed mel (1 n d)
+    from f5_tts.infer.voice_profile import VoiceProfile
+
+    if isinstance(ref_audio, VoiceProfile):
+        audio, rms, ref_text = ref_audio.ref_mel.to(device), ref_audio.rms, ref_audio.ref_text
+        ref_audio_len = ref_audio.audio.shape[-1] // hop_length
+    else:
+        audio, sr = ref_audio
+        if audio.shape[0] > 1:
+            audio = torch.mean(audio, dim=0, keepdim=True)
+
+        rms = torch.sqrt(torch.mean(torch.square(audio)))
+        if rms < target_rms:
+            audio = audio * target_rms / rms
+        audio = resample(audio, sr, target_sample_rate)
+        audio = audio.to(device)
+        ref_audio_len = audio.shape[-1] // hop_length
+
+        if len(ref_text[-1].encode("utf-8")) == 1:
+            ref_text = ref_text + " "
+
+    # Chuẩn bị text và duration cho từng chunk
+    ref_text_len = len(ref_text.encode("utf-8"))
+    final_text_list = []
+    durations = []
+    for gen_text in gen_text_batches:
+        if isinstance(ref_audio, VoiceProfile):  # reference text already converted once
+            final_text_list.append(ref_audio.ref_text_tokens + convert_char_to_pinyin([gen_text])[0])
+        else:
+            final_text_list.extend(convert_char_to_pinyin([ref_text + gen_text]))
+        if fix_duration is not None:
+            duration = int(fix_duration * target_sample_rate / hop_length)
+        else:
+            # Calculate duration
+            gen_text_len = len(gen_text.encode("utf-8"))
+            duration = ref_audio_len + int(ref_audio_len / ref_text_len * gen_text_len / speed)
+        durations.append(duration)
+
+    return audio, rms, ref_audio_len, final_text_list, durations
+
+
 # infer batches
 
 
@@ -586,75 +763,106 @@ def infer_batch_process(
     fix_duration=None,
     device=None,
     progress_callback=None,  # <-- thêm dòng này
+    chunk_batching=False,
+    max_batch_frames=max_batch_frames,
+    fused_cfg=False,
+    step_callback=None,
+    ode_method=None,  # None: method the model was loaded with
+    adaptive_tol=None,
+    cfg_interval=None,
+    cfg_reuse_steps=None,
+    block_cache=None,
+    pipelined=False,
+    stats=None,  # list, filled with dict(chunk, steps, nfe) per chunk
+    timings=None,  # dict, filled with per stage seconds when pipelined
+    show_info=None,  # reports the pipeline stage timings if given
 ):
-    audio, sr = ref_audio
-    if audio.shape[0] > 1:
-        audio = torch.mean(audio, dim=0, keepdim=True)
-
-    rms = torch.sqrt(torch.mean(torch.square(audio)))
-    if rms < target_rms:
-        audio = audio * target_rms / rms
-    if sr != target_sample_rate:
-        resampler = torchaudio.transforms.Resample(sr, target_sample_rate)
-        audio = resampler(audio)
-    audio = audio.to(device)
-
-    generated_waves = []
-    spectrograms = []
-
-    if len(ref_text[-1].encode("utf-8")) == 1:
-        ref_text = ref_text + " "
-    for i, gen_text in enumerate(gen_text_batches, start=1):
-        # Realtime progress
-        if progress_callback:
-            progress_callback(i, len(gen_text_batches))
-        else:
-            print(f"Processing batch {i}/{len(gen_text_batches)}", end="\r")
-        
-        # Chuẩn bị text
-        text_list = [ref_text + gen_text]
-        final_text_list = convert_char_to_pinyin(text_list)
-
-        ref_audio_len = audio.shape[-1] // hop_length
-        if fix_duration is not None:
-            duration = int(fix_duration * target_sample_rate / hop_length)
-        else:
-            # Calculate duration
-            ref_text_len = len(ref_text.encode("utf-8"))
-            gen_text_len = len(gen_text.encode("utf-8"))
-            duration = ref_audio_len + int(ref_audio_len / ref_text_len * gen_text_len / speed)
-
-        # inference
-        with torch.inference_mode():
-            generated, _ = model_obj.sample(
-                cond=audio,
-                text=final_text_list,
-                duration=duration,
-                steps=nfe_step,
-                cfg_strength=cfg_strength,
-                sway_sampling_coef=sway_sampling_coef,
-            )
-
-            generated = generated.to(torch.float32)
-            generated = generated[:, ref_audio_len:, :]
-            generated_mel_spec = generated.permute(0, 2, 1)
-            if mel_spec_type == "vocos":
-                generated_wave = vocoder.decode(generated_mel_spec)
-            elif mel_spec_type == "bigvgan":
-                generated_wave = vocoder(generated_mel_spec)
-            if rms < target_rms:
-                generated_wave = generated_wave * rms / target_rms
+    audio, rms, ref_audio_len, final_text_list, durations = _prepare_chunks(
+        ref_audio, ref_text, gen_text_batches, target_rms, speed, fix_duration, device
+    )
 
-            # wav -> numpy
-            generated_wave = generated_wave.squeeze().cpu().numpy()
+    sample_kwargs = dict(
+        steps=nfe_step,
+        cfg_strength=cfg_strength,
+        sway_sampling_coef=sway_sampling_coef,
+        cache_modulation=True,
+        fused_cfg=fused_cfg,
+        step_callback=step_callback,
+        ode_method=ode_method,
+        adaptive_tol=adaptive_tol,
+        cfg_interval=cfg_interval,
+        cfg_reuse_steps=cfg_reuse_steps,
+        block_cache=block_cache,
+    )
+    if chunk_batching:
+        generated_mels = _sample_chunks_batched(
+            audio,
+            ref_audio_len,
+            final_text_list,
+            durations,
+            model_obj,
+            max_batch_frames=max_batch_frames,
+            progress_callback=progress_callback,
+            **sample_kwargs,
+        )
+    else:
+        generated_mels = _sample_chunks(
+            audio,
+            ref_audio_len,
+            final_text_list,
+            durations,
+            model_obj,
+            progress_callback=progress_callback,
+            **sample_kwargs,
+        )
 
-            generated_waves.append(generated_wave)
-            spectrograms.append(generated_mel_spec[0].cpu().numpy())
+    if stats is not None:
+        generated_mels = _record_sample_stats(generated_mels, model_obj, stats)
+
+    def vocode(generated_mel_spec):
+        if mel_spec_type == "vocos":
+            generated_wave = vocoder.decode(generated_mel_spec)
+        elif mel_spec_type == "bigvgan":
+            generated_wave = vocoder(generated_mel_spec)
+        if rms < target_rms:
+            generated_wave = generated_wave * rms / target_rms
+
+        # wav -> numpy
+        return generated_wave.squeeze().cpu().numpy(), generated_mel_spec[0].cpu().numpy()
+
+    generated_waves = [None] * len(gen_text_batches)
+    spectrograms = [None] * len(gen_text_batches)
+    if pipelined:
+        _run_pipelined(
+            generated_mels,
+            vocode,
+            generated_waves,
+            spectrograms,
+            device=model_obj.device,
+            timings=timings,
+            show_info=show_info,
+        )
+    elif chunk_batching:
+        # chunks were sampled in batches, vocode them in batches too under the same frame budget
+        generated_mels = dict(generated_mels)
+        chunk_frames = [generated_mels[i].shape[-1] for i in range(len(gen_text_batches))]
+        for batch in batch_chunks_by_frames(chunk_frames, max_batch_frames):
+            with torch.inference_mode():
+                batch_waves = batch_decode(vocoder, [generated_mels[i] for i in batch], hop_length=hop_length)
+            for i, generated_wave in zip(batch, batch_waves):
+                if rms < target_rms:
+                    generated_wave = generated_wave * rms / target_rms
+                generated_waves[i] = generated_wave.cpu().numpy()
+                spectrograms[i] = generated_mels[i][0].cpu().numpy()
+    else:
+        for i, generated_mel_spec in generated_mels:
+            with torch.inference_mode():
+                generated_waves[i], spectrograms[i] = vocode(generated_mel_spec)
 
     # --- START: LOGIC NÂNG CẤP TẠO KHOẢNG LẶNG GIỮA CÁC BATCH ---
     
     # Đặt thời gian khoảng lặng mong muốn (0.3 giây)
-    SILENCE_DURATION = 0.25 
+    SILENCE_DURATION = chunk_silence_duration
     
     # Chỉ chèn khoảng lặng nếu có nhiều hơn một batch
     if len(generated_waves) > 1:
@@ -703,27 +911,313 @@ def infer_batch_process(
     return final_wave, target_sample_rate, combined_spectrogram
 
 
+# group chunks into length-bucketed batches under a frame budget
+
+
+def batch_chunks_by_frames(durations, max_batch_frames=max_batch_frames):
+    """
+    Gom các chunk thành các batch theo độ dài (sắp xếp theo duration) sao cho
+    batch_size * max_duration của mỗi batch không vượt quá max_batch_frames.
+    Trả về list các list index (theo thứ tự chunk gốc trong từng batch).
+    """
+    order = sorted(range(len(durations)), key=lambda i: durations[i])
+    batches = []
+    batch, batch_max = [], 0
+    for i in order:
+        new_max = max(batch_max, durations[i])
+        if batch and new_max * (len(batch) + 1) > max_batch_frames:
+            batches.append(batch)
+            batch, new_max = [], durations[i]
+        batch.append(i)
+        batch_max = new_max
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# sample chunk mels one at a time, yield (chunk index, mel) in order
+
+
+def _sample_chunks(
+    audio, ref_audio_len, final_text_list, durations, model_obj, progress_callback=None, **sample_kwargs
+):
+    total = len(final_text_list)
+    with torch.inference_mode():
+        cond = model_obj.mel_spec(audio).permute(0, 2, 1) if audio.ndim == 2 else audio  # 1 n d, shared by all chunks
+    for i, (text, duration) in enumerate(zip(final_text_list, durations)):
+        # Realtime progress
+        if progress_callback:
+            progress_callback(i + 1, total)
+        else:
+            print(f"Processing batch {i + 1}/{total}", end="\r")
+
+        with torch.inference_mode():
+            generated, _ = model_obj.sample(cond=cond, text=[text], duration=duration, **sample_kwargs)
+            generated = generated.to(torch.float32)
+            generated = generated[:, ref_audio_len:, :]
+        yield i, generated.permute(0, 2, 1)
+
+
+# sample chunk mels in length-bucketed batches sharing one reference cond, yield (chunk index, mel)
+
+
+def _sample_chunks_batched(
+    audio,
+    ref_audio_len,
+    final_text_list,
+    durations,
+    model_obj,
+    max_batch_frames=max_batch_frames,
+    max_duration=4096,
+    progress_callback=None,
+    **sample_kwargs,
+):
+    total = len(final_text_list)
+    with torch.inference_mode():
+        cond = model_obj.mel_spec(audio).permute(0, 2, 1) if audio.ndim == 2 else audio  # 1 n d, shared by all chunks
+    cond_seq_len = cond.shape[1]
+
+    # same clamping as CFM.sample, so that each item can be trimmed back to its own length
+    durations = [
+        min(max(duration, len(text) + 1, cond_seq_len + 1), max_duration)
+        for text, duration in zip(final_text_list, durations)
+    ]
+
+    done = 0
+    for batch in batch_chunks_by_frames(durations, max_batch_frames):
+        done += len(batch)
+        if progress_callback:
+            progress_callback(done, total)
+        else:
+            print(f"Processing batch {done}/{total}", end="\r")
+
+        batch_durations = torch.tensor([durations[i] for i in batch], dtype=torch.long, device=cond.device)
+        with torch.inference_mode():
+            generated, _ = model_obj.sample(
+                cond=cond.expand(len(batch), -1, -1),
+                text=[final_text_list[i] for i in batch],
+                duration=batch_durations,
+                max_duration=max_duration,
+                **sample_kwargs,
+            )
+            generated = generated.to(torch.float32)
+        for j, i in enumerate(batch):
+            yield i, generated[j : j + 1, ref_audio_len : durations[i], :].permute(0, 2, 1)
+
+
+# streaming inference, yield wave blocks float32 numpy as soon as they are decoded
+
+
+def infer_batch_process_stream(
+    ref_audio,
+    ref_text,
+    gen_text_batches,
+    model_obj,
+    vocoder,
+    target_rms=0.1,
+    nfe_step=32,
+    cfg_strength=2.0,
+    sway_sampling_coef=-1,
+    speed=1,
+    fix_duration=None,
+    device=None,
+    progress_callback=None,
+    window_frames=64,
+    context_frames=32,  # receptive field context decoded around each window, see StreamingVocoder
+    fade_frames=4,
+    **sample_kwargs,  # fused_cfg, ode_method, adaptive_tol, cfg_interval, ... see CFM.sample
+):
+    audio, rms, ref_audio_len, final_text_list, durations = _prepare_chunks(
+        ref_audio, ref_text, gen_text_batches, target_rms, speed, fix_duration, device
+    )
+    streaming_vocoder = StreamingVocoder(
+        vocoder,
+        window_frames=window_frames,
+        context_frames=context_frames,
+        fade_frames=fade_frames,
+        hop_length=hop_length,
+    )
+    silence_array = np.zeros(int(chunk_silence_duration * target_sample_rate), dtype=np.float32)
+
+    generated_mels = _sample_chunks(
+        audio,
+        ref_audio_len,
+        final_text_list,
+        durations,
+        model_obj,
+        progress_callback=progress_callback,
+        steps=nfe_step,
+        cfg_strength=cfg_strength,
+        sway_sampling_coef=sway_sampling_coef,
+        cache_modulation=True,
+        **sample_kwargs,
+    )
+    for i, generated_mel_spec in generated_mels:
+        if i > 0:
+            yield silence_array
+        with torch.inference_mode():
+            for generated_wave in streaming_vocoder.stream(generated_mel_spec):
+                if rms < target_rms:
+                    generated_wave = generated_wave * rms / target_rms
+                yield generated_wave.float().cpu().numpy()
+
+
+# record per chunk ode stats right after each sample call, before the next chunk is sampled
+
+
+def _record_sample_stats(generated_mels, model_obj, stats):
+    for i, generated_mel_spec in generated_mels:
+        stats.append(dict(chunk=i, **model_obj.last_sample_stats))
+        yield i, generated_mel_spec
+
+
+# pipelined execution: sampling stays on the calling thread, vocoding + device to host copy on a second worker,
+# assembly on a third, bounded queues keep the sampler at most pipeline_depth chunks ahead
+
+
+_pipeline_stop = object()
+
+
+def _run_pipelined(
+    generated_mels, vocode, generated_waves, spectrograms, device, pipeline_depth=2, timings=None, show_info=None
+):
+    mel_queue = queue.Queue(maxsize=pipeline_depth)
+    wave_queue = queue.Queue(maxsize=pipeline_depth)
+    stage_seconds = dict(sample=0.0, vocode=0.0, assemble=0.0)
+    errors = []
+
+    # on cuda the host returns before the kernels are done, stages are timed with events, summed once all work is done
+    cuda = torch.device(device).type == "cuda"
+    cuda_events = dict(sample=[], vocode=[])
+
+    def cuda_event():
+        event = torch.cuda.Event(enable_timing=True)
+        event.record()
+        return event
+
+    def vocode_worker():
+        stream = None
+        try:
+            with torch.inference_mode():
+                while (item := mel_queue.get()) is not _pipeline_stop:
+                    i, generated_mel_spec, ready = item
+                    start = time.perf_counter()
+                    if ready is not None:  # cuda, decode on a side stream once the sampled mel is ready
+                        stream = stream or torch.cuda.Stream(device=generated_mel_spec.device)
+                        stream.wait_event(ready)
+                        generated_mel_spec.record_stream(stream)
+                        with torch.cuda.stream(stream):
+                            start_event = cuda_event()
+                            wave, spect = vocode(generated_mel_spec)
+                            cuda_events["vocode"].append((start_event, cuda_event()))
+                    else:
+                        wave, spect = vocode(generated_mel_spec)
+                        stage_seconds["vocode"] += time.perf_counter() - start
+                    wave_queue.put((i, wave, spect))
+        except BaseException as e:
+            errors.append(e)
+            while mel_queue.get() is not _pipeline_stop:  # unblock the sampler
+                pass
+        finally:
+            wave_queue.put(_pipeline_stop)
+
+    def assemble_worker():
+        while (item := wave_queue.get()) is not _pipeline_stop:
+            start = time.perf_counter()
+            i, generated_waves[i], spectrograms[i] = item
+            stage_seconds["assemble"] += time.perf_counter() - start
+
+    # intra-op threads are a process wide setting, budgeted once here for the overlapping stages rather than from the
+    # workers: on cpu leave a quarter of the cores to the vocoder running next to the sampler
+    num_threads = torch.get_num_threads()
+    if torch.device(device).type == "cpu":
+        torch.set_num_threads(max(1, num_threads - num_threads // 4))
+
+    workers = [threading.Thread(target=worker, daemon=True) for worker in (vocode_worker, assemble_worker)]
+    for worker in workers:
+        worker.start()
+
+    wall_start = time.perf_counter()
+    try:
+        generated_mels = iter(generated_mels)
+        while not errors:
+            start = time.perf_counter()
+            start_event = cuda_event() if cuda else None
+            item = next(generated_mels, None)
+            if item is None:
+                break
+            i, generated_mel_spec = item
+            ready = None
+            if generated_mel_spec.is_cuda:
+                ready = cuda_event()
+                if start_event is not None:
+                    cuda_events["sample"].append((start_event, ready))
+            if start_event is None:
+                stage_seconds["sample"] += time.perf_counter() - start
+            mel_queue.put((i, generated_mel_spec, ready))
+    finally:
+        mel_queue.put(_pipeline_stop)
+        for worker in workers:
+            worker.join()
+        torch.set_num_threads(num_threads)
+    if errors:
+        raise errors[0]
+
+    if cuda:
+        torch.cuda.synchronize(device)
+        for stage, events in cuda_events.items():
+            stage_seconds[stage] += sum(start.elapsed_time(end) for start, end in events) / 1000  # ms
+    stage_seconds["wall"] = time.perf_counter() - wall_start
+    busy = stage_seconds["sample"] + stage_seconds["vocode"] + stage_seconds["assemble"]
+    stage_seconds["overlap"] = max(0.0, busy - stage_seconds["wall"])
+    if show_info is not None:
+        show_info("Pipeline: " + ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in stage_seconds.items()))
+    if timings is not None:
+        timings.update(stage_seconds)
+
+
 # remove silence from generated wav
 
 
 def remove_silence_for_generated_wav(filename):
-    aseg = AudioSegment.from_file(filename)
-    non_silent_segs = silence.split_on_silence(
-        aseg, min_silence_len=1000, silence_thresh=-50, keep_silence=500, seek_step=10
-    )
-    non_silent_wave = AudioSegment.silent(duration=0)
-    for non_silent_seg in non_silent_segs:
-        non_silent_wave += non_silent_seg
-    aseg = non_silent_wave
-    aseg.export(filename, format="wav")
+    # file round trip kept for callers holding a path, in memory use compress_silence directly
+    try:
+        wave, sr = sf.read(filename, dtype="float32", always_2d=True)
+        wave, file_format = wave.T, None  # format from the extension
+    except RuntimeError:  # libsndfile cannot decode it (e.g. m4a, mp3 before libsndfile 1.1), decoded by pydub
+        wave, sr = load_audio(filename)
+        file_format = "WAV"  # whatever the extension, like the pydub export did
+    sf.write(filename, compress_silence(wave, sr).T, sr, format=file_format)
 
 
 # save spectrogram
 
 
+def _pyplot():
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
 def save_spectrogram(spectrogram, path):
+    plt = _pyplot()
     plt.figure(figsize=(12, 4))
     plt.imshow(spectrogram, origin="lower", aspect="auto")
     plt.colorbar()
     plt.savefig(path)
     plt.close()
+
+
+def render_spectrogram(spectrogram):
+    # same figure as save_spectrogram, as an rgb array (h w 3) instead of a png file
+    plt = _pyplot()
+    fig = plt.figure(figsize=(12, 4))
+    plt.imshow(spectrogram, origin="lower", aspect="auto")
+    plt.colorbar()
+    fig.canvas.draw()
+    image = np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+    plt.close(fig)
+    return image
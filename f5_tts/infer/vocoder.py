@@ -0,0 +1,144 @@
+# Vocoder wrappers around Vocos / BigVGAN, mel float["b d n"] in, wave float["b nw"] out
+
+from __future__ import annotations
+
+import math
+from functools import partial
+from typing import Iterator
+
+import torch
+import torch.nn.functional as F
+
+from f5_tts.model.utils import duration_bucket
+
+
+def vocode(vocoder, mel: float["b d n"]):  # noqa: F722
+    # vocos has decode(), bigvgan is called directly and returns b 1 nw
+    if hasattr(vocoder, "decode"):
+        return vocoder.decode(mel)
+    return vocoder(mel).squeeze(1)
+
+
+# batched decode of variable-length mels, one vocoder call instead of one per item
+
+
+def batch_decode(vocoder, mels: list[float["d n"]], hop_length=256, pad_value=math.log(1e-5)):  # noqa: F722
+    """
+    Right-pad mels (float["d n"] or float["1 d n"]) to the longest with the log-mel floor (silence),
+    decode them in one call and trim each wave back to its own num_frames * hop_length samples.
+    """
+    mels = [mel.squeeze(0) if mel.ndim == 3 else mel for mel in mels]
+    lengths = [mel.shape[-1] for mel in mels]
+    batch = mels[0].new_full((len(mels), mels[0].shape[0], max(lengths)), pad_value)
+    for mel, frames, padded in zip(mels, lengths, batch):
+        padded[:, :frames] = mel
+    waves = vocode(vocoder, batch)
+    return [wave[: frames * hop_length] for wave, frames in zip(waves, lengths)]
+
+
+# bounded-memory decode of arbitrarily long mels in fixed-size tiles, drop-in for the wrapped vocoder
+
+
+class TiledVocoder:
+    # vocos receptive field: embed conv + 8 convnext blocks, kernel 7 each, +-27 frames, istft overlap +-2 frames
+    def __init__(self, vocoder, tile_frames=512, context_frames=32, fade_frames=4, hop_length=256):
+        assert 0 <= fade_frames < context_frames, "the cross-faded seam must lie within the decoded context"
+        self.vocoder = vocoder
+        self.tile_frames = tile_frames
+        self.context_frames = context_frames  # extra frames decoded on each side of a tile, then cut away
+        self.fade_frames = fade_frames  # frames on each side of a seam cross-faded between neighbouring tiles
+        self.hop_length = hop_length
+
+    def __getattr__(self, name):  # eval(), to(), h, ... of the wrapped vocoder
+        return getattr(self.__dict__["vocoder"], name)
+
+    def stream(self, mel: float["b d n"]) -> Iterator[torch.Tensor]:  # noqa: F722
+        """
+        Yield consecutive wave blocks float["b nw"] as the tiles are decoded, each block final.
+        Each tile of tile_frames frames is decoded together with context_frames of its neighbours, the samples of
+        the tile plus fade_frames on each side are kept and cross-faded with the neighbouring tiles at the seams,
+        so a block ends fade_frames before its tile does and the seam is emitted with the next one.
+        With context_frames covering the receptive field (vocos) the blocks concatenate to a full decode;
+        for larger receptive fields (bigvgan) the cross-fade hides the seams.
+        """
+        num_frames = mel.shape[-1]
+        if num_frames <= self.tile_frames + 2 * self.context_frames:
+            yield vocode(self.vocoder, mel)
+            return
+
+        hop, fade = self.hop_length, self.fade_frames
+        tail = None  # samples of the previous tile past its seam start, cross-faded into this one
+        for start in range(0, num_frames, self.tile_frames):
+            end = min(start + self.tile_frames, num_frames)
+            keep_start, keep_end = max(start - fade, 0), min(end + fade, num_frames)
+            ctx_start = max(keep_start - self.context_frames, 0)
+            ctx_end = min(keep_end + self.context_frames, num_frames)
+            tile_wave = vocode(self.vocoder, mel[..., ctx_start:ctx_end])
+            tile_wave = tile_wave[:, (keep_start - ctx_start) * hop : (keep_end - ctx_start) * hop]
+
+            if tail is not None:
+                overlap = tail.shape[-1]
+                fade_in = torch.linspace(0, 1, overlap, device=tile_wave.device, dtype=tile_wave.dtype)
+                tile_wave = torch.cat((torch.lerp(tail, tile_wave[:, :overlap], fade_in), tile_wave[:, overlap:]), -1)
+            if end >= num_frames:
+                yield tile_wave
+                return
+            seam_start = (end - fade - keep_start) * hop
+            yield tile_wave[:, :seam_start]
+            tail = tile_wave[:, seam_start:]
+
+    def decode(self, mel: float["b d n"]):  # noqa: F722
+        """
+        Tiled decode, see stream(). Peak activation memory depends on the tile size, not on the mel length,
+        and the output is exactly num_frames * hop_length samples long.
+        """
+        return torch.cat(list(TiledVocoder.stream(self, mel)), dim=-1)
+
+    def __call__(self, mel: float["b d n"]):  # noqa: F722
+        # same output shape as calling bigvgan
+        return self.decode(mel).unsqueeze(1)
+
+
+# streaming decode of a finished mel, tiles of window_frames decoded with receptive field context
+
+
+class StreamingVocoder(TiledVocoder):
+    def __init__(self, vocoder, window_frames=64, context_frames=32, fade_frames=4, hop_length=256):
+        super().__init__(vocoder, window_frames, context_frames, fade_frames, hop_length)
+
+    def stream(self, mel: float["1 d n"]) -> Iterator[torch.Tensor]:  # noqa: F722
+        """
+        Yield wave blocks float["nw"] as soon as each window is decoded, concatenated they equal decode(mel).
+        The first block needs window_frames + fade_frames + context_frames of mel, later ones one more window.
+        """
+        for block in super().stream(mel):
+            yield block[0]
+
+    def __call__(self, mel: float["1 d n"]):  # noqa: F722
+        return self.decode(mel)
+
+
+# fixed-length decode for compiled vocoders, mels right-padded up to a bucket length so compiled graphs are reused
+
+
+class BucketedVocoder:
+    def __init__(self, vocoder, buckets, hop_length=256, pad_value=math.log(1e-5), decode_fn=None):
+        self.vocoder = vocoder
+        self.buckets = sorted(buckets)
+        self.hop_length = hop_length
+        self.pad_value = pad_value  # log-mel floor, silence
+        self.decode_fn = decode_fn or partial(vocode, vocoder)  # mel float["b d n"] -> wave float["b nw"], compiled
+
+    def __getattr__(self, name):  # eval(), to(), h, ... of the wrapped vocoder
+        return getattr(self.__dict__["vocoder"], name)
+
+    def decode(self, mel: float["b d n"]):  # noqa: F722
+        num_frames = mel.shape[-1]
+        bucket = duration_bucket(num_frames, self.buckets)
+        if bucket > num_frames:
+            mel = F.pad(mel, (0, bucket - num_frames), value=self.pad_value)
+        return self.decode_fn(mel)[:, : num_frames * self.hop_length]
+
+    def __call__(self, mel: float["b d n"]):  # noqa: F722
+        # same output shape as calling bigvgan
+        return self.decode(mel).unsqueeze(1)
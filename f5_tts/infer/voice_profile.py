@@ -0,0 +1,151 @@
+# Voice profiles: reference audio preprocessed once (clip, trim, resample, loudness, mel, text) and reused,
+# kept in an in-memory LRU tier backed by an optional on-disk cache
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from f5_tts.infer.atomic_io import atomic_output
+
+
+class VoiceProfile:
+    def __init__(
+        self,
+        audio: float["1 nw"],  # trimmed reference wave at target sample rate, loudness normalized  # noqa: F722
+        rms: float,  # rms of the trimmed wave before normalization, generated audio is scaled back to it
+        ref_mel: float["1 n d"],  # mel of audio, as the model computes it  # noqa: F722
+        ref_text: str,  # normalized reference text, ending with a sentence punctuation
+        ref_text_tokens: list[str],  # ref_text after convert_char_to_pinyin, the model's text tokens
+    ):
+        self.audio = audio
+        self.rms = rms
+        self.ref_mel = ref_mel
+        self.ref_text = ref_text
+        self.ref_text_tokens = ref_text_tokens
+
+    def to(self, device):
+        audio, ref_mel = self.audio.to(device), self.ref_mel.to(device)
+        return VoiceProfile(audio, self.rms, ref_mel, self.ref_text, self.ref_text_tokens)
+
+    def state_dict(self):
+        return dict(
+            audio=self.audio.cpu(),
+            rms=self.rms,
+            ref_mel=self.ref_mel.cpu(),
+            ref_text=self.ref_text,
+            ref_text_tokens=self.ref_text_tokens,
+        )
+
+    @classmethod
+    def from_state_dict(cls, state_dict):
+        return cls(**state_dict)
+
+
+def build_voice_profile(ref_audio_orig, ref_text, mel_spec, target_rms=0.1, clip_short=True, show_info=print):
+    from f5_tts.infer.utils_infer import preprocess_ref_audio_text
+    from f5_tts.model.utils import convert_char_to_pinyin, resample
+
+    (audio, sr), ref_text = preprocess_ref_audio_text(
+        ref_audio_orig, ref_text, clip_short=clip_short, show_info=show_info
+    )
+    if audio.shape[0] > 1:
+        audio = torch.mean(audio, dim=0, keepdim=True)
+
+    rms = torch.sqrt(torch.mean(torch.square(audio))).item()
+    if rms < target_rms:
+        audio = audio * target_rms / rms
+    audio = resample(audio, sr, mel_spec.target_sample_rate)
+
+    with torch.inference_mode():
+        ref_mel = mel_spec(audio.to(mel_spec.dummy.device)).permute(0, 2, 1).cpu()
+
+    if len(ref_text[-1].encode("utf-8")) == 1:
+        ref_text = ref_text + " "
+    return VoiceProfile(audio, rms, ref_mel, ref_text, convert_char_to_pinyin([ref_text])[0])
+
+
+class VoiceProfileCache:
+    def __init__(self, mel_spec, max_items=16, cache_dir=None, target_rms=0.1, device=None):
+        self.mel_spec = mel_spec
+        self.max_items = max_items
+        self.cache_dir = cache_dir  # None: memory only
+        self.target_rms = target_rms
+        self.device = device
+        self.profiles = OrderedDict()  # key -> VoiceProfile on device, least recently used first
+        self.lock = threading.Lock()
+
+    def key(self, ref_audio_orig, ref_text, clip_short):
+        # content hash of the original audio, plus everything the profile depends on
+        # ref_audio_orig: path, encoded bytes or (wave, sr) with decoded samples, file-like objects are read by get()
+        hasher = hashlib.md5()
+        if isinstance(ref_audio_orig, tuple):
+            wave, sr = ref_audio_orig
+            wave = wave.detach().cpu().numpy() if isinstance(wave, torch.Tensor) else wave
+            wave = np.ascontiguousarray(wave, dtype=np.float32)
+            hasher.update(repr(("samples", wave.shape, int(sr))).encode("utf-8"))
+            hasher.update(wave.tobytes())
+        elif isinstance(ref_audio_orig, (bytes, bytearray)):
+            hasher.update(ref_audio_orig)
+        elif isinstance(ref_audio_orig, (str, os.PathLike)):
+            with open(ref_audio_orig, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    hasher.update(block)
+        else:
+            raise TypeError(
+                f"Unsupported reference audio {type(ref_audio_orig).__name__}, "
+                "expected a path, bytes, a file-like object or (wave, sr)"
+            )
+        mel_spec = self.mel_spec
+        config = (
+            ref_text,
+            clip_short,
+            self.target_rms,
+            mel_spec.extractor.__name__,
+            mel_spec.n_fft,
+            mel_spec.hop_length,
+            mel_spec.win_length,
+            mel_spec.n_mel_channels,
+            mel_spec.target_sample_rate,
+        )
+        hasher.update(repr(config).encode("utf-8"))
+        return hasher.hexdigest()
+
+    def get(self, ref_audio_orig, ref_text="", clip_short=True, show_info=print):
+        if hasattr(ref_audio_orig, "read"):  # file-like, read once, hashed and decoded from the same bytes
+            ref_audio_orig = ref_audio_orig.read()
+        key = self.key(ref_audio_orig, ref_text, clip_short)
+        with self.lock:
+            if key in self.profiles:
+                self.profiles.move_to_end(key)
+                return self.profiles[key]
+
+        path = os.path.join(self.cache_dir, f"{key}.pt") if self.cache_dir is not None else None
+        if path is not None and os.path.exists(path):
+            show_info("Using cached voice profile...")
+            profile = VoiceProfile.from_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+        else:
+            profile = build_voice_profile(
+                ref_audio_orig, ref_text, self.mel_spec, self.target_rms, clip_short=clip_short, show_info=show_info
+            )
+            if path is not None:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with atomic_output(path) as tmp_path:  # workers building the same profile may race here
+                    torch.save(profile.state_dict(), tmp_path)
+
+        if self.device is not None:
+            profile = profile.to(self.device)
+        with self.lock:
+            self.profiles[key] = profile
+            if len(self.profiles) > self.max_items:
+                self.profiles.popitem(last=False)
+        return profile
+
+    def clear(self):
+        with self.lock:
+            self.profiles.clear()
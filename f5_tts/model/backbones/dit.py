@@ -21,7 +21,10 @@ from f5_tts.model.modules import (
     ConvPositionEmbedding,
     DiTBlock,
     AdaLayerNormZero_Final,
+    drop_cond_audio,
     precompute_freqs_cis,
+    project_cond,
+    project_x,
     get_pos_embed_indices,
 )
 
@@ -44,13 +47,15 @@ class TextEmbedding(nn.Module):
         else:
             self.extra_modeling = False
 
-    def forward(self, text: int["b nt"], seq_len, drop_text=False):  # noqa: F722
+    def forward(self, text: int["b nt"], seq_len, drop_text=False, mask: bool["b n"] | None = None):  # noqa: F722
         text = text + 1  # use 0 as filler token. preprocess of batch pad -1, see list_str_to_idx()
         text = text[:, :seq_len]  # curtail if character tokens are more than the mel spec tokens
         batch, text_len = text.shape[0], text.shape[1]
         text = F.pad(text, (0, seq_len - text_len), value=0)
 
-        if drop_text:  # cfg for text
+        if torch.is_tensor(drop_text):  # per-sample cfg for text, e.g. cond and null branches stacked in one batch
+            text = text.masked_fill(drop_text.view(-1, 1), 0)
+        elif drop_text:  # cfg for text
             text = torch.zeros_like(text)
 
         text = self.text_embed(text)  # b n -> b n d
@@ -63,8 +68,9 @@ class TextEmbedding(nn.Module):
             text_pos_embed = self.freqs_cis[pos_idx]
             text = text + text_pos_embed
 
-            # convnextv2 blocks
-            text = self.text_blocks(text)
+            # convnextv2 blocks, padded frames of a batch masked out if mask given
+            for block in self.text_blocks:
+                text = block(text, mask=mask)
 
         return text
 
@@ -75,18 +81,68 @@ class TextEmbedding(nn.Module):
 class InputEmbedding(nn.Module):
     def __init__(self, mel_dim, text_dim, out_dim):
         super().__init__()
+        self.mel_dim = mel_dim
         self.proj = nn.Linear(mel_dim * 2 + text_dim, out_dim)
         self.conv_pos_embed = ConvPositionEmbedding(dim=out_dim)
 
-    def forward(self, x: float["b n d"], cond: float["b n d"], text_embed: float["b n d"], drop_audio_cond=False):  # noqa: F722
-        if drop_audio_cond:  # cfg for cond audio
-            cond = torch.zeros_like(cond)
+    def embed_cond(self, cond: float["b n d"], text_embed: float["b n d"], drop_audio_cond=False):  # noqa: F722
+        # step-invariant part of the input projection, i.e. the cond & text columns plus bias
+        return project_cond(self.proj, self.mel_dim, drop_cond_audio(cond, drop_audio_cond), text_embed)
 
-        x = self.proj(torch.cat((x, cond, text_embed), dim=-1))
-        x = self.conv_pos_embed(x) + x
+    def forward(
+        self,
+        x: float["b n d"],  # noqa: F722
+        cond: float["b n d"] | None = None,  # noqa: F722
+        text_embed: float["b n d"] | None = None,  # noqa: F722
+        drop_audio_cond=False,
+        cond_embed: float["b n d"] | None = None,  # noqa: F722
+        mask: bool["b n"] | None = None,  # noqa: F722
+    ):
+        if cond_embed is not None:  # precomputed with embed_cond(), only project x
+            x = project_x(self.proj, self.mel_dim, x, cond_embed)
+        else:
+            x = self.proj(torch.cat((x, drop_cond_audio(cond, drop_audio_cond), text_embed), dim=-1))
+        x = self.conv_pos_embed(x, mask=mask) + x
         return x
 
 
+# Cross-step reuse of the deep blocks' output (DeepCache-style), inference only
+
+
+class BlockCache:
+    """
+    Consecutive ode steps feed very similar x into the transformer blocks. Every `interval` calls per branch
+    all blocks run (full step) and the residual added by blocks [start, end) is stored, other calls (cheap steps)
+    only run the shallow blocks and add back the stored residual. Branches (cond / null / fused cfg, batch shape)
+    are cached separately. A fresh cache is needed per sampling call.
+    """
+
+    def __init__(self, depth, interval=2, start=4, end=-4):
+        self.interval = interval
+        self.start = start if start >= 0 else depth + start
+        self.end = end if end >= 0 else depth + end
+        self.calls = {}
+        self.deltas = {}
+        self.hits = 0  # cheap steps, deep blocks skipped
+        self.misses = 0  # full steps
+
+    def branch_key(self, x, drop_audio_cond, drop_text):
+        def flag(drop):
+            return drop if isinstance(drop, bool) else "per-sample"
+
+        return flag(drop_audio_cond), flag(drop_text), tuple(x.shape)
+
+    def is_full_step(self, key):
+        call = self.calls.get(key, 0)
+        self.calls[key] = call + 1
+        full = key not in self.deltas or call % self.interval == 0
+        if full:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return full
+
+
 # Transformer backbone using DiT blocks
 
 
@@ -130,6 +186,11 @@ class DiT(nn.Module):
 
         self.checkpoint_activations = checkpoint_activations
 
+        # adaln modulation params per sampling schedule, see cached_modulation()
+        self.modulation_cache = {}
+        # new weights loaded in place (also when loading a parent module), drop params computed from the old ones
+        self.register_load_state_dict_post_hook(lambda module, incompatible_keys: module.modulation_cache.clear())
+
     def ckpt_wrapper(self, module):
         # https://github.com/chuanyangjin/fast-DiT/blob/main/models.py
         def ckpt_forward(*inputs):
@@ -138,40 +199,131 @@ class DiT(nn.Module):
 
         return ckpt_forward
 
+    def train(self, mode: bool = True):
+        if mode:  # weights are about to change, drop modulation params computed from the old ones
+            self.modulation_cache.clear()
+        return super().train(mode)
+
+    def _apply(self, *args, **kwargs):
+        # .to() / .half() / .cuda() etc. (also through a parent module), cached params are in the old dtype / device
+        self.modulation_cache.clear()
+        return super()._apply(*args, **kwargs)
+
+    def cached_modulation(self, key, times: float["s"]):  # noqa: F821
+        # time embedding & adaln modulation only depend on the time steps of the ode schedule,
+        # so compute them for all steps at once, keep them for later sampling calls with the same key
+        if key not in self.modulation_cache:
+            t = self.time_embed(times)
+            self.modulation_cache[key] = dict(
+                times=times,
+                blocks=torch.stack(
+                    [block.attn_norm.linear(block.attn_norm.silu(t)) for block in self.transformer_blocks]
+                ),  # depth s 6d
+                final=self.norm_out.linear(self.norm_out.silu(t)),  # s 2d
+            )
+        return self.modulation_cache[key]
+
+    def new_block_cache(self, **settings):
+        # settings: interval, start, end, see BlockCache
+        return BlockCache(self.depth, **settings)
+
+    def prepare_context(
+        self,
+        cond: float["b n d"],  # masked cond audio  # noqa: F722
+        text: int["b nt"],  # text  # noqa: F722
+        drop_audio_cond=False,  # cfg for cond audio, bool or bool["b"] per-sample mask
+        drop_text=False,  # cfg for text, bool or bool["b"] per-sample mask
+        mask: bool["b n"] | None = None,  # frames of each item in a padded batch  # noqa: F722
+    ):
+        # step-invariant conditioning, compute once per sampling call and pass to forward() as context
+        # with mask, the per-item padding is kept at zero through the convs (text blocks, conv position embedding),
+        # so each item of a batch gets the same output as sampled alone
+        seq_len = cond.shape[1]
+        text_embed = self.text_embed(text, seq_len, drop_text=drop_text, mask=mask)
+        cond_embed = self.input_embed.embed_cond(cond, text_embed, drop_audio_cond=drop_audio_cond)
+        rope = self.rotary_embed.forward_from_seq_len(seq_len)
+        context = dict(cond_embed=cond_embed, rope=rope)
+        if mask is not None:
+            context["pad_mask"] = mask
+        return context
+
+    def pad_context(self, context: dict, seq_len: int):
+        # context from prepare_context() right-padded to seq_len frames, padded frames must be masked out in forward()
+        # pad_mask keeps the extra frames at zero through the conv position embedding, so the original frames see
+        # the same conv zero padding as without it
+        cond_embed = context["cond_embed"]
+        pad_len = seq_len - cond_embed.shape[1]
+        if "pad_mask" in context:
+            pad_mask = F.pad(context["pad_mask"], (0, pad_len), value=False)
+        else:
+            pad_mask = torch.arange(seq_len, device=cond_embed.device)[None] < cond_embed.shape[1]
+        cond_embed = F.pad(cond_embed, (0, 0, 0, pad_len), value=0.0)
+        return dict(cond_embed=cond_embed, rope=self.rotary_embed.forward_from_seq_len(seq_len), pad_mask=pad_mask)
+
     def forward(
         self,
         x: float["b n d"],  # nosied input audio  # noqa: F722
         cond: float["b n d"],  # masked cond audio  # noqa: F722
         text: int["b nt"],  # text  # noqa: F722
         time: float["b"] | float[""],  # time step  # noqa: F821 F722
-        drop_audio_cond,  # cfg for cond audio
-        drop_text,  # cfg for text
+        drop_audio_cond,  # cfg for cond audio, bool or bool["b"] per-sample mask
+        drop_text,  # cfg for text, bool or bool["b"] per-sample mask
         mask: bool["b n"] | None = None,  # noqa: F722
+        context: dict | None = None,  # from prepare_context(), if given cond, text and drop flags are ignored
+        modulation: dict | None = None,  # from cached_modulation(), must contain the current time step
+        block_cache: BlockCache | None = None,  # from new_block_cache(), reuse deep blocks across ode steps
     ):
         batch, seq_len = x.shape[0], x.shape[1]
         if time.ndim == 0:
             time = time.repeat(batch)
 
         # t: conditioning time, c: context (text + masked cond audio), x: noised input audio
-        t = self.time_embed(time)
-        text_embed = self.text_embed(text, seq_len, drop_text=drop_text)
-        x = self.input_embed(x, cond, text_embed, drop_audio_cond=drop_audio_cond)
-
-        rope = self.rotary_embed.forward_from_seq_len(seq_len)
+        if modulation is not None:
+            # nearest cached time step, looked up on device to avoid a host sync
+            idx = (modulation["times"] - time[:1]).abs().argmin()
+            block_modulation = modulation["blocks"].index_select(1, idx.view(1))  # depth 1 6d
+            final_modulation = modulation["final"].index_select(0, idx.view(1))  # 1 2d
+            t = None
+        else:
+            block_modulation = [None] * self.depth
+            final_modulation = None
+            t = self.time_embed(time)
+        if context is not None:
+            x = self.input_embed(x, cond_embed=context["cond_embed"], mask=context.get("pad_mask"))
+            rope = context["rope"]
+        else:
+            text_embed = self.text_embed(text, seq_len, drop_text=drop_text)
+            x = self.input_embed(x, cond, text_embed, drop_audio_cond=drop_audio_cond)
+            rope = self.rotary_embed.forward_from_seq_len(seq_len)
 
         if self.long_skip_connection is not None:
             residual = x
 
-        for block in self.transformer_blocks:
+        if block_cache is not None:
+            cache_key = block_cache.branch_key(x, drop_audio_cond, drop_text)
+            full_step = block_cache.is_full_step(cache_key)
+
+        for i, (block, block_mod) in enumerate(zip(self.transformer_blocks, block_modulation)):
+            if block_cache is not None and block_cache.start <= i < block_cache.end:
+                if not full_step:  # cheap step, deep blocks replaced by their residual from the last full step
+                    if i == block_cache.start:
+                        x = x + block_cache.deltas[cache_key]
+                    continue
+                if i == block_cache.start:
+                    deep_input = x
+
             if self.checkpoint_activations:
-                x = torch.utils.checkpoint.checkpoint(self.ckpt_wrapper(block), x, t, mask, rope)
+                x = torch.utils.checkpoint.checkpoint(self.ckpt_wrapper(block), x, t, mask, rope, block_mod)
             else:
-                x = block(x, t, mask=mask, rope=rope)
+                x = block(x, t, mask=mask, rope=rope, modulation=block_mod)
+
+            if block_cache is not None and full_step and i == block_cache.end - 1:
+                block_cache.deltas[cache_key] = x - deep_input
 
         if self.long_skip_connection is not None:
             x = self.long_skip_connection(torch.cat((x, residual), dim=-1))
 
-        x = self.norm_out(x, t)
+        x = self.norm_out(x, t, modulation=final_modulation)
         output = self.proj_out(x)
 
         return output
@@ -19,7 +19,10 @@ from f5_tts.model.modules import (
     ConvPositionEmbedding,
     MMDiTBlock,
     AdaLayerNormZero_Final,
+    drop_cond_audio,
     precompute_freqs_cis,
+    project_cond,
+    project_x,
     get_pos_embed_indices,
 )
 
@@ -37,7 +40,9 @@ class TextEmbedding(nn.Module):
 
     def forward(self, text: int["b nt"], drop_text=False) -> int["b nt d"]:  # noqa: F722
         text = text + 1
-        if drop_text:
+        if torch.is_tensor(drop_text):  # per-sample cfg for text
+            text = text.masked_fill(drop_text.view(-1, 1), 0)
+        elif drop_text:
             text = torch.zeros_like(text)
         text = self.text_embed(text)
 
@@ -58,14 +63,26 @@ class TextEmbedding(nn.Module):
 class AudioEmbedding(nn.Module):
     def __init__(self, in_dim, out_dim):
         super().__init__()
+        self.in_dim = in_dim
         self.linear = nn.Linear(2 * in_dim, out_dim)
         self.conv_pos_embed = ConvPositionEmbedding(out_dim)
 
-    def forward(self, x: float["b n d"], cond: float["b n d"], drop_audio_cond=False):  # noqa: F722
-        if drop_audio_cond:
-            cond = torch.zeros_like(cond)
-        x = torch.cat((x, cond), dim=-1)
-        x = self.linear(x)
+    def embed_cond(self, cond: float["b n d"], drop_audio_cond=False):  # noqa: F722
+        # step-invariant part of the input projection, i.e. the cond columns plus bias
+        return project_cond(self.linear, self.in_dim, drop_cond_audio(cond, drop_audio_cond))
+
+    def forward(
+        self,
+        x: float["b n d"],  # noqa: F722
+        cond: float["b n d"] | None = None,  # noqa: F722
+        drop_audio_cond=False,
+        cond_embed: float["b n d"] | None = None,  # noqa: F722
+    ):
+        if cond_embed is not None:  # precomputed with embed_cond(), only project x
+            x = project_x(self.linear, self.in_dim, x, cond_embed)
+        else:
+            x = torch.cat((x, drop_cond_audio(cond, drop_audio_cond)), dim=-1)
+            x = self.linear(x)
         x = self.conv_pos_embed(x) + x
         return x
 
@@ -113,15 +130,30 @@ class MMDiT(nn.Module):
         self.norm_out = AdaLayerNormZero_Final(dim)  # final modulation
         self.proj_out = nn.Linear(dim, mel_dim)
 
+    def prepare_context(
+        self,
+        cond: float["b n d"],  # masked cond audio  # noqa: F722
+        text: int["b nt"],  # text  # noqa: F722
+        drop_audio_cond=False,  # cfg for cond audio, bool or bool["b"] per-sample mask
+        drop_text=False,  # cfg for text, bool or bool["b"] per-sample mask
+    ):
+        # step-invariant conditioning, compute once per sampling call and pass to forward() as context
+        c = self.text_embed(text, drop_text=drop_text)
+        cond_embed = self.audio_embed.embed_cond(cond, drop_audio_cond=drop_audio_cond)
+        rope_audio = self.rotary_embed.forward_from_seq_len(cond.shape[1])
+        rope_text = self.rotary_embed.forward_from_seq_len(text.shape[1])
+        return dict(c=c, cond_embed=cond_embed, rope_audio=rope_audio, rope_text=rope_text)
+
     def forward(
         self,
         x: float["b n d"],  # nosied input audio  # noqa: F722
         cond: float["b n d"],  # masked cond audio  # noqa: F722
         text: int["b nt"],  # text  # noqa: F722
         time: float["b"] | float[""],  # time step  # noqa: F821 F722
-        drop_audio_cond,  # cfg for cond audio
-        drop_text,  # cfg for text
+        drop_audio_cond,  # cfg for cond audio, bool or bool["b"] per-sample mask
+        drop_text,  # cfg for text, bool or bool["b"] per-sample mask
         mask: bool["b n"] | None = None,  # noqa: F722
+        context: dict | None = None,  # from prepare_context(), if given cond, text and drop flags are ignored
     ):
         batch = x.shape[0]
         if time.ndim == 0:
@@ -129,13 +161,18 @@ class MMDiT(nn.Module):
 
         # t: conditioning (time), c: context (text + masked cond audio), x: noised input audio
         t = self.time_embed(time)
-        c = self.text_embed(text, drop_text=drop_text)
-        x = self.audio_embed(x, cond, drop_audio_cond=drop_audio_cond)
-
-        seq_len = x.shape[1]
-        text_len = text.shape[1]
-        rope_audio = self.rotary_embed.forward_from_seq_len(seq_len)
-        rope_text = self.rotary_embed.forward_from_seq_len(text_len)
+        if context is not None:
+            c = context["c"]
+            x = self.audio_embed(x, cond_embed=context["cond_embed"])
+            rope_audio, rope_text = context["rope_audio"], context["rope_text"]
+        else:
+            c = self.text_embed(text, drop_text=drop_text)
+            x = self.audio_embed(x, cond, drop_audio_cond=drop_audio_cond)
+
+            seq_len = x.shape[1]
+            text_len = text.shape[1]
+            rope_audio = self.rotary_embed.forward_from_seq_len(seq_len)
+            rope_text = self.rotary_embed.forward_from_seq_len(text_len)
 
         for block in self.transformer_blocks:
             c, x = block(x, c, t, mask=mask, rope=rope_audio, c_rope=rope_text)
@@ -24,7 +24,10 @@ from f5_tts.model.modules import (
     Attention,
     AttnProcessor,
     FeedForward,
+    drop_cond_audio,
     precompute_freqs_cis,
+    project_cond,
+    project_x,
     get_pos_embed_indices,
 )
 
@@ -53,7 +56,9 @@ class TextEmbedding(nn.Module):
         batch, text_len = text.shape[0], text.shape[1]
         text = F.pad(text, (0, seq_len - text_len), value=0)
 
-        if drop_text:  # cfg for text
+        if torch.is_tensor(drop_text):  # per-sample cfg for text, e.g. cond and null branches stacked in one batch
+            text = text.masked_fill(drop_text.view(-1, 1), 0)
+        elif drop_text:  # cfg for text
             text = torch.zeros_like(text)
 
         text = self.text_embed(text)  # b n -> b n d
@@ -78,14 +83,26 @@ class TextEmbedding(nn.Module):
 class InputEmbedding(nn.Module):
     def __init__(self, mel_dim, text_dim, out_dim):
         super().__init__()
+        self.mel_dim = mel_dim
         self.proj = nn.Linear(mel_dim * 2 + text_dim, out_dim)
         self.conv_pos_embed = ConvPositionEmbedding(dim=out_dim)
 
-    def forward(self, x: float["b n d"], cond: float["b n d"], text_embed: float["b n d"], drop_audio_cond=False):  # noqa: F722
-        if drop_audio_cond:  # cfg for cond audio
-            cond = torch.zeros_like(cond)
+    def embed_cond(self, cond: float["b n d"], text_embed: float["b n d"], drop_audio_cond=False):  # noqa: F722
+        # step-invariant part of the input projection, i.e. the cond & text columns plus bias
+        return project_cond(self.proj, self.mel_dim, drop_cond_audio(cond, drop_audio_cond), text_embed)
 
-        x = self.proj(torch.cat((x, cond, text_embed), dim=-1))
+    def forward(
+        self,
+        x: float["b n d"],  # noqa: F722
+        cond: float["b n d"] | None = None,  # noqa: F722
+        text_embed: float["b n d"] | None = None,  # noqa: F722
+        drop_audio_cond=False,
+        cond_embed: float["b n d"] | None = None,  # noqa: F722
+    ):
+        if cond_embed is not None:  # precomputed with embed_cond(), only project x
+            x = project_x(self.proj, self.mel_dim, x, cond_embed)
+        else:
+            x = self.proj(torch.cat((x, drop_cond_audio(cond, drop_audio_cond), text_embed), dim=-1))
         x = self.conv_pos_embed(x) + x
         return x
 
@@ -161,15 +178,30 @@ class UNetT(nn.Module):
         self.norm_out = RMSNorm(dim)
         self.proj_out = nn.Linear(dim, mel_dim)
 
+    def prepare_context(
+        self,
+        cond: float["b n d"],  # masked cond audio  # noqa: F722
+        text: int["b nt"],  # text  # noqa: F722
+        drop_audio_cond=False,  # cfg for cond audio, bool or bool["b"] per-sample mask
+        drop_text=False,  # cfg for text, bool or bool["b"] per-sample mask
+    ):
+        # step-invariant conditioning, compute once per sampling call and pass to forward() as context
+        seq_len = cond.shape[1]
+        text_embed = self.text_embed(text, seq_len, drop_text=drop_text)
+        cond_embed = self.input_embed.embed_cond(cond, text_embed, drop_audio_cond=drop_audio_cond)
+        rope = self.rotary_embed.forward_from_seq_len(seq_len + 1)
+        return dict(cond_embed=cond_embed, rope=rope)
+
     def forward(
         self,
         x: float["b n d"],  # nosied input audio  # noqa: F722
         cond: float["b n d"],  # masked cond audio  # noqa: F722
         text: int["b nt"],  # text  # noqa: F722
         time: float["b"] | float[""],  # time step  # noqa: F821 F722
-        drop_audio_cond,  # cfg for cond audio
-        drop_text,  # cfg for text
+        drop_audio_cond,  # cfg for cond audio, bool or bool["b"] per-sample mask
+        drop_text,  # cfg for text, bool or bool["b"] per-sample mask
         mask: bool["b n"] | None = None,  # noqa: F722
+        context: dict | None = None,  # from prepare_context(), if given cond, text and drop flags are ignored
     ):
         batch, seq_len = x.shape[0], x.shape[1]
         if time.ndim == 0:
@@ -177,16 +209,19 @@ class UNetT(nn.Module):
 
         # t: conditioning time, c: context (text + masked cond audio), x: noised input audio
         t = self.time_embed(time)
-        text_embed = self.text_embed(text, seq_len, drop_text=drop_text)
-        x = self.input_embed(x, cond, text_embed, drop_audio_cond=drop_audio_cond)
+        if context is not None:
+            x = self.input_embed(x, cond_embed=context["cond_embed"])
+            rope = context["rope"]
+        else:
+            text_embed = self.text_embed(text, seq_len, drop_text=drop_text)
+            x = self.input_embed(x, cond, text_embed, drop_audio_cond=drop_audio_cond)
+            rope = self.rotary_embed.forward_from_seq_len(seq_len + 1)
 
         # postfix time t to input x, [b n d] -> [b n+1 d]
         x = torch.cat([t.unsqueeze(1), x], dim=1)  # pack t to x
         if mask is not None:
             mask = F.pad(mask, (1, 0), value=1)
 
-        rope = self.rotary_embed.forward_from_seq_len(seq_len + 1)
-
         # flat unet transformer
         skip_connect_type = self.skip_connect_type
         skips = []
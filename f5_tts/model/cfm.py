@@ -16,11 +16,12 @@ import torch
 import torch.nn.functional as F
 from torch import nn
 from torch.nn.utils.rnn import pad_sequence
-from torchdiffeq import odeint
 
 from f5_tts.model.modules import MelSpec
+from f5_tts.model.sampler import call_times, eval_times, odeint
 from f5_tts.model.utils import (
     default,
+    duration_bucket,
     exists,
     lens_to_mask,
     list_str_to_idx,
@@ -70,10 +71,14 @@ class CFM(nn.Module):
 
         # sampling related
         self.odeint_kwargs = odeint_kwargs
+        self.last_sample_stats = dict()
 
         # vocab map for tokenization
         self.vocab_char_map = vocab_char_map
 
+        # sequence lengths sample() pads up to, so compiled backbone graphs are reused, see infer/compile_mode.py
+        self.duration_buckets = None
+
     @property
     def device(self):
         return next(self.parameters()).device
@@ -96,6 +101,15 @@ class CFM(nn.Module):
         duplicate_test=False,
         t_inter=0.1,
         edit_mask=None,
+        fused_cfg=False,
+        cache_modulation=False,
+        return_trajectory=False,
+        step_callback=None,  # step_callback(step, total) after each ode step, raise inside to cancel
+        ode_method: str | None = None,  # overrides odeint_kwargs method, see sampler.FIXED_GRID_SOLVERS
+        adaptive_tol: float | None = None,  # early jump to t=1 once velocity stops changing, e.g. 0.02
+        cfg_interval: tuple[float, float] | None = None,  # guidance only for t in [lo, hi], e.g. (0, 0.6)
+        cfg_reuse_steps: list[int] | None = None,  # indices of flow evaluations reusing the last null prediction
+        block_cache: dict | None = None,  # deep block reuse across steps, e.g. dict(interval=2, start=4, end=-4)
     ):
         self.eval()
         # raw wave
@@ -105,7 +119,10 @@ class CFM(nn.Module):
             cond = cond.permute(0, 2, 1)
             assert cond.shape[-1] == self.num_channels
 
-        cond = cond.to(next(self.parameters()).dtype)
+        model_dtype = next(self.parameters()).dtype
+        cond = cond.to(model_dtype)
+        # bf16 (8 bit mantissa) is too coarse to accumulate ode steps in, state and flow are kept in fp32 then
+        state_dtype = torch.float32 if model_dtype == torch.bfloat16 else model_dtype
 
         batch, cond_seq_len, device = *cond.shape[:2], cond.device
         if not exists(lens):
@@ -149,29 +166,93 @@ class CFM(nn.Module):
             cond_mask, cond, torch.zeros_like(cond)
         )  # allow direct control (cut cond audio) with lens passed in
 
-        if batch > 1:
-            mask = lens_to_mask(duration)
+        # padded up to a duration bucket (compiled mode), the extra frames are masked out and cut from the output
+        bucketed = exists(self.duration_buckets) and hasattr(self.transformer, "pad_context")
+        seq_len = duration_bucket(int(max_duration), self.duration_buckets) if bucketed else int(max_duration)
+        pad_len = seq_len - int(max_duration)
+
+        if batch > 1 or bucketed:
+            mask = lens_to_mask(duration, length=seq_len)
         else:  # save memory and speed up, as single inference need no mask currently
             mask = None
 
         # neural ode
 
-        def fn(t, x):
+        # guidance schedule, null branch skipped outside cfg_interval or reused from cache at cfg_reuse_steps
+        cfg_reuse_steps = set(cfg_reuse_steps) if exists(cfg_reuse_steps) else set()
+        cfg_scheduled = exists(cfg_interval) or len(cfg_reuse_steps) > 0
+        cfg_cache = dict(calls=0, null_pred=None)
+
+        # per-item padding of a batch masked in the context convs too (DiT), see DiT.prepare_context()
+        mask_context = batch > 1 and hasattr(self.transformer, "pad_context")
+
+        def prepare_context(cond, text, mask=None, **drop_kwargs):
+            if mask_context:
+                drop_kwargs["mask"] = mask[:, : cond.shape[1]]
+            context = self.transformer.prepare_context(cond, text, **drop_kwargs)
+            return self.transformer.pad_context(context, seq_len) if pad_len > 0 else context
+
+        # step-invariant conditioning (text embedding, cond & text input projection, rope) computed once here
+        if cfg_strength < 1e-5 or not fused_cfg or cfg_scheduled:
+            context = prepare_context(step_cond, text, mask, drop_audio_cond=False, drop_text=False)
+        if cfg_strength >= 1e-5 and fused_cfg:
+            # stack cond and null branches along batch, a single transformer forward per step
+            cfg_drop = torch.arange(2 * batch, device=device) >= batch  # first half cond, second half null
+            cfg_mask = torch.cat((mask, mask), dim=0) if exists(mask) else None
+            fused_context = prepare_context(
+                torch.cat((step_cond, step_cond), dim=0),
+                torch.cat((text, text), dim=0),
+                cfg_mask,
+                drop_audio_cond=cfg_drop,
+                drop_text=cfg_drop,
+            )
+        elif cfg_strength >= 1e-5:
+            null_context = prepare_context(step_cond, text, mask, drop_audio_cond=True, drop_text=True)
+
+        def flow(t, x):
             # at each step, conditioning is fixed
             # step_cond = torch.where(cond_mask, cond, torch.zeros_like(cond))
 
             # predict flow
-            pred = self.transformer(
-                x=x, cond=step_cond, text=text, time=t, mask=mask, drop_audio_cond=False, drop_text=False
-            )
+            pred_kwargs = dict(x=x, cond=step_cond, text=text, time=t, mask=mask, **step_kwargs)
             if cfg_strength < 1e-5:
-                return pred
+                return self.transformer(**pred_kwargs, drop_audio_cond=False, drop_text=False, context=context)
+
+            call = cfg_cache["calls"]
+            cfg_cache["calls"] += 1
+            if exists(cfg_interval):
+                t_now = cfg_call_times[call] if exists(cfg_call_times) else t.item()
+                if not cfg_interval[0] <= t_now <= cfg_interval[1]:
+                    return self.transformer(**pred_kwargs, drop_audio_cond=False, drop_text=False, context=context)
+
+            if call in cfg_reuse_steps and exists(cfg_cache["null_pred"]):
+                pred = self.transformer(**pred_kwargs, drop_audio_cond=False, drop_text=False, context=context)
+                null_pred = cfg_cache["null_pred"]
+            elif fused_cfg:
+                pred, null_pred = self.transformer(
+                    x=torch.cat((x, x), dim=0),
+                    cond=None,
+                    text=None,
+                    time=t,
+                    mask=cfg_mask,
+                    drop_audio_cond=cfg_drop,
+                    drop_text=cfg_drop,
+                    context=fused_context,
+                    **step_kwargs,
+                ).chunk(2, dim=0)
+            else:
+                pred = self.transformer(**pred_kwargs, drop_audio_cond=False, drop_text=False, context=context)
+                null_pred = self.transformer(**pred_kwargs, drop_audio_cond=True, drop_text=True, context=null_context)
 
-            null_pred = self.transformer(
-                x=x, cond=step_cond, text=text, time=t, mask=mask, drop_audio_cond=True, drop_text=True
-            )
+            if len(cfg_reuse_steps) > 0:
+                cfg_cache["null_pred"] = null_pred
             return pred + (pred - null_pred) * cfg_strength
 
+        def fn(t, x):
+            if state_dtype == model_dtype:
+                return flow(t, x)
+            return flow(t.to(model_dtype), x.to(model_dtype)).to(state_dtype)
+
         # noise input
         # to make sure batch inference result is same with different batch size, and for sure single inference
         # still some difference maybe due to convolutional layers
@@ -179,7 +260,7 @@ class CFM(nn.Module):
         for dur in duration:
             if exists(seed):
                 torch.manual_seed(seed)
-            y0.append(torch.randn(dur, self.num_channels, device=self.device, dtype=step_cond.dtype))
+            y0.append(torch.randn(dur, self.num_channels, device=self.device, dtype=state_dtype))
         y0 = pad_sequence(y0, padding_value=0, batch_first=True)
 
         t_start = 0
@@ -190,13 +271,48 @@ class CFM(nn.Module):
             y0 = (1 - t_start) * y0 + t_start * test_cond
             steps = int(steps * (1 - t_start))
 
-        t = torch.linspace(t_start, 1, steps + 1, device=self.device, dtype=step_cond.dtype)
+        if pad_len > 0:
+            y0 = F.pad(y0, (0, 0, 0, pad_len), value=0.0)
+
+        t = torch.linspace(t_start, 1, steps + 1, device=self.device, dtype=state_dtype)
         if sway_sampling_coef is not None:
             t = t + sway_sampling_coef * (torch.cos(torch.pi / 2 * t) - 1 + t)
 
-        trajectory = odeint(fn, y0, t, **self.odeint_kwargs)
-
-        sampled = trajectory[-1]
+        # time embedding & adaln modulation only depend on the schedule, cached in the backbone across calls
+        odeint_kwargs = dict(self.odeint_kwargs)
+        method = odeint_kwargs.pop("method", "euler")
+        if ode_method is not None:
+            method = ode_method
+        step_kwargs = dict()
+        step_times = eval_times(t, method)
+        # host side times of the successive flow evaluations, so the guidance interval check needs no device sync
+        cfg_call_times = call_times(t.tolist(), method) if exists(cfg_interval) else None
+        if cache_modulation and hasattr(self.transformer, "cached_modulation") and exists(step_times):
+            key = (steps, sway_sampling_coef, method, t_start, model_dtype, t.device)
+            step_kwargs["modulation"] = self.transformer.cached_modulation(key, step_times.to(model_dtype))
+        if exists(block_cache) and hasattr(self.transformer, "new_block_cache"):
+            step_kwargs["block_cache"] = self.transformer.new_block_cache(**block_cache)
+
+        # trajectory only kept if asked for, otherwise None
+        self.last_sample_stats = dict()  # steps / nfe actually used, shared by the whole batch
+        sampled, trajectory = odeint(
+            fn,
+            y0,
+            t,
+            method=method,
+            return_trajectory=return_trajectory,
+            step_callback=step_callback,
+            adaptive_tol=adaptive_tol,
+            stats=self.last_sample_stats,
+            **odeint_kwargs,
+        )
+        if "block_cache" in step_kwargs:
+            self.last_sample_stats.update(
+                block_cache_hits=step_kwargs["block_cache"].hits, block_cache_misses=step_kwargs["block_cache"].misses
+            )
+        if pad_len > 0:
+            sampled = sampled[:, : seq_len - pad_len]
+            trajectory = trajectory[:, :, : seq_len - pad_len] if exists(trajectory) else None
         out = sampled
         out = torch.where(cond_mask, cond, out)
 
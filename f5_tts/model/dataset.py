@@ -11,7 +11,7 @@ from torch.utils.data import Dataset, Sampler
 from tqdm import tqdm
 
 from f5_tts.model.modules import MelSpec
-from f5_tts.model.utils import default
+from f5_tts.model.utils import default, resample, resample_batch
 
 
 class HFDataset(Dataset):
@@ -61,9 +61,7 @@ class HFDataset(Dataset):
 
         audio_tensor = torch.from_numpy(audio).float()
 
-        if sample_rate != self.target_sample_rate:
-            resampler = torchaudio.transforms.Resample(sample_rate, self.target_sample_rate)
-            audio_tensor = resampler(audio_tensor)
+        audio_tensor = resample(audio_tensor, sample_rate, self.target_sample_rate)
 
         audio_tensor = audio_tensor.unsqueeze(0)  # 't -> 1 t')
 
@@ -125,32 +123,36 @@ class CustomDataset(Dataset):
     def __len__(self):
         return len(self.data)
 
-    def __getitem__(self, index):
+    def _valid_row(self, index):
         while True:
             row = self.data[index]
-            audio_path = row["audio_path"]
-            text = row["text"]
             duration = row["duration"]
 
             # filter by given length
             if 0.3 <= duration <= 30:
-                break  # valid
+                return row  # valid
 
             index = (index + 1) % len(self.data)
 
+    def _load_audio(self, audio_path):
+        # mono wave at its source sample rate
+        audio, source_sample_rate = torchaudio.load(audio_path)
+
+        # make sure mono input
+        if audio.shape[0] > 1:
+            audio = torch.mean(audio, dim=0, keepdim=True)
+        return audio, source_sample_rate
+
+    def __getitem__(self, index):
+        row = self._valid_row(index)
+
         if self.preprocessed_mel:
             mel_spec = torch.tensor(row["mel_spec"])
         else:
-            audio, source_sample_rate = torchaudio.load(audio_path)
-
-            # make sure mono input
-            if audio.shape[0] > 1:
-                audio = torch.mean(audio, dim=0, keepdim=True)
+            audio, source_sample_rate = self._load_audio(row["audio_path"])
 
             # resample if necessary
-            if source_sample_rate != self.target_sample_rate:
-                resampler = torchaudio.transforms.Resample(source_sample_rate, self.target_sample_rate)
-                audio = resampler(audio)
+            audio = resample(audio, source_sample_rate, self.target_sample_rate)
 
             # to mel spectrogram
             mel_spec = self.mel_spectrogram(audio)
@@ -158,9 +160,26 @@ class CustomDataset(Dataset):
 
         return {
             "mel_spec": mel_spec,
-            "text": text,
+            "text": row["text"],
         }
 
+    def __getitems__(self, indices):
+        # whole batch from the batch sampler, mels of all items computed in one call
+        if self.preprocessed_mel:
+            return [self.__getitem__(index) for index in indices]
+
+        rows = [self._valid_row(index) for index in indices]
+        audios, sample_rates = zip(*[self._load_audio(row["audio_path"]) for row in rows])
+        audios = resample_batch(audios, sample_rates, self.target_sample_rate)
+        mel_specs, mel_lengths = self.mel_spectrogram.batch(audios)
+        return [
+            {
+                "mel_spec": mel_spec[:, :mel_len],
+                "text": row["text"],
+            }
+            for row, mel_spec, mel_len in zip(rows, mel_specs, mel_lengths.tolist())
+        ]
+
 
 # Dynamic Batch Sampler
 class DynamicBatchSampler(Sampler[list[int]]):
@@ -25,6 +25,17 @@ from x_transformers.x_transformers import apply_rotary_pos_emb
 
 mel_basis_cache = {}
 hann_window_cache = {}
+mel_stft_cache = {}
+
+
+def reflect_pad(waveform: float["b nw"], padding, lengths: list[int] | None = None):  # noqa: F722
+    # reflect padding on both sides, for a right-padded batch each item is reflected at its own end
+    if lengths is None:
+        return F.pad(waveform.unsqueeze(1), (padding, padding), mode="reflect").squeeze(1)
+    padded = waveform.new_zeros((waveform.shape[0], waveform.shape[-1] + 2 * padding))
+    for wave, length, out in zip(waveform, lengths, padded):
+        out[: length + 2 * padding] = F.pad(wave[None, None, :length], (padding, padding), mode="reflect")[0, 0]
+    return padded
 
 
 def get_bigvgan_mel_spectrogram(
@@ -37,6 +48,7 @@ def get_bigvgan_mel_spectrogram(
     fmin=0,
     fmax=None,
     center=False,
+    lengths=None,
 ):  # Copy from https://github.com/NVIDIA/BigVGAN/tree/main
     device = waveform.device
     key = f"{n_fft}_{n_mel_channels}_{target_sample_rate}_{hop_length}_{win_length}_{fmin}_{fmax}_{device}"
@@ -49,8 +61,7 @@ def get_bigvgan_mel_spectrogram(
     mel_basis = mel_basis_cache[key]
     hann_window = hann_window_cache[key]
 
-    padding = (n_fft - hop_length) // 2
-    waveform = torch.nn.functional.pad(waveform.unsqueeze(1), (padding, padding), mode="reflect").squeeze(1)
+    waveform = reflect_pad(waveform, (n_fft - hop_length) // 2, lengths)
 
     spec = torch.stft(
         waveform,
@@ -79,24 +90,30 @@ def get_vocos_mel_spectrogram(
     target_sample_rate=24000,
     hop_length=256,
     win_length=1024,
+    lengths=None,
 ):
-    mel_stft = torchaudio.transforms.MelSpectrogram(
-        sample_rate=target_sample_rate,
-        n_fft=n_fft,
-        win_length=win_length,
-        hop_length=hop_length,
-        n_mels=n_mel_channels,
-        power=1,
-        center=True,
-        normalized=False,
-        norm=None,
-    ).to(waveform.device)
     if len(waveform.shape) == 3:
         waveform = waveform.squeeze(1)  # 'b 1 nw -> b nw'
 
     assert len(waveform.shape) == 2
 
-    mel = mel_stft(waveform)
+    key = (n_fft, n_mel_channels, target_sample_rate, hop_length, win_length, waveform.device, waveform.dtype)
+    if key not in mel_stft_cache:
+        # filterbank and window built once, centering is done by reflect_pad (same as stft center=True)
+        mel_stft_cache[key] = torchaudio.transforms.MelSpectrogram(
+            sample_rate=target_sample_rate,
+            n_fft=n_fft,
+            win_length=win_length,
+            hop_length=hop_length,
+            n_mels=n_mel_channels,
+            power=1,
+            center=False,
+            normalized=False,
+            norm=None,
+        ).to(device=waveform.device, dtype=waveform.dtype)
+    mel_stft = mel_stft_cache[key]
+
+    mel = mel_stft(reflect_pad(waveform, n_fft // 2, lengths))
     mel = mel.clamp(min=1e-5).log()
     return mel
 
@@ -122,12 +139,19 @@ class MelSpec(nn.Module):
 
         if mel_spec_type == "vocos":
             self.extractor = get_vocos_mel_spectrogram
+            self.padding = n_fft // 2
         elif mel_spec_type == "bigvgan":
             self.extractor = get_bigvgan_mel_spectrogram
+            self.padding = (n_fft - hop_length) // 2
 
         self.register_buffer("dummy", torch.tensor(0), persistent=False)
 
-    def forward(self, wav):
+    def num_frames(self, lengths):
+        # mel frames of waves with lengths samples
+        return (lengths + 2 * self.padding - self.n_fft) // self.hop_length + 1
+
+    def forward(self, wav, lengths=None):
+        # lengths: samples of each item of a right-padded batch, mel frames past num_frames(lengths) are undefined
         if self.dummy.device != wav.device:
             self.to(wav.device)
 
@@ -138,10 +162,28 @@ class MelSpec(nn.Module):
             target_sample_rate=self.target_sample_rate,
             hop_length=self.hop_length,
             win_length=self.win_length,
+            lengths=lengths,
         )
 
         return mel
 
+    def batch(self, waves: list[float["nw"]], pad_value=math.log(1e-5)):  # noqa: F722
+        """
+        Mels of waves of different lengths (float["nw"] or float["1 nw"]) in a single extractor call,
+        each item equal to its own unbatched mel. Returns mel float["b d n"] right-padded with pad_value
+        (default the log-mel floor, i.e. silence) and the frame count of each item.
+        """
+        waves = [wave.squeeze(0) if wave.ndim == 2 else wave for wave in waves]
+        lengths = [wave.shape[-1] for wave in waves]
+        batch = waves[0].new_zeros((len(waves), max(lengths)))
+        for wave, length, padded in zip(waves, lengths, batch):
+            padded[:length] = wave
+
+        mel = self(batch, lengths)
+        mel_lengths = self.num_frames(torch.tensor(lengths, device=mel.device))
+        mask = torch.arange(mel.shape[-1], device=mel.device) >= mel_lengths[:, None]  # b n
+        return mel.masked_fill(mask[:, None, :], pad_value), mel_lengths
+
 
 # sinusoidal position embedding
 
@@ -180,14 +222,41 @@ class ConvPositionEmbedding(nn.Module):
             mask = mask[..., None]
             x = x.masked_fill(~mask, 0.0)
 
+        if mask is None:
+            return self.conv1d(x.permute(0, 2, 1)).permute(0, 2, 1)
+
+        # masked between the convs too, padded frames stay zeros like the conv padding, so right-padding a sequence
+        # (duration buckets, DiT.pad_context) does not change the output on the valid frames
         x = x.permute(0, 2, 1)
-        x = self.conv1d(x)
-        out = x.permute(0, 2, 1)
+        conv_mask = mask.permute(0, 2, 1)
+        for layer in self.conv1d:
+            x = layer(x)
+            if isinstance(layer, nn.Mish):
+                x = x.masked_fill(~conv_mask, 0.0)
+        return x.permute(0, 2, 1)
 
-        if mask is not None:
-            out = out.masked_fill(~mask, 0.0)
 
-        return out
+# input projection of the backbones, cat(x, cond, ...) -> dim, split so the cond part (plus bias) is computed once
+# per sampling call (prepare_context) and only the x columns per step
+
+
+def drop_cond_audio(cond: float["b n d"], drop_audio_cond=False):  # noqa: F722
+    # cfg for cond audio, bool or bool["b"] per-sample mask (e.g. cond and null branches stacked in one batch)
+    if torch.is_tensor(drop_audio_cond):
+        return cond.masked_fill(drop_audio_cond.view(-1, 1, 1), 0.0)
+    elif drop_audio_cond:
+        return torch.zeros_like(cond)
+    return cond
+
+
+def project_cond(proj: nn.Linear, x_dim: int, *conds: float["b n d"]):  # noqa: F722
+    # step-invariant part, the columns after the first x_dim plus bias
+    return F.linear(torch.cat(conds, dim=-1), proj.weight[:, x_dim:], proj.bias)
+
+
+def project_x(proj: nn.Linear, x_dim: int, x: float["b n d"], cond_embed: float["b n d"]):  # noqa: F722
+    # per-step part, the first x_dim columns, added to the output of project_cond()
+    return F.linear(x, proj.weight[:, :x_dim]) + cond_embed
 
 
 # rotary positional embedding related
@@ -256,14 +325,21 @@ class ConvNeXtV2Block(nn.Module):
         self.grn = GRN(intermediate_dim)
         self.pwconv2 = nn.Linear(intermediate_dim, dim)
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
+    def forward(self, x: torch.Tensor, mask: torch.Tensor | None = None) -> torch.Tensor:
+        # mask: bool["b n"], padded frames zeroed before the dwconv and the grn (norm over the sequence),
+        # so a right-padded item gets the same output on its valid frames as unpadded
         residual = x
+        if mask is not None:
+            mask = mask[..., None]
+            x = x.masked_fill(~mask, 0.0)
         x = x.transpose(1, 2)  # b n d -> b d n
         x = self.dwconv(x)
         x = x.transpose(1, 2)  # b d n -> b n d
         x = self.norm(x)
         x = self.pwconv1(x)
         x = self.act(x)
+        if mask is not None:
+            x = x.masked_fill(~mask, 0.0)
         x = self.grn(x)
         x = self.pwconv2(x)
         return residual + x
@@ -282,9 +358,11 @@ class AdaLayerNormZero(nn.Module):
 
         self.norm = nn.LayerNorm(dim, elementwise_affine=False, eps=1e-6)
 
-    def forward(self, x, emb=None):
-        emb = self.linear(self.silu(emb))
-        shift_msa, scale_msa, gate_msa, shift_mlp, scale_mlp, gate_mlp = torch.chunk(emb, 6, dim=1)
+    def forward(self, x, emb=None, modulation=None):
+        # modulation: precomputed self.linear(self.silu(emb)), e.g. cached per sampling schedule
+        if modulation is None:
+            modulation = self.linear(self.silu(emb))
+        shift_msa, scale_msa, gate_msa, shift_mlp, scale_mlp, gate_mlp = torch.chunk(modulation, 6, dim=1)
 
         x = self.norm(x) * (1 + scale_msa[:, None]) + shift_msa[:, None]
         return x, gate_msa, shift_mlp, scale_mlp, gate_mlp
@@ -303,9 +381,11 @@ class AdaLayerNormZero_Final(nn.Module):
 
         self.norm = nn.LayerNorm(dim, elementwise_affine=False, eps=1e-6)
 
-    def forward(self, x, emb):
-        emb = self.linear(self.silu(emb))
-        scale, shift = torch.chunk(emb, 2, dim=1)
+    def forward(self, x, emb=None, modulation=None):
+        # modulation: precomputed self.linear(self.silu(emb)), e.g. cached per sampling schedule
+        if modulation is None:
+            modulation = self.linear(self.silu(emb))
+        scale, shift = torch.chunk(modulation, 2, dim=1)
 
         x = self.norm(x) * (1 + scale)[:, None, :] + shift[:, None, :]
         return x
@@ -555,9 +635,9 @@ class DiTBlock(nn.Module):
         self.ff_norm = nn.LayerNorm(dim, elementwise_affine=False, eps=1e-6)
         self.ff = FeedForward(dim=dim, mult=ff_mult, dropout=dropout, approximate="tanh")
 
-    def forward(self, x, t, mask=None, rope=None):  # x: noised input, t: time embedding
+    def forward(self, x, t, mask=None, rope=None, modulation=None):  # x: noised input, t: time embedding
         # pre-norm & modulation for attention input
-        norm, gate_msa, shift_mlp, scale_mlp, gate_mlp = self.attn_norm(x, emb=t)
+        norm, gate_msa, shift_mlp, scale_mlp, gate_mlp = self.attn_norm(x, emb=t, modulation=modulation)
 
         # attention
         attn_output = self.attn(x=norm, mask=mask, rope=rope)
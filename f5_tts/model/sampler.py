@@ -0,0 +1,223 @@
+"""
+ode solvers for flow matching sampling
+
+fixed-grid solvers integrate in place, only the current state (and a few per-solver buffers) is kept in memory,
+the full trajectory is materialized only if asked for.
+other methods (adaptive dopri5 etc.) fall back to torchdiffeq.
+
+flow convention: t = 0 noise, t = 1 data, x_t = (1 - t) * x0 + t * x1, fn(t, x) predicts the velocity x1 - x0
+"""
+
+from __future__ import annotations
+
+import math
+from functools import partial
+from typing import Callable
+
+import numpy as np
+import torch
+
+# fn(t, y) -> dy/dt
+FlowFn = Callable[[torch.Tensor, torch.Tensor], torch.Tensor]
+
+# step_callback(step, total), called after each solver step, raise inside to cancel sampling
+StepCallback = Callable[[int, int], None]
+
+
+def host_times(t: float["n"], state: dict):  # noqa: F821
+    # time grid as python floats for solvers with non-linear coefficients, a single host sync per sampling call
+    if "t_host" not in state:
+        state["t_host"] = t.tolist()
+    return state["t_host"]
+
+
+# single-step solvers, step(fn, t, i, y, state) advances y from t[i] to t[i + 1] in place
+
+
+def euler_step(fn: FlowFn, t, i, y, state: dict):
+    dt = t[i + 1] - t[i]
+    return y.addcmul_(fn(t[i], y), dt)
+
+
+def midpoint_step(fn: FlowFn, t, i, y, state: dict):
+    half_dt = (t[i + 1] - t[i]) * 0.5
+    if "y_mid" not in state:
+        state["y_mid"] = torch.empty_like(y)
+    y_mid = torch.addcmul(y, fn(t[i], y), half_dt, out=state["y_mid"])
+    return y.addcmul_(fn(t[i] + half_dt, y_mid), half_dt * 2)
+
+
+def heun_step(fn: FlowFn, t, i, y, state: dict):
+    # euler predictor, trapezoidal corrector, 2 nfe per step
+    dt = t[i + 1] - t[i]
+    if "y_pred" not in state:
+        state["y_pred"] = torch.empty_like(y)
+    v0 = fn(t[i], y)
+    y_pred = torch.addcmul(y, v0, dt, out=state["y_pred"])
+    v0.add_(fn(t[i + 1], y_pred))
+    return y.addcmul_(v0, dt * 0.5)
+
+
+# multistep solvers, 1 nfe per step, reuse velocities / data predictions of previous steps
+
+
+def lagrange_integral_weights(nodes: list[float], a: float, b: float):
+    # integral over [a, b] of each lagrange basis polynomial through nodes
+    weights = []
+    for j, tj in enumerate(nodes):
+        basis = np.poly1d([1.0])
+        for m, tm in enumerate(nodes):
+            if m != j:
+                basis *= np.poly1d([1.0, -tm]) / (tj - tm)
+        antiderivative = basis.integ()
+        weights.append(float(antiderivative(b) - antiderivative(a)))
+    return weights
+
+
+def adams_bashforth_step(fn: FlowFn, t, i, y, state: dict, order=2):
+    # variable step adams-bashforth, order ramps up from euler over the first steps
+    t_host = host_times(t, state)
+    history = state.setdefault("velocities", [])  # newest first
+    history.insert(0, fn(t[i], y))
+    del history[order:]
+
+    nodes = [t_host[i - j] for j in range(len(history))]
+    for v, weight in zip(history, lagrange_integral_weights(nodes, t_host[i], t_host[i + 1])):
+        y.add_(v, alpha=weight)
+    return y
+
+
+def dpm_solver_pp_2m_step(fn: FlowFn, t, i, y, state: dict, eps=1e-6):
+    # dpm-solver++(2m) on the data prediction D = x + (1 - t) * v, with alpha_t = t, sigma_t = 1 - t
+    # first order update is exactly euler, the second order correction needs log-snr at both ends,
+    # so first step (from t = 0) and last step (to t = 1) stay first order
+    t_host = host_times(t, state)
+    t0, t1 = t_host[i], t_host[i + 1]
+    denoised = torch.addcmul(y, fn(t[i], y), 1 - t[i])
+
+    def log_snr(s):
+        s = min(max(s, eps), 1 - eps)
+        return math.log(s / (1 - s))
+
+    denoised_prev, t_prev = state.get("denoised_prev"), state.get("t_prev")
+    if denoised_prev is not None and t_prev > eps and t1 < 1 - eps:
+        h = log_snr(t1) - log_snr(t0)
+        r = (log_snr(t0) - log_snr(t_prev)) / h
+        # D = (1 + 1/2r) * D_i - 1/2r * D_i-1, written into the previous buffer
+        denoised_prev.mul_(-0.5 / r).add_(denoised, alpha=1 + 0.5 / r)
+        correction = denoised_prev
+    else:
+        correction = denoised
+
+    # x_t1 = sigma_t1 / sigma_t0 * x_t0 + alpha_t1 * (1 - exp(-h)) * D, both coefficients in closed form of t
+    y.mul_((1 - t1) / (1 - t0)).add_(correction, alpha=(t1 - t0) / (1 - t0))
+
+    state["denoised_prev"], state["t_prev"] = denoised, t0
+    return y
+
+
+FIXED_GRID_SOLVERS = dict(
+    euler=euler_step,
+    midpoint=midpoint_step,
+    heun=heun_step,
+    adams2=partial(adams_bashforth_step, order=2),
+    adams3=partial(adams_bashforth_step, order=3),
+    dpmpp_2m=dpm_solver_pp_2m_step,
+)
+
+
+def eval_times(t: float["n"], method: str = "euler"):  # noqa: F821
+    # time steps at which a fixed-grid solver evaluates the flow, None if not known in advance
+    if method in ("euler", "adams2", "adams3", "dpmpp_2m"):
+        return t[:-1]
+    elif method == "midpoint":
+        return torch.cat((t[:-1], t[:-1] + (t[1:] - t[:-1]) * 0.5))
+    elif method == "heun":
+        return torch.cat((t[:-1], t[1:]))
+    return None
+
+
+def call_times(t: list[float], method: str = "euler"):
+    # times of the successive fn calls of a fixed-grid solver, None if not known in advance
+    # (the adaptive final jump evaluates at t[i + 1], which follows the same pattern)
+    if method in ("euler", "adams2", "adams3", "dpmpp_2m"):
+        return t[:-1]
+    elif method == "midpoint":
+        return [s for t0, t1 in zip(t[:-1], t[1:]) for s in (t0, (t0 + t1) * 0.5)]
+    elif method == "heun":
+        return [s for t0, t1 in zip(t[:-1], t[1:]) for s in (t0, t1)]
+    return None
+
+
+def odeint(
+    fn: FlowFn,
+    y0: torch.Tensor,
+    t: float["n"],  # noqa: F821
+    method: str = "euler",
+    return_trajectory: bool = False,
+    step_callback: StepCallback | None = None,
+    adaptive_tol: float | None = None,
+    stats: dict | None = None,
+    **odeint_kwargs,  # atol, rtol etc. for torchdiffeq methods
+):
+    """
+    Integrate dy/dt = fn(t, y) from t[0] to t[-1], y0 is updated in place by the fixed-grid solvers.
+    Returns (y at t[-1], trajectory float["n ..."] if return_trajectory else None).
+
+    adaptive_tol: once the relative change of the velocity between two evaluations drops below it,
+        the flow is considered straight and a single euler step jumps to t[-1] (fixed-grid solvers only).
+    stats: if given, filled with the number of solver steps and function evaluations actually used.
+    """
+    steps = t.shape[0] - 1
+    state = dict(nfe=0)
+
+    def tracked_fn(t, y):
+        v = fn(t, y)
+        state["nfe"] += 1
+        if adaptive_tol is not None:
+            if "v_prev" in state:
+                state["change"] = torch.dist(v, state["v_prev"]) / state["v_prev"].norm().clamp(min=1e-12)
+                state["v_prev"].copy_(v)
+            else:
+                state["v_prev"] = v.clone()
+        return v
+
+    if method not in FIXED_GRID_SOLVERS:
+        from torchdiffeq import odeint as torchdiffeq_odeint
+
+        trajectory = torchdiffeq_odeint(tracked_fn, y0, t, method=method, **odeint_kwargs)
+        if step_callback is not None:
+            step_callback(steps, steps)
+        if stats is not None:
+            stats.update(steps=steps, nfe=state["nfe"])
+        return trajectory[-1], (trajectory if return_trajectory else None)
+
+    step = FIXED_GRID_SOLVERS[method]
+    trajectory = None
+    if return_trajectory:
+        trajectory = y0.new_empty((steps + 1, *y0.shape))
+        trajectory[0] = y0
+
+    y = y0
+    steps_taken = steps
+    for i in range(steps):
+        y = step(tracked_fn, t, i, y, state)
+        if trajectory is not None:
+            trajectory[i + 1] = y
+        if step_callback is not None:
+            step_callback(i + 1, steps)
+
+        # only jump if it saves at least one evaluation, the check costs a host sync per step
+        if adaptive_tol is not None and i + 2 < steps and "change" in state and state["change"].item() < adaptive_tol:
+            y.addcmul_(tracked_fn(t[i + 1], y), t[-1] - t[i + 1])
+            steps_taken = i + 2
+            if trajectory is not None:
+                trajectory[i + 2] = y
+                trajectory = trajectory[: i + 3]
+            if step_callback is not None:
+                step_callback(steps, steps)
+            break
+
+    if stats is not None:
+        stats.update(steps=steps_taken, nfe=state["nfe"])
+    return y, trajectory
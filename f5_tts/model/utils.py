@@ -1,16 +1,18 @@
 from __future__ import annotations
 
+import math
 import os
 import random
+import re
 from collections import defaultdict
+from functools import lru_cache
 from importlib.resources import files
 
+import numpy as np
 import torch
+import torchaudio
 from torch.nn.utils.rnn import pad_sequence
 
-import jieba
-from pypinyin import lazy_pinyin, Style
-
 
 # seed everything
 
@@ -36,6 +38,39 @@ def default(v, d):
     return v if exists(v) else d
 
 
+# resampling, sinc kernels built once per (orig_sr, new_sr, dtype, device) and kept in an lru cache
+
+
+@lru_cache(maxsize=16)
+def get_resampler(orig_sr: int, new_sr: int, dtype=torch.float32, device="cpu"):
+    return torchaudio.transforms.Resample(orig_sr, new_sr).to(device=device, dtype=dtype)
+
+
+def resample(wave: float["... nw"], orig_sr: int, new_sr: int):  # noqa: F722
+    if orig_sr == new_sr:
+        return wave
+    return get_resampler(orig_sr, new_sr, wave.dtype, wave.device)(wave)
+
+
+def resample_batch(waves: list[float["... nw"]], orig_srs: list[int], new_sr: int):  # noqa: F722
+    """
+    Resample waves of any lengths and rates, all waves sharing a rate go through a single call on a zero right-padded
+    batch. Output is the same as resample() per wave: the kernel already treats samples past the end as zeros,
+    so each item is cut back to its own ceil(n * new_sr / orig_sr) samples.
+    """
+    resampled = list(waves)
+    for orig_sr in set(orig_srs) - {new_sr}:
+        group = [i for i, sr in enumerate(orig_srs) if sr == orig_sr]
+        lengths = [waves[i].shape[-1] for i in group]
+        batch = waves[group[0]].new_zeros((len(group), *waves[group[0]].shape[:-1], max(lengths)))
+        for i, length, padded in zip(group, lengths, batch):
+            padded[..., :length] = waves[i]
+        batch = resample(batch, orig_sr, new_sr)
+        for i, length, wave in zip(group, lengths, batch):
+            resampled[i] = wave[..., : math.ceil(length * new_sr / orig_sr)]
+    return resampled
+
+
 # tensor helpers
 
 
@@ -47,6 +82,14 @@ def lens_to_mask(t: int["b"], length: int | None = None) -> bool["b n"]:  # noqa
     return seq[None, :] < t[:, None]
 
 
+def duration_bucket(length: int, buckets: list[int] | None) -> int:
+    # smallest bucket length holding length, length itself if there are no buckets or it exceeds all of them
+    for bucket in sorted(buckets or []):
+        if bucket >= length:
+            return bucket
+    return length
+
+
 def mask_from_start_end_indices(seq_len: int["b"], start: int["b"], end: int["b"]):  # noqa: F722 F821
     max_seq_len = seq_len.max().item()
     seq = torch.arange(max_seq_len, device=start.device).long()
@@ -85,14 +128,47 @@ def list_str_to_tensor(text: list[str], padding_value=-1) -> int["b nt"]:  # noq
 
 
 # char tokenizer, based on custom dataset's extracted .txt file
+class VocabCharMap(dict):
+    # {char: idx} as read by get_tokenizer(), carries its codepoint lookup table for list_str_to_idx()
+    lookup = None  # (vocab size when built, table)
+
+
+def build_vocab_lookup(vocab_char_map: dict[str, int]):
+    # codepoint -> idx array of the single-char vocab entries, 0 (unknown) elsewhere
+    chars = {c: i for c, i in vocab_char_map.items() if len(c) == 1}
+    table = np.zeros(max(map(ord, chars), default=0) + 1, dtype=np.int64)
+    table[[ord(c) for c in chars]] = list(chars.values())
+    return table
+
+
+def get_vocab_lookup(vocab_char_map: dict[str, int]):
+    # built once per VocabCharMap, plain dicts get a fresh table each call
+    if not isinstance(vocab_char_map, VocabCharMap):
+        return build_vocab_lookup(vocab_char_map)
+    if vocab_char_map.lookup is None or vocab_char_map.lookup[0] != len(vocab_char_map):
+        vocab_char_map.lookup = (len(vocab_char_map), build_vocab_lookup(vocab_char_map))
+    return vocab_char_map.lookup[1]
+
+
 def list_str_to_idx(
     text: list[str] | list[list[str]],
     vocab_char_map: dict[str, int],  # {char: idx}
     padding_value=-1,
 ) -> int["b nt"]:  # noqa: F722
-    list_idx_tensors = [torch.tensor([vocab_char_map.get(c, 0) for c in t]) for t in text]  # pinyin or char style
-    text = pad_sequence(list_idx_tensors, padding_value=padding_value, batch_first=True)
-    return text
+    strings = [t if isinstance(t, str) else "".join(t) for t in text]
+    if any(len(s) != len(t) for s, t in zip(strings, text)):  # pinyin style, multi-char tokens
+        list_idx_tensors = [torch.tensor([vocab_char_map.get(c, 0) for c in t]) for t in text]
+        text = pad_sequence(list_idx_tensors, padding_value=padding_value, batch_first=True)
+        return text
+
+    # char style, whole batch looked up at once on its codepoints
+    table = get_vocab_lookup(vocab_char_map)
+    codepoints = np.frombuffer("".join(strings).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    idx = np.where(codepoints < len(table), table[np.minimum(codepoints, len(table) - 1)], 0)
+    lengths = np.array([len(s) for s in strings])
+    text = np.full((len(strings), lengths.max(initial=0)), padding_value, dtype=np.int64)
+    text[np.arange(text.shape[1]) < lengths[:, None]] = idx
+    return torch.from_numpy(text)
 
 
 # Get tokenizer
@@ -111,7 +187,7 @@ def get_tokenizer(dataset_name, tokenizer: str = "pinyin"):
     if tokenizer in ["pinyin", "char"]:
         tokenizer_path = os.path.join(files("f5_tts").joinpath("../../data"), f"{dataset_name}_{tokenizer}/vocab.txt")
         with open(tokenizer_path, "r", encoding="utf-8") as f:
-            vocab_char_map = {}
+            vocab_char_map = VocabCharMap()
             for i, char in enumerate(f):
                 vocab_char_map[char[:-1]] = i
         vocab_size = len(vocab_char_map)
@@ -123,7 +199,7 @@ def get_tokenizer(dataset_name, tokenizer: str = "pinyin"):
 
     elif tokenizer == "custom":
         with open(dataset_name, "r", encoding="utf-8") as f:
-            vocab_char_map = {}
+            vocab_char_map = VocabCharMap()
             for i, char in enumerate(f):
                 vocab_char_map[char[:-1]] = i
         vocab_size = len(vocab_char_map)
@@ -133,8 +209,47 @@ def get_tokenizer(dataset_name, tokenizer: str = "pinyin"):
 
 # convert char to pinyin
 
-jieba.initialize()
-print("Word segmentation module jieba initialized.\n")
+_jieba = None
+
+
+def get_jieba():
+    # jieba (and its dictionary) only loaded once some text actually has cjk characters
+    global _jieba
+    if _jieba is None:
+        import jieba
+
+        jieba.initialize()
+        print("Word segmentation module jieba initialized.\n")
+        _jieba = jieba
+    return _jieba
+
+
+# latin fast path, reproduces what jieba.cut yields on text without cjk characters, so tokens stay identical
+# (ascii blocks are dictionary-matched then split by the hmm fallback, every other char is a segment of its own)
+_re_cjk = re.compile("[\u2e80-\U0002ffff]")  # anything pypinyin may turn into pinyin goes through jieba
+_re_jieba_block = re.compile("([a-zA-Z0-9+#&\\._%\\-]+)")
+_re_jieba_skip = re.compile("(\r\n|\\s)")
+_re_jieba_dict_word = re.compile("(AT&T|[cC]\\+\\+|[cC]#)")  # pure ascii words of jieba's default dictionary
+_re_jieba_hmm_skip = re.compile("([a-zA-Z0-9]+(?:\\.\\d+)?%?)")
+
+
+def cut_latin(text):
+    for blk in _re_jieba_block.split(text):
+        if not blk:
+            continue
+        if _re_jieba_block.match(blk):
+            for piece in _re_jieba_dict_word.split(blk):
+                if _re_jieba_dict_word.match(piece):
+                    yield piece
+                else:
+                    yield from filter(None, _re_jieba_hmm_skip.split(piece))
+        else:
+            for x in _re_jieba_skip.split(blk):
+                if _re_jieba_skip.match(x):
+                    yield x
+                else:
+                    yield from x
+
 
 # def convert_char_to_pinyin(text_list, polyphone=True):
 #     final_text_list = []
@@ -162,7 +277,17 @@ def convert_char_to_pinyin(text_list, polyphone=True):
     for text in text_list:
         char_list = []
         text = text.translate(custom_trans)
-        for seg in jieba.cut(text):
+        if not _re_cjk.search(text):  # latin (vietnamese) text, no jieba / pypinyin needed
+            for seg in cut_latin(text):
+                if seg.isascii() and len(seg) > 1 and char_list and char_list[-1] not in " :'\"":
+                    char_list.append(" ")
+                char_list.extend(seg)
+            final_text_list.append(char_list)
+            continue
+
+        from pypinyin import Style, lazy_pinyin
+
+        for seg in get_jieba().cut(text):
             seg_byte_len = len(bytes(seg, "UTF-8"))
             if seg_byte_len == len(seg):  # if pure alphabets and symbols
                 if char_list and seg_byte_len > 1 and char_list[-1] not in " :'\"":
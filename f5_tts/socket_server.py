@@ -1,16 +1,21 @@
 import argparse
 import gc
+import numpy as np
 import socket
 import struct
 import torch
-import torchaudio
 import traceback
 from importlib.resources import files
 from threading import Thread
 
-from cached_path import cached_path
-
-from infer.utils_infer import infer_batch_process, preprocess_ref_audio_text, load_vocoder, load_model
+from infer.resolver import resolve_model_file
+from infer.utils_infer import (
+    infer_batch_process,
+    infer_batch_process_stream,
+    preprocess_ref_audio_text,
+    load_vocoder,
+    load_model,
+)
 from model.backbones.dit import DiT
 
 
@@ -54,8 +59,7 @@ class TTSStreamingProcessor:
     def _warm_up(self):
         """Warm up the model with a dummy input to ensure it's ready for real-time processing."""
         print("Warming up the model...")
-        ref_audio, ref_text = preprocess_ref_audio_text(self.ref_audio, self.ref_text)
-        audio, sr = torchaudio.load(ref_audio)
+        (audio, sr), ref_text = preprocess_ref_audio_text(self.ref_audio, self.ref_text)
         gen_text = "Warm-up text for the model."
 
         # Pass the vocoder as an argument here
@@ -65,40 +69,27 @@ class TTSStreamingProcessor:
     def generate_stream(self, text, play_steps_in_s=0.5):
         """Generate audio in chunks and yield them in real-time."""
         # Preprocess the reference audio and text
-        ref_audio, ref_text = preprocess_ref_audio_text(self.ref_audio, self.ref_text)
-
-        # Load reference audio
-        audio, sr = torchaudio.load(ref_audio)
+        (audio, sr), ref_text = preprocess_ref_audio_text(self.ref_audio, self.ref_text)
 
-        # Run inference for the input text
-        audio_chunk, final_sample_rate, _ = infer_batch_process(
+        # Run inference for the input text, packets go out while later windows are still being decoded
+        chunk_size = int(self.sampling_rate * play_steps_in_s)
+        buffer = np.zeros(0, dtype=np.float32)
+        for block in infer_batch_process_stream(
             (audio, sr),
             ref_text,
             [text],
             self.model,
             self.vocoder,
-            device=self.device,  # Pass vocoder here
-        )
-
-        # Break the generated audio into chunks and send them
-        chunk_size = int(final_sample_rate * play_steps_in_s)
-
-        if len(audio_chunk) < chunk_size:
-            packed_audio = struct.pack(f"{len(audio_chunk)}f", *audio_chunk)
-            yield packed_audio
-            return
-
-        for i in range(0, len(audio_chunk), chunk_size):
-            chunk = audio_chunk[i : i + chunk_size]
-
-            # Check if it's the final chunk
-            if i + chunk_size >= len(audio_chunk):
-                chunk = audio_chunk[i:]
+            device=self.device,
+        ):
+            buffer = np.concatenate((buffer, block))
+            while len(buffer) >= chunk_size:
+                chunk, buffer = buffer[:chunk_size], buffer[chunk_size:]
+                yield struct.pack(f"{len(chunk)}f", *chunk)
 
-            # Send the chunk if it is not empty
-            if len(chunk) > 0:
-                packed_audio = struct.pack(f"{len(chunk)}f", *chunk)
-                yield packed_audio
+        # Send the remaining samples
+        if len(buffer) > 0:
+            yield struct.pack(f"{len(buffer)}f", *buffer)
 
 
 def handle_client(client_socket, processor):
@@ -153,7 +144,7 @@ if __name__ == "__main__":
 
     parser.add_argument(
         "--ckpt_file",
-        default=str(cached_path("hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors")),
+        default="hf://SWivid/F5-TTS/F5TTS_Base/model_1200000.safetensors",
         help="Path to the model checkpoint file",
     )
     parser.add_argument(
@@ -181,7 +172,7 @@ if __name__ == "__main__":
     try:
         # Initialize the processor with the model and vocoder
         processor = TTSStreamingProcessor(
-            ckpt_file=args.ckpt_file,
+            ckpt_file=resolve_model_file(args.ckpt_file),
             vocab_file=args.vocab_file,
             ref_audio=args.ref_audio,
             ref_text=args.ref_text,
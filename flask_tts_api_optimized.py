@@ -21,8 +21,8 @@ from functools import lru_cache
 
 from flask import Flask, request, jsonify, send_from_directory, url_for
 from werkzeug.utils import secure_filename
-from cached_path import cached_path
 from f5_tts.api import F5TTS
+from f5_tts.infer.resolver import resolve_model_file
 from vinorm import TTSnorm
 
 
@@ -209,8 +209,8 @@ def get_tts_model():
         device = choose_device()
         print(f"[F5-TTS] Loading model on {device}...")
         
-        ckpt_file = str(cached_path(CKPT_HF_URI))
-        vocab_file = str(cached_path(VOCAB_HF_URI))
+        ckpt_file = resolve_model_file(CKPT_HF_URI)
+        vocab_file = resolve_model_file(VOCAB_HF_URI)
         
         print(f"[F5-TTS] ckpt: {ckpt_file}")
         print(f"[F5-TTS] vocab: {vocab_file}")
@@ -292,7 +292,7 @@ def process_job_async(job_id, wav_path, text_ref, cleaned_text, speed, out_path,
         print(f"[Job {job_id}] Calling TTS inference...")
         
         wav, sr, spect = tts.infer(
-            ref_file=str(wav_path),
+            ref_file=tts.voice_profile(str(wav_path), text_ref),
             ref_text=text_ref,
             gen_text=cleaned_text,
             speed=speed,
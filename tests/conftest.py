@@ -0,0 +1,44 @@
+# Tiny randomly initialized models shared by the tests, cpu only, no checkpoint downloads
+
+import pytest
+
+
+@pytest.fixture
+def tiny_vocos():
+    # vocos architecture of the 24khz mel model (8 convnext blocks, n_fft 1024, hop 256), narrow layers
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("vocos")
+    from vocos import Vocos
+    from vocos.feature_extractors import MelSpectrogramFeatures
+    from vocos.heads import ISTFTHead
+    from vocos.models import VocosBackbone
+
+    torch.manual_seed(0)
+    backbone = VocosBackbone(input_channels=100, dim=32, intermediate_dim=64, num_layers=8, layer_scale_init_value=1)
+    with torch.no_grad():  # vocos init (std 0.02) fades out within a few frames, this one spans the receptive field
+        for module in backbone.modules():
+            if isinstance(module, (torch.nn.Linear, torch.nn.Conv1d)):
+                module.weight.normal_(std=module.weight[0].numel() ** -0.5)
+    return Vocos(
+        MelSpectrogramFeatures(sample_rate=24000, n_fft=1024, hop_length=256, n_mels=100, padding="center"),
+        backbone,
+        ISTFTHead(dim=32, n_fft=1024, hop_length=256, padding="same"),
+    ).eval()
+
+
+@pytest.fixture
+def tiny_cfm():
+    # F5-TTS DiT layout (text convnext, rope, adaln), a few narrow blocks, vocab of the released models
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("torchaudio")
+    from importlib.resources import files
+
+    from f5_tts.model import CFM, DiT
+    from f5_tts.model.utils import get_tokenizer
+
+    vocab_char_map, vocab_size = get_tokenizer(str(files("f5_tts").joinpath("infer/examples/vocab.txt")), "custom")
+    torch.manual_seed(0)
+    transformer = DiT(
+        dim=32, depth=4, heads=2, dim_head=16, ff_mult=2, text_dim=16, conv_layers=1, text_num_embeds=vocab_size
+    )
+    return CFM(transformer=transformer, vocab_char_map=vocab_char_map).eval()
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from f5_tts.model import DiT, MMDiT, UNetT  # noqa: E402
+
+BACKBONES = dict(
+    DiT=lambda: DiT(dim=32, depth=2, heads=2, dim_head=16, ff_mult=2, text_dim=16, conv_layers=1, text_num_embeds=50),
+    UNetT=lambda: UNetT(
+        dim=32, depth=2, heads=2, dim_head=16, ff_mult=2, text_dim=16, conv_layers=1, text_num_embeds=50
+    ),
+    MMDiT=lambda: MMDiT(dim=32, depth=2, heads=2, dim_head=16, ff_mult=2, text_num_embeds=50),
+)
+
+
+@pytest.mark.parametrize("drop", [False, True, "per-sample"])
+@pytest.mark.parametrize("name", list(BACKBONES))
+def test_precomputed_context_matches_the_plain_forward(name, drop):
+    torch.manual_seed(0)
+    backbone = BACKBONES[name]().eval()
+    x, cond = torch.randn(2, 40, 100), torch.randn(2, 40, 100)
+    text, time = torch.randint(0, 50, (2, 12)), torch.rand(2)
+    drop = torch.tensor([False, True]) if drop == "per-sample" else drop
+    with torch.inference_mode():
+        reference = backbone(x, cond, text, time, drop_audio_cond=drop, drop_text=drop)
+        context = backbone.prepare_context(cond, text, drop_audio_cond=drop, drop_text=drop)
+        out = backbone(x, None, None, time, drop_audio_cond=drop, drop_text=drop, context=context)
+    np.testing.assert_allclose(out.numpy(), reference.numpy(), rtol=0, atol=1e-5)
@@ -0,0 +1,209 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from f5_tts.model import sampler  # noqa: E402
+
+
+def sample(model, **kwargs):
+    torch.manual_seed(0)
+    cond = torch.randn(1, 40, model.num_channels)
+    kwargs = dict(steps=8, cfg_strength=2.0, sway_sampling_coef=-1.0, seed=0) | kwargs
+    with torch.inference_mode():
+        out, _ = model.sample(cond, ["hello world."], 72, **kwargs)
+    return out.numpy()
+
+
+def test_guidance_changes_the_sample(tiny_cfm):
+    # the toy backbone must be sensitive to the null branch, otherwise the cfg parity checks below are vacuous
+    assert np.abs(sample(tiny_cfm) - sample(tiny_cfm, cfg_strength=0.0)).max() > 1e-2
+
+
+def test_euler_matches_torchdiffeq(tiny_cfm, monkeypatch):
+    pytest.importorskip("torchdiffeq")
+    native = sample(tiny_cfm, ode_method="euler")
+    monkeypatch.delitem(sampler.FIXED_GRID_SOLVERS, "euler")  # falls back to torchdiffeq.odeint
+    np.testing.assert_allclose(native, sample(tiny_cfm, ode_method="euler"), rtol=0, atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(fused_cfg=True),
+        dict(cache_modulation=True),
+        dict(fused_cfg=True, cache_modulation=True),
+        dict(block_cache=dict(interval=1)),
+    ],
+)
+def test_fast_paths_match_the_reference_path(tiny_cfm, options):
+    reference = sample(tiny_cfm)
+    np.testing.assert_allclose(sample(tiny_cfm, **options), reference, rtol=0, atol=1e-5)
+    assert tiny_cfm.last_sample_stats["nfe"] == 8
+
+
+def test_modulation_cache_follows_the_weights(tiny_cfm):
+    dit = tiny_cfm.transformer
+    reference = sample(tiny_cfm, cache_modulation=True)
+    assert len(dit.modulation_cache) == 1
+
+    # new weights loaded through the parent module, cached params must not be reused
+    state = {k: v.clone() for k, v in tiny_cfm.state_dict().items()}
+    state["transformer.time_embed.time_mlp.0.weight"].mul_(2.0)
+    tiny_cfm.load_state_dict(state)
+    assert len(dit.modulation_cache) == 0
+    np.testing.assert_allclose(sample(tiny_cfm, cache_modulation=True), sample(tiny_cfm), rtol=0, atol=1e-5)
+    assert np.abs(sample(tiny_cfm) - reference).max() > 1e-3
+
+    # dtype change, params recomputed in the new dtype
+    tiny_cfm.double()
+    assert len(dit.modulation_cache) == 0
+    sample(tiny_cfm, cache_modulation=True)
+    (entry,) = dit.modulation_cache.values()
+    assert entry["blocks"].dtype == torch.float64
+
+
+def record_forwards(model):
+    # batch size and text drop flag of each backbone forward
+    calls = []
+
+    def hook(module, args, kwargs):
+        drop_text = kwargs["drop_text"]
+        calls.append((kwargs["x"].shape[0], drop_text if isinstance(drop_text, bool) else "per-sample"))
+
+    return calls, model.transformer.register_forward_pre_hook(hook, with_kwargs=True)
+
+
+def sway_times(steps=8, coef=-1.0):
+    t = torch.linspace(0, 1, steps + 1)
+    return (t + coef * (torch.cos(torch.pi / 2 * t) - 1 + t)).tolist()
+
+
+@pytest.mark.parametrize("fused_cfg", [False, True])
+def test_cfg_interval_skips_the_null_branch_outside(tiny_cfm, fused_cfg):
+    inside = [t <= 0.5 for t in sway_times()[:-1]]  # euler evaluates at the start of each step
+    assert 0 < sum(inside) < len(inside)
+    calls, handle = record_forwards(tiny_cfm)
+    sample(tiny_cfm, fused_cfg=fused_cfg, cfg_interval=(0.0, 0.5))
+    handle.remove()
+
+    expected = []
+    for guided in inside:
+        if not guided:  # a single forward, cond branch only
+            expected.append((1, False))
+        elif fused_cfg:
+            expected.append((2, "per-sample"))
+        else:
+            expected.extend([(1, False), (1, True)])
+    assert calls == expected
+
+    # an interval covering every step is plain cfg, one covering none is no guidance at all
+    np.testing.assert_allclose(
+        sample(tiny_cfm, fused_cfg=fused_cfg, cfg_interval=(0.0, 1.0)), sample(tiny_cfm), rtol=0, atol=1e-5
+    )
+    no_cfg = sample(tiny_cfm, cfg_strength=0.0)
+    np.testing.assert_allclose(
+        sample(tiny_cfm, fused_cfg=fused_cfg, cfg_interval=(2.0, 3.0)), no_cfg, rtol=0, atol=1e-5
+    )
+
+
+@pytest.mark.parametrize("fused_cfg", [False, True])
+def test_cfg_reuse_steps_skip_the_null_forward(tiny_cfm, fused_cfg):
+    reuse = [2, 3, 6]
+    calls, handle = record_forwards(tiny_cfm)
+    sample(tiny_cfm, fused_cfg=fused_cfg, cfg_reuse_steps=reuse)
+    handle.remove()
+
+    expected = []
+    for step in range(8):
+        if step in reuse:  # cond branch alone, null prediction of the previous step
+            expected.append((1, False))
+        elif fused_cfg:
+            expected.append((2, "per-sample"))
+        else:
+            expected.extend([(1, False), (1, True)])
+    assert calls == expected
+
+    # backbone made independent of x and t (weights frozen that way), the null prediction is the same at every
+    # step, so reusing it must give the recomputed result
+    dit = tiny_cfm.transformer
+    with torch.no_grad():
+        dit.input_embed.proj.weight[:, : dit.input_embed.mel_dim].zero_()  # x columns
+        dit.time_embed.time_mlp[-1].weight.zero_()
+    reference = sample(tiny_cfm, fused_cfg=fused_cfg)
+    assert np.abs(sample(tiny_cfm, cfg_strength=0.0) - reference).max() > 1e-3  # null branch still matters
+    np.testing.assert_allclose(
+        sample(tiny_cfm, fused_cfg=fused_cfg, cfg_reuse_steps=reuse), reference, rtol=0, atol=1e-6
+    )
+
+
+def test_block_cache_skips_deep_blocks(tiny_cfm):
+    reference = sample(tiny_cfm)
+    cached = sample(tiny_cfm, block_cache=dict(interval=2, start=1, end=-1))
+    assert 0 < np.abs(cached - reference).max() < 0.5 * np.abs(reference).max()
+
+
+def sample_batch(model, **kwargs):
+    torch.manual_seed(0)
+    cond = torch.randn(2, 40, model.num_channels)
+    kwargs = dict(steps=8, cfg_strength=2.0, sway_sampling_coef=-1.0, seed=0) | kwargs
+    with torch.inference_mode():
+        out, _ = model.sample(
+            cond, ["hello world.", "xin chào."], torch.tensor([72, 60]), lens=torch.tensor([40, 30]), **kwargs
+        )
+    return out.numpy()
+
+
+def test_context_path_matches_the_plain_forward(tiny_cfm):
+    # batched, per-sample padding is masked in attention only (no mask given to prepare_context), as the plain forward
+    dit = tiny_cfm.transformer
+    torch.manual_seed(0)
+    x, cond = torch.randn(2, 50, 100), torch.randn(2, 50, 100)
+    text, time = torch.randint(0, 100, (2, 20)), torch.rand(2)
+    mask = torch.arange(50)[None] < torch.tensor([[50], [35]])
+    with torch.inference_mode():
+        reference = dit(x, cond, text, time, drop_audio_cond=False, drop_text=False, mask=mask)
+        context = dit.prepare_context(cond, text)
+        out = dit(x, None, None, time, drop_audio_cond=False, drop_text=False, mask=mask, context=context)
+    np.testing.assert_allclose(out.numpy(), reference.numpy(), rtol=0, atol=1e-5)
+
+
+@pytest.mark.parametrize("fused_cfg", [False, True])
+def test_duration_buckets_match_unpadded_sampling(tiny_cfm, fused_cfg):
+    single, batched = sample(tiny_cfm, fused_cfg=fused_cfg), sample_batch(tiny_cfm, fused_cfg=fused_cfg)
+    tiny_cfm.duration_buckets = [64, 128]
+    np.testing.assert_allclose(sample(tiny_cfm, fused_cfg=fused_cfg), single, rtol=0, atol=1e-5)
+    np.testing.assert_allclose(sample_batch(tiny_cfm, fused_cfg=fused_cfg), batched, rtol=0, atol=1e-5)
+
+
+def test_batch_chunks_by_frames():
+    from f5_tts.infer.utils_infer import batch_chunks_by_frames
+
+    durations = [300, 100, 250, 120, 500]
+    batches = batch_chunks_by_frames(durations, max_batch_frames=600)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(durations)))
+    assert batches == [[1, 3], [2, 0], [4]]  # sorted by duration, batch size * longest within the budget
+    assert all(len(batch) * max(durations[i] for i in batch) <= 600 for batch in batches)
+    assert batch_chunks_by_frames([700], max_batch_frames=600) == [[0]]  # too long alone still gets its batch
+
+
+@pytest.mark.parametrize("fused_cfg", [False, True])
+def test_batched_chunks_match_sequential_chunks(tiny_cfm, fused_cfg):
+    # per-item padding masked in the text convs and the conv position embedding, so batching is lossless
+    from f5_tts.infer.utils_infer import _sample_chunks, _sample_chunks_batched
+
+    torch.manual_seed(0)
+    cond = torch.randn(1, 40, tiny_cfm.num_channels)
+    texts = ["hello world.", "xin chào các bạn.", "một hai ba bốn năm sáu.", "ok."]
+    durations = [96, 75, 110, 52]
+    kwargs = dict(steps=8, cfg_strength=2.0, sway_sampling_coef=-1.0, seed=0, fused_cfg=fused_cfg)
+    sequential = dict(_sample_chunks(cond, 40, texts, durations, tiny_cfm, progress_callback=lambda *_: None, **kwargs))
+    batched = dict(
+        _sample_chunks_batched(
+            cond, 40, texts, durations, tiny_cfm, max_batch_frames=256, progress_callback=lambda *_: None, **kwargs
+        )
+    )
+    assert sorted(batched) == list(range(len(texts)))
+    for i in range(len(texts)):
+        assert batched[i].shape == sequential[i].shape == (1, tiny_cfm.num_channels, durations[i] - 40)
+        np.testing.assert_allclose(batched[i].numpy(), sequential[i].numpy(), rtol=0, atol=1e-5)
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+import torch.nn.functional as F  # noqa: E402
+
+from f5_tts.infer.onnx_engine import OrtF5TTS  # noqa: E402
+from f5_tts.infer.onnx_export import export_onnx  # noqa: E402
+from f5_tts.model.utils import convert_char_to_pinyin, list_str_to_idx  # noqa: E402
+
+FRAMES = 96
+
+
+@pytest.fixture
+def exported(tiny_cfm, tiny_vocos, tmp_path):
+    # graphs exported at another frame count than the one checked, so the dynamic axes are exercised
+    export_onnx(tiny_cfm, tiny_vocos, str(tmp_path), example_frames=64)
+    return tiny_cfm, tiny_vocos, OrtF5TTS(str(tmp_path))
+
+
+def branch_inputs(model, frames=FRAMES):
+    # cond and null branches of one chunk, as OrtF5TTS.sample() feeds the graphs
+    torch.manual_seed(0)
+    cond = torch.randn(1, frames, model.num_channels).repeat(2, 1, 1)
+    tokens = list_str_to_idx(convert_char_to_pinyin(["xin chào, hello world."]), model.vocab_char_map)
+    tokens = F.pad(tokens, (0, frames - tokens.shape[1]), value=-1).repeat(2, 1)
+    return cond, tokens, torch.tensor([False, True])
+
+
+def test_export_leaves_the_models_in_eval_mode(exported):
+    model, vocoder, _ = exported
+    assert not any(module.training for module in [*model.modules(), *vocoder.modules()])
+
+
+def test_context_graph(exported):
+    model, _, engine = exported
+    cond, tokens, drop = branch_inputs(model)
+    with torch.inference_mode():
+        expected = model.transformer.prepare_context(cond, tokens, drop_audio_cond=drop, drop_text=drop)["cond_embed"]
+    (cond_embed,) = engine.sessions["context"].run(
+        None, dict(cond=cond.numpy(), text=tokens.numpy(), drop=drop.numpy())
+    )
+    np.testing.assert_allclose(cond_embed, expected.numpy(), rtol=0, atol=1e-5)
+
+
+def test_step_graph(exported):
+    model, _, engine = exported
+    cond, tokens, drop = branch_inputs(model)
+    x, time = torch.randn(2, FRAMES, model.num_channels), torch.tensor([0.3, 0.3])
+    with torch.inference_mode():
+        context = model.transformer.prepare_context(cond, tokens, drop_audio_cond=drop, drop_text=drop)
+        expected = model.transformer(
+            x=x, cond=None, text=None, time=time, drop_audio_cond=drop, drop_text=drop, context=context
+        )
+    np.testing.assert_allclose(engine.rope[..., :FRAMES, :], context["rope"][0].numpy(), rtol=0, atol=1e-6)
+    inputs = dict(
+        x=x.numpy(), cond_embed=context["cond_embed"].numpy(), rope=engine.rope[..., :FRAMES, :], time=time.numpy()
+    )
+    (flow,) = engine.sessions["step"].run(None, inputs)
+    np.testing.assert_allclose(flow, expected.numpy(), rtol=0, atol=1e-5)
+
+
+def test_vocos_graph(exported):
+    _, vocoder, engine = exported
+    mel = torch.randn(2, 100, FRAMES, generator=torch.Generator().manual_seed(1))
+    with torch.inference_mode():
+        expected = vocoder.decode(mel)
+    np.testing.assert_allclose(engine.vocode(mel.numpy()), expected.numpy(), rtol=0, atol=1e-5)
+
+
+def test_sampled_mel(exported):
+    # whole chunk, euler with cfg and sway sampling, both from the same noise
+    model, _, engine = exported
+    torch.manual_seed(0)
+    cond = torch.randn(1, 40, model.num_channels)
+    text = convert_char_to_pinyin(["xin chào, hello world."])
+    kwargs = dict(steps=8, cfg_strength=2.0, sway_sampling_coef=-1.0)
+    with torch.inference_mode():
+        expected, _ = model.sample(cond, text, FRAMES, seed=0, **kwargs)
+    torch.manual_seed(0)
+    noise = torch.randn(FRAMES, model.num_channels).numpy()
+    generated = engine.sample(cond[0].numpy(), text[0], FRAMES, noise=noise, **kwargs)
+    np.testing.assert_allclose(generated, expected[0].numpy(), rtol=0, atol=1e-4)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+
+def infer(tiny_cfm, tiny_vocos, **kwargs):
+    from f5_tts.infer.utils_infer import infer_batch_process
+
+    torch.manual_seed(0)  # same noise for both runs, the chunks are sampled in order on the calling thread
+    ref_audio = (0.1 * torch.randn(1, 24000), 24000)
+    gen_text_batches = ["xin chào các bạn.", "hello world.", "một hai ba."]
+    wave, _, spectrogram = infer_batch_process(
+        ref_audio, "tham chiếu. ", gen_text_batches, tiny_cfm, tiny_vocos, nfe_step=4, progress=None, **kwargs
+    )
+    return wave, spectrogram
+
+
+def test_pipelined_matches_sequential(tiny_cfm, tiny_vocos):
+    num_threads = torch.get_num_threads()
+    timings = {}
+    wave, spectrogram = infer(tiny_cfm, tiny_vocos, progress_callback=lambda *_: None)
+    pipelined_wave, pipelined_spectrogram = infer(
+        tiny_cfm, tiny_vocos, progress_callback=lambda *_: None, pipelined=True, timings=timings
+    )
+    assert wave.size > 0
+    np.testing.assert_allclose(pipelined_wave, wave, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(pipelined_spectrogram, spectrogram, rtol=0, atol=1e-6)
+
+    assert torch.get_num_threads() == num_threads  # thread budget restored
+    assert set(timings) == {"sample", "vocode", "assemble", "wall", "overlap"}
+    assert timings["sample"] > 0 and timings["vocode"] > 0 and timings["wall"] > 0
@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from f5_tts.model.sampler import FIXED_GRID_SOLVERS, odeint  # noqa: E402
+
+
+def sway_grid(steps, coef=-1.0):
+    t = torch.linspace(0, 1, steps + 1, dtype=torch.float64)
+    return t + coef * (torch.cos(torch.pi / 2 * t) - 1 + t)
+
+
+def linear_flow(t, y):
+    # dy/dt = -y + t, y(t) = t - 1 + (y0 + 1) e^-t
+    return -y + t
+
+
+def linear_flow_solution(y0, t):
+    return t - 1 + (y0 + 1) * math.exp(-t)
+
+
+# adams3 ramps up from euler, its first steps keep the global order at 2
+@pytest.mark.parametrize("method, order", [("euler", 1), ("midpoint", 2), ("heun", 2), ("adams2", 2), ("adams3", 2)])
+def test_convergence_order(method, order):
+    y0 = torch.tensor([0.5, -2.0], dtype=torch.float64)
+    exact = linear_flow_solution(y0, 1.0)
+    errors = []
+    for steps in (16, 32):
+        t = torch.linspace(0, 1, steps + 1, dtype=torch.float64)
+        y, _ = odeint(linear_flow, y0.clone(), t, method=method)
+        errors.append((y - exact).abs().max().item())
+    assert math.log2(errors[0] / errors[1]) == pytest.approx(order, abs=0.3)
+
+
+@pytest.mark.parametrize("method, baseline", [("euler", "euler"), ("midpoint", "midpoint"), ("heun", "heun2")])
+def test_matches_torchdiffeq(method, baseline):
+    torchdiffeq = pytest.importorskip("torchdiffeq")
+    y0 = torch.randn(2, 7, 3, generator=torch.Generator().manual_seed(0), dtype=torch.float64)
+    t = sway_grid(12)
+    expected = torchdiffeq.odeint(linear_flow, y0, t, method=baseline)
+    y, trajectory = odeint(linear_flow, y0.clone(), t, method=method, return_trajectory=True)
+    np.testing.assert_allclose(trajectory.numpy(), expected.numpy(), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(y.numpy(), expected[-1].numpy(), rtol=1e-12, atol=1e-12)
+
+
+def straight_flow(x1):
+    # optimal transport flow towards a single data point, velocity constant along each path
+    def fn(t, y):
+        return (x1 - y) / (1 - t)
+
+    return fn
+
+
+@pytest.mark.parametrize("method", ["euler", "midpoint", "adams2", "adams3", "dpmpp_2m"])
+def test_straight_flow_is_integrated_exactly(method):
+    # heun evaluates at t = 1 where this velocity field is singular
+    x1 = torch.tensor([1.0, -3.0, 0.25], dtype=torch.float64)
+    y0 = torch.tensor([0.3, 0.1, -1.2], dtype=torch.float64)
+    y, _ = odeint(straight_flow(x1), y0.clone(), sway_grid(8), method=method)
+    np.testing.assert_allclose(y.numpy(), x1.numpy(), atol=1e-10)
+
+
+def test_adaptive_tol_stops_early_on_a_straight_flow():
+    x1 = torch.tensor([1.0, -3.0, 0.25], dtype=torch.float64)
+    y0 = torch.tensor([0.3, 0.1, -1.2], dtype=torch.float64)
+    stats, calls = {}, []
+    y, _ = odeint(
+        straight_flow(x1),
+        y0.clone(),
+        sway_grid(16),
+        method="euler",
+        adaptive_tol=1e-3,
+        stats=stats,
+        step_callback=lambda step, total: calls.append((step, total)),
+    )
+    np.testing.assert_allclose(y.numpy(), x1.numpy(), atol=1e-10)
+    assert stats["steps"] < 16 and stats["nfe"] == stats["steps"]
+    assert calls[-1] == (16, 16)
+
+
+def test_fixed_grid_solvers_update_in_place_and_count_nfe():
+    nfe_per_step = dict(euler=1, midpoint=2, heun=2, adams2=1, adams3=1, dpmpp_2m=1)
+    assert set(nfe_per_step) == set(FIXED_GRID_SOLVERS)
+    for method, nfe in nfe_per_step.items():
+        y0 = torch.zeros(4, dtype=torch.float64)
+        stats = {}
+        y, trajectory = odeint(linear_flow, y0, sway_grid(6), method=method, stats=stats)
+        assert y.data_ptr() == y0.data_ptr() and trajectory is None
+        assert stats == dict(steps=6, nfe=6 * nfe)
@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+
+pydub = pytest.importorskip("pydub")
+
+from pydub import AudioSegment, silence as pydub_silence  # noqa: E402
+
+from f5_tts.infer import silence  # noqa: E402
+
+SR = 24000
+
+
+def synthetic_wave(segments, seed=0, channels=1):
+    # (seconds, dBFS) bursts of noise, silent gaps have a faint floor, ramped edges cross the thresholds mid-chunk
+    rng = np.random.default_rng(seed)
+    parts = []
+    for seconds, level in segments:
+        n = int(seconds * SR)
+        burst = rng.standard_normal((channels, n)) * silence.db_to_amplitude(level)
+        ramp = np.minimum(1, np.minimum(np.arange(n), np.arange(n)[::-1]) / (0.02 * SR))
+        parts.append(burst * ramp)
+    pcm = np.clip(np.round(np.concatenate(parts, axis=-1) * 32768), -32768, 32767).astype(np.int16)
+    aseg = AudioSegment(pcm.T.tobytes(), frame_rate=SR, sample_width=2, channels=channels)
+    wave = pcm.astype(np.float32) / 32768
+    return (wave[0] if channels == 1 else wave), aseg
+
+
+def to_array(aseg):
+    return silence.audiosegment_to_array(aseg)[0]
+
+
+SPEECH = [(0.4, -70), (2.3, -20), (0.25, -45), (1.7, -25), (1.3, -65), (3.1, -18), (0.6, -70)]
+LONG = [(0.5, -70)] + [(2.6, -22), (1.2, -62), (1.9, -26), (0.3, -48)] * 5 + [(0.8, -70)]
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("threshold, chunk_size", [(-50.0, 10), (-42, 10), (-30, 7)])
+def test_detect_leading_silence(channels, threshold, chunk_size):
+    wave, aseg = synthetic_wave(SPEECH, channels=channels)
+    expected = pydub_silence.detect_leading_silence(aseg, silence_threshold=threshold, chunk_size=chunk_size)
+    assert silence.detect_leading_silence(wave, SR, silence_threshold=threshold, chunk_size=chunk_size) == expected
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize(
+    "min_silence_len, silence_thresh, keep_silence, seek_step",
+    [(1000, -50, 1000, 10), (100, -40, 1000, 10), (1000, -50, 500, 10), (200, -35, 100, 1), (300, -40, True, 7)],
+)
+def test_split_on_silence(channels, min_silence_len, silence_thresh, keep_silence, seek_step):
+    wave, aseg = synthetic_wave(SPEECH, channels=channels)
+    kwargs = dict(
+        min_silence_len=min_silence_len, silence_thresh=silence_thresh, keep_silence=keep_silence, seek_step=seek_step
+    )
+    expected = [to_array(segment) for segment in pydub_silence.split_on_silence(aseg, **kwargs)]
+    segments = silence.split_on_silence(wave, SR, **kwargs)
+    assert len(segments) == len(expected) > 1
+    for segment, reference in zip(segments, expected):
+        np.testing.assert_array_equal(segment, reference)
+
+
+def remove_silence_edges(aseg, silence_threshold=-42):
+    # reference: the pydub trimming preprocess_ref_audio_text used before the numpy engine
+    aseg = aseg[pydub_silence.detect_leading_silence(aseg, silence_threshold=silence_threshold) :]
+    non_silent_end_duration = aseg.duration_seconds
+    for ms in reversed(aseg):
+        if ms.dBFS > silence_threshold:
+            break
+        non_silent_end_duration -= 0.001
+    return aseg[: int(non_silent_end_duration * 1000)]
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("threshold", [-42, -30])
+def test_trim_silence_edges(channels, threshold):
+    wave, aseg = synthetic_wave(SPEECH, seed=1, channels=channels)
+    trimmed = silence.trim_silence_edges(wave, SR, silence_threshold=threshold)
+    assert trimmed.shape[-1] < wave.shape[-1]
+    np.testing.assert_array_equal(trimmed, to_array(remove_silence_edges(aseg, threshold)))
+
+
+def clip_reference(aseg):
+    # reference: the pydub clipping preprocess_ref_audio_text used before the numpy engine
+    for min_silence_len, silence_thresh in [(1000, -50), (100, -40)]:
+        segments = pydub_silence.split_on_silence(
+            aseg, min_silence_len=min_silence_len, silence_thresh=silence_thresh, keep_silence=1000, seek_step=10
+        )
+        clipped = AudioSegment.silent(duration=0, frame_rate=SR)
+        for segment in segments:
+            if len(clipped) > 6000 and len(clipped + segment) > 15000:
+                break
+            clipped += segment
+        if len(clipped) <= 15000:
+            return clipped
+    return clipped[:15000]
+
+
+@pytest.mark.parametrize(
+    "segments, messages",
+    [
+        (SPEECH, []),  # short, kept whole
+        (LONG, ["(1)"]),  # cut at a long silence
+        ([(s, lvl if lvl > -60 else -45) for s, lvl in LONG], ["(2)"]),  # long silences too loud, cut at a short one
+        ([(20.0, -20)], ["(3)"]),  # no silence, hard cut at 15 s
+    ],
+)
+def test_clip_on_silence(segments, messages):
+    pytest.importorskip("torch")
+    from f5_tts.infer.utils_infer import clip_on_silence
+
+    wave, aseg = synthetic_wave(segments, seed=2)
+    shown = []
+    clipped = clip_on_silence(wave, SR, show_info=shown.append)
+    assert [message[-3:] for message in shown] == messages
+    assert silence.duration_ms(clipped, SR) <= 15000
+    np.testing.assert_array_equal(clipped, to_array(clip_reference(aseg)))
+
+
+def test_compress_silence():
+    # reference: remove_silence_for_generated_wav before the numpy engine
+    wave, aseg = synthetic_wave(LONG, seed=3)
+    expected = AudioSegment.silent(duration=0, frame_rate=SR)
+    for segment in pydub_silence.split_on_silence(
+        aseg, min_silence_len=1000, silence_thresh=-50, keep_silence=500, seek_step=10
+    ):
+        expected += segment
+    compressed = silence.compress_silence(wave, SR)
+    assert compressed.shape[-1] < wave.shape[-1]
+    np.testing.assert_array_equal(compressed, to_array(expected))
+
+
+def test_remove_silence_for_generated_wav_falls_back_to_pydub(tmp_path, monkeypatch):
+    sf = pytest.importorskip("soundfile")
+    from f5_tts.infer import utils_infer
+
+    wave, _ = synthetic_wave(LONG, seed=4)
+    path = str(tmp_path / "generated.wav")  # pcm wav, so pydub decodes it without ffmpeg here
+    sf.write(path, wave, SR, subtype="PCM_16")
+    sf_read = sf.read
+
+    def read(filename, *args, **kwargs):
+        if filename == path:  # as if libsndfile could not decode the format, e.g. an mp3 on older libsndfile
+            raise sf.LibsndfileError(1, prefix="Error opening file: ")
+        return sf_read(filename, *args, **kwargs)
+
+    monkeypatch.setattr(utils_infer.sf, "read", read)
+    utils_infer.remove_silence_for_generated_wav(path)
+    monkeypatch.undo()
+
+    compressed, sr = sf.read(path, dtype="float32")
+    assert sr == SR and sf.info(path).format == "WAV"
+    np.testing.assert_allclose(compressed, silence.compress_silence(wave, SR), rtol=0, atol=1 / 32768)
@@ -0,0 +1,118 @@
+import random
+from importlib.resources import files
+
+import pytest
+
+torch = pytest.importorskip("torch")
+jieba = pytest.importorskip("jieba")
+pypinyin = pytest.importorskip("pypinyin")
+
+from torch.nn.utils.rnn import pad_sequence  # noqa: E402
+
+from f5_tts.model.utils import (  # noqa: E402
+    VocabCharMap,
+    convert_char_to_pinyin,
+    get_tokenizer,
+    get_vocab_lookup,
+    list_str_to_idx,
+)
+
+
+def reference_convert_char_to_pinyin(text_list, polyphone=True):
+    # per-char path from before the latin fast path, always through jieba.cut
+    from pypinyin import Style, lazy_pinyin
+
+    final_text_list = []
+    custom_trans = str.maketrans({";": ",", "“": '"', "”": '"', "‘": "'", "’": "'"})
+
+    def is_chinese(c):
+        return "㄀" <= c <= "鿿"
+
+    for text in text_list:
+        char_list = []
+        text = text.translate(custom_trans)
+        for seg in jieba.cut(text):
+            seg_byte_len = len(bytes(seg, "UTF-8"))
+            if seg_byte_len == len(seg):
+                if char_list and seg_byte_len > 1 and char_list[-1] not in " :'\"":
+                    char_list.append(" ")
+                char_list.extend(seg)
+            elif polyphone and seg_byte_len == 3 * len(seg):
+                seg_ = lazy_pinyin(seg, style=Style.TONE3, tone_sandhi=True)
+                for i, c in enumerate(seg):
+                    if is_chinese(c):
+                        char_list.append(" ")
+                    char_list.append(seg_[i])
+            else:
+                for c in seg:
+                    if ord(c) < 256:
+                        char_list.extend(c)
+                    elif is_chinese(c):
+                        char_list.append(" ")
+                        char_list.extend(lazy_pinyin(c, style=Style.TONE3, tone_sandhi=True))
+                    else:
+                        char_list.append(c)
+        final_text_list.append(char_list)
+    return final_text_list
+
+
+def reference_list_str_to_idx(text, vocab_char_map, padding_value=-1):
+    list_idx_tensors = [torch.tensor([vocab_char_map.get(c, 0) for c in t]) for t in text]
+    return pad_sequence(list_idx_tensors, padding_value=padding_value, batch_first=True)
+
+
+@pytest.fixture(scope="module")
+def vocab_char_map():
+    return get_tokenizer(str(files("f5_tts").joinpath("infer/examples/vocab.txt")), "custom")[0]
+
+
+TEXTS = [
+    "",
+    "Xin chào, tôi là trợ lý ảo của bạn.",
+    "Giá vàng hôm nay tăng 3.5% lên 87,2 triệu đồng/lượng; “kỷ lục” mới!",
+    "Học C++ và c# ở AT&T năm 2024 — thật 'tuyệt' vời...",
+    "  Nhiều   khoảng\ttrắng\r\nvà xuống dòng\n ",
+    "Email: a.b-c_d@example.com, số 0912-345-678 #1 & 100%",
+    "Hello world. I don't really care what you call me.",
+    "Mixed 中文 text 你好世界, rồi tiếng Việt tiếp.",
+    "Emoji 🙂 và ký tự lạ ẞ ŉ ﬁ ∑ ≥",
+]
+
+ALPHABET = (
+    "abcxyzABCXYZ0189 .,;:!?'\"“”‘’-_+#&%/()\t\nàáảãạăắằẳẵặâấầẩẫậđèéẻẽẹêếềểễệìíỉĩịòóỏõọôốồổỗộơớờởỡợùúủũụưứừửữựỳýỷỹỵ"
+)
+
+
+def random_texts(count, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choices(ALPHABET, k=rng.randint(0, 60))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("text", TEXTS + random_texts(200))
+def test_convert_char_to_pinyin_matches_jieba_path(text):
+    assert convert_char_to_pinyin([text]) == reference_convert_char_to_pinyin([text])
+
+
+def test_list_str_to_idx_matches_per_char_lookup(vocab_char_map):
+    texts = TEXTS + random_texts(50, seed=1)
+    for batch in (texts, [convert_char_to_pinyin([t])[0] for t in texts], texts[1:2]):
+        expected = reference_list_str_to_idx(batch, vocab_char_map)
+        assert torch.equal(list_str_to_idx(batch, vocab_char_map), expected)
+        plain = dict(vocab_char_map)
+        assert torch.equal(list_str_to_idx(batch, plain, padding_value=-3), reference_list_str_to_idx(batch, plain, -3))
+
+
+def test_vocab_lookup_is_cached_on_the_vocab(vocab_char_map):
+    assert isinstance(vocab_char_map, VocabCharMap)
+    assert get_vocab_lookup(vocab_char_map) is get_vocab_lookup(vocab_char_map)
+
+    # another vocab of the same size gets its own table
+    other = VocabCharMap({c: len(vocab_char_map) - 1 - i for c, i in vocab_char_map.items()})
+    assert not (get_vocab_lookup(other) == get_vocab_lookup(vocab_char_map)).all()
+    assert torch.equal(list_str_to_idx(["xin chào"], other), reference_list_str_to_idx(["xin chào"], other))
+
+    # entries added after the first lookup are picked up
+    grown = VocabCharMap(vocab_char_map)
+    get_vocab_lookup(grown)
+    grown["ⱶ"] = len(grown)
+    assert list_str_to_idx(["ⱶ"], grown).tolist() == [[len(grown) - 1]]
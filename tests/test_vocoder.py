@@ -0,0 +1,41 @@
+import math
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from f5_tts.infer.vocoder import StreamingVocoder, TiledVocoder  # noqa: E402
+
+
+@pytest.mark.parametrize("num_frames", [700, 1031])
+def test_tiled_decode_matches_full_decode(tiny_vocos, num_frames):
+    torch.manual_seed(1)
+    mel = torch.randn(1, 100, num_frames)
+    with torch.inference_mode():
+        full = tiny_vocos.decode(mel)
+        tiled = TiledVocoder(tiny_vocos, tile_frames=128).decode(mel)
+
+    assert tiled.shape == full.shape == (1, num_frames * 256)
+    np.testing.assert_allclose(tiled.numpy(), full.numpy(), atol=1e-6, rtol=0)
+
+
+def test_tiled_decode_short_mel_is_a_single_call(tiny_vocos):
+    mel = torch.randn(1, 100, 100)
+    with torch.inference_mode():
+        np.testing.assert_array_equal(TiledVocoder(tiny_vocos).decode(mel).numpy(), tiny_vocos.decode(mel).numpy())
+
+
+@pytest.mark.parametrize("num_frames, window_frames", [(500, 64), (333, 50), (90, 64)])
+def test_stream_matches_full_decode(tiny_vocos, num_frames, window_frames):
+    torch.manual_seed(2)
+    mel = torch.randn(1, 100, num_frames)
+    with torch.inference_mode():
+        full = tiny_vocos.decode(mel)[0]
+        blocks = list(StreamingVocoder(tiny_vocos, window_frames=window_frames).stream(mel))
+
+    assert all(block.ndim == 1 for block in blocks)
+    assert len(blocks) == (1 if num_frames <= window_frames + 64 else math.ceil(num_frames / window_frames))
+    streamed = torch.cat(blocks)
+    assert streamed.shape == full.shape == (num_frames * 256,)
+    np.testing.assert_allclose(streamed.numpy(), full.numpy(), atol=1e-6, rtol=0)
@@ -0,0 +1,40 @@
+import io
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+
+from f5_tts.infer.voice_profile import VoiceProfileCache  # noqa: E402
+from f5_tts.model.modules import MelSpec  # noqa: E402
+
+
+@pytest.fixture
+def cache():
+    return VoiceProfileCache(MelSpec())
+
+
+def test_key_of_decoded_samples(cache):
+    wave = np.random.default_rng(0).standard_normal((1, 2400)).astype(np.float32)
+    key = cache.key((wave, 24000), "ref text.", True)
+    assert key == cache.key((torch.from_numpy(wave), 24000), "ref text.", True)
+    assert key != cache.key((wave, 16000), "ref text.", True)
+    assert key != cache.key((wave[:, :-1], 24000), "ref text.", True)
+
+
+def test_key_of_file_like_matches_bytes_and_path(cache, tmp_path):
+    data = b"RIFF fake wave bytes"
+    path = tmp_path / "ref.wav"
+    path.write_bytes(data)
+    key = cache.key(data, "", True)
+    assert key == cache.key(str(path), "", True) == cache.key(path, "", True)
+
+    profile = object()
+    cache.profiles[key] = profile
+    assert cache.get(io.BytesIO(data)) is profile
+
+
+def test_key_rejects_unknown_types(cache):
+    with pytest.raises(TypeError):
+        cache.key(12345, "", True)